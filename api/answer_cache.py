@@ -0,0 +1,427 @@
+import hashlib
+import itertools
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from chunk_store import parent_key
+from config import *
+from faq_index import NEGATION_WORDS
+from metrics import SEMANTIC_CACHE_AUDITS, SEMANTIC_CACHE_LOOKUPS
+
+
+class MemoryCacheBackend:
+    """Backend en mémoire avec éviction LRU et expiration TTL"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def set(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = {"value": value, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend:
+    """Backend SQLite persistant: le cache reste chaud après redémarrage"""
+
+    name = "disk"
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS answers_last_access ON answers(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM answers WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE answers SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now))
+            # Éviction LRU au-delà de la capacité
+            self._conn.execute("""
+                DELETE FROM answers WHERE key IN (
+                    SELECT key FROM answers ORDER BY last_access DESC
+                    LIMIT -1 OFFSET ?)""", (self.max_entries,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM answers").fetchone()[0]
+
+
+class AnswerCache:
+    """Cache des réponses Claude
+
+    La clé combine la question normalisée, le type de requête détecté et
+    l'empreinte des chunks récupérés: une réindexation qui modifie le
+    contexte invalide automatiquement les entrées concernées.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Minuscules, sans accents ni ponctuation, espaces compactés"""
+        text = unicodedata.normalize("NFKD", question.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        text = re.sub(r"[^\w\s]", " ", text)
+        return " ".join(text.split())
+
+    @staticmethod
+    def context_fingerprint(results: List[Tuple[Dict, float]]) -> str:
+        """Empreinte des chunks récupérés (source + contenu)"""
+        digest = hashlib.sha256()
+        for doc, _ in results:
+            chunk_id = hashlib.sha1(
+                f"{doc.get('source', '')}\n{doc.get('content', '')}".encode("utf-8")).hexdigest()
+            digest.update(chunk_id.encode("ascii"))
+        return digest.hexdigest()
+
+    def make_key(self, question: str, query_type: str,
+                 results: List[Tuple[Dict, float]]) -> str:
+        raw = "|".join([
+            self.normalize_question(question),
+            query_type,
+            self.context_fingerprint(results)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, query_type: str,
+            results: List[Tuple[Dict, float]]) -> Optional[str]:
+        """Renvoie la réponse en cache ou None"""
+        if not self.enabled:
+            return None
+        entry = self.backend.get(self.make_key(question, query_type, results))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["answer"]
+
+    def set(self, question: str, query_type: str,
+            results: List[Tuple[Dict, float]], answer: str):
+        if not self.enabled:
+            return
+        self.backend.set(
+            self.make_key(question, query_type, results),
+            {"answer": answer, "question": question, "query_type": query_type})
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.enabled else None,
+            "size": len(self.backend) if self.enabled else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+# Mots sans incidence sur la réponse (politesse, articles, prépositions), jamais une négation
+IGNORED_TERMS = frozenset({
+    "bonjour", "salut", "hello", "merci", "svp", "stp", "please",
+    "le", "la", "les", "un", "une", "des", "de", "du", "au", "aux", "en", "et",
+}) - NEGATION_WORDS
+
+
+def question_terms(vectorizer, question: str) -> FrozenSet[str]:
+    """Mots de la question normalisée (sans accents), découpée comme par le vectorizer
+
+    Les mots hors vocabulaire comptent aussi.
+    """
+    tokenize = vectorizer.build_tokenizer()
+    return frozenset(tokenize(AnswerCache.normalize_question(question)))
+
+
+class SemanticAnswerCache:
+    """Cache sémantique des réponses Claude
+
+    Chaque question répondue est projetée dans l'espace réduit de l'index
+    (vectorizer TF-IDF + SVD, comme reduced_vectors) et conservée avec sa
+    réponse. Une question est servie depuis le cache si:
+    - son cosinus avec une question en cache atteint min_similarity;
+    - son type de requête est le même;
+    - les deux questions ont les mêmes mots, à IGNORED_TERMS près: un mot
+      remplacé ("erreur sur un BRC" / "erreur sur un TR", cosinus 0.96),
+      ajouté ("ne doit pas facturer" / "doit facturer", 0.92) ou hors
+      vocabulaire ("intervenant mineur" / "intervenant", 1.0, car le
+      vecteur SVD ignore "mineur") change le sens sans changer le vecteur.
+
+    Les entrées sont liées à la version de l'index: une réindexation
+    (nouvel espace SVD) vide le cache. Au-delà de max_entries, l'entrée la
+    moins récemment servie est remplacée (LRU).
+
+    Une part audit_rate des hits est auditée par l'appelant: les documents
+    retrouvés pour la nouvelle question sont comparés à ceux de la réponse
+    en cache (audit()); une entrée suspecte est retirée.
+    """
+
+    def __init__(self, max_entries: int, min_similarity: float, ttl_seconds: float,
+                 audit_rate: float = 0.0, audit_min_overlap: float = 0.5,
+                 audit_log_size: int = 200, audit_top_k: int = 3):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.ttl_seconds = ttl_seconds
+        self.audit_rate = audit_rate
+        self.audit_min_overlap = audit_min_overlap
+        self.audit_top_k = audit_top_k
+        self.hits = 0
+        self.misses = 0
+        self.guarded = 0
+        self.verdicts = {"agree": 0, "suspect": 0}
+        self.audit_log = deque(maxlen=audit_log_size)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _reset(self, version: Optional[int]):
+        self.version = version
+        self._vectors = None  # (max_entries, dimension SVD), alloué à la première entrée
+        self._types = np.full(self.max_entries, None, dtype=object)
+        self._last_access = np.zeros(self.max_entries)
+        self._entries: List[Optional[Dict[str, Any]]] = []
+        self._slots: Dict[Tuple[str, str], int] = {}  # (question normalisée, type) -> emplacement
+
+    def _check_version(self, version: int):
+        """Vide le cache si l'index a changé depuis les entrées en mémoire"""
+        if version != self.version:
+            self._reset(version)
+
+    def _remove(self, slot: int):
+        entry = self._entries[slot]
+        del self._slots[(AnswerCache.normalize_question(entry["question"]), entry["query_type"])]
+        self._entries[slot] = None
+        self._types[slot] = None
+        self._last_access[slot] = 0.0  # Emplacement réutilisé en priorité
+
+    def get(self, version: int, question_unit: np.ndarray, terms: FrozenSet[str],
+            query_type: str) -> Optional[Dict[str, Any]]:
+        """Entrée de la question en cache la plus proche, ou None
+
+        Renvoie {"id", "question", "answer", "similarity", "parents"}.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            n = len(self._entries)
+            outcome, hit = "miss", None
+            if n:
+                similarities = self._vectors[:n] @ question_unit
+                similarities[self._types[:n] != query_type] = -1.0
+                candidates = np.flatnonzero(similarities >= self.min_similarity)
+                for slot in candidates[np.argsort(-similarities[candidates])]:
+                    entry = self._entries[slot]
+                    if now - entry["created_at"] > self.ttl_seconds:
+                        self._remove(slot)
+                        continue
+                    if (terms ^ entry["terms"]) - IGNORED_TERMS:
+                        outcome = "guarded"
+                        continue
+                    self._last_access[slot] = now
+                    outcome = "hit"
+                    hit = {"id": entry["id"], "question": entry["question"],
+                           "answer": entry["answer"], "parents": entry["parents"],
+                           "similarity": float(similarities[slot])}
+                    break
+
+            if outcome == "hit":
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.guarded += outcome == "guarded"
+        SEMANTIC_CACHE_LOOKUPS.inc(outcome=outcome)
+        return hit
+
+    def set(self, version: int, question_unit: np.ndarray, terms: FrozenSet[str],
+            query_type: str, question: str, answer: str,
+            results: List[Tuple[Dict, float]]):
+        if not self.enabled:
+            return
+        parents = frozenset(parent_key(doc) for doc, _ in results)
+        key = (AnswerCache.normalize_question(question), query_type)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None:
+                self._vectors = np.zeros(
+                    (self.max_entries, len(question_unit)), dtype=np.float32)
+
+            slot = self._slots.get(key)
+            if slot is None:
+                if len(self._entries) < self.max_entries:
+                    slot = len(self._entries)
+                    self._entries.append(None)
+                else:
+                    slot = int(np.argmin(self._last_access))
+                    if self._entries[slot] is not None:
+                        self._remove(slot)
+            self._vectors[slot] = question_unit
+            self._types[slot] = query_type
+            self._last_access[slot] = now
+            self._entries[slot] = {
+                "id": next(self._ids), "question": question, "query_type": query_type,
+                "terms": terms, "answer": answer, "parents": parents, "created_at": now}
+            self._slots[key] = slot
+
+    def should_audit(self) -> bool:
+        return random.random() < self.audit_rate
+
+    def audit(self, hit: Dict[str, Any], question: str, query_type: str,
+              results: List[Tuple[Dict, float]]) -> bool:
+        """Compare les documents de tête retrouvés pour la question à ceux de l'entrée servie
+
+        Part des audit_top_k premiers documents (parents distincts) présents
+        parmi ceux de la réponse en cache: sous audit_min_overlap, verdict
+        "suspect" et l'entrée est retirée. Un Jaccard sur tous les documents
+        signalait des questions identiques dont seuls les derniers rangs
+        différaient. Renvoie True si le hit est confirmé.
+        """
+        head = list(dict.fromkeys(parent_key(doc) for doc, _ in results))[:self.audit_top_k]
+        overlap = len(set(head) & hit["parents"]) / len(head) if head else float(not hit["parents"])
+        verdict = "agree" if overlap >= self.audit_min_overlap else "suspect"
+        SEMANTIC_CACHE_AUDITS.inc(verdict=verdict)
+        with self._lock:
+            self.verdicts[verdict] += 1
+            self.audit_log.append({
+                "question": question, "cached_question": hit["question"],
+                "query_type": query_type, "similarity": round(hit["similarity"], 4),
+                "overlap": round(overlap, 3), "verdict": verdict, "audited_at": time.time()})
+            if verdict == "suspect":
+                for slot, entry in enumerate(self._entries):
+                    if entry is not None and entry["id"] == hit["id"]:
+                        self._remove(slot)
+                        break
+        return verdict == "agree"
+
+    def clear(self):
+        with self._lock:
+            self._reset(self.version)
+
+    def recent_audits(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Derniers audits, du plus récent au plus ancien"""
+        with self._lock:
+            return list(self.audit_log)[::-1][:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        audited = sum(self.verdicts.values())
+        return {
+            "enabled": self.enabled,
+            "size": len(self._slots),
+            "max_entries": self.max_entries,
+            "min_similarity": self.min_similarity,
+            "index_version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "guarded": self.guarded,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "audits": dict(self.verdicts),
+            "false_hit_rate": round(self.verdicts["suspect"] / audited, 3) if audited else 0.0
+        }
+
+
+def create_semantic_cache() -> SemanticAnswerCache:
+    """Cache sémantique selon SEMANTIC_CACHE_* (désactivé aussi par ANSWER_CACHE_BACKEND=none)"""
+    enabled = SEMANTIC_CACHE_ENABLED and ANSWER_CACHE_BACKEND != "none"
+    return SemanticAnswerCache(
+        SEMANTIC_CACHE_MAX_ENTRIES if enabled else 0, SEMANTIC_CACHE_MIN_SIMILARITY,
+        ANSWER_CACHE_TTL_SECONDS, SEMANTIC_CACHE_AUDIT_RATE,
+        SEMANTIC_CACHE_AUDIT_MIN_OVERLAP, SEMANTIC_CACHE_AUDIT_LOG_SIZE,
+        SEMANTIC_CACHE_AUDIT_TOP_K)
+
+
+def create_answer_cache() -> AnswerCache:
+    """Instancie le cache selon ANSWER_CACHE_BACKEND (memory, disk, none)"""
+    if ANSWER_CACHE_BACKEND == "disk":
+        return AnswerCache(DiskCacheBackend(
+            ANSWER_CACHE_PATH, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS))
+    if ANSWER_CACHE_BACKEND == "memory":
+        return AnswerCache(MemoryCacheBackend(
+            ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS))
+    return AnswerCache(None)
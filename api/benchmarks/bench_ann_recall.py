@@ -0,0 +1,66 @@
+"""Réglage de l'index IVF: recall@k et latence face à la recherche exacte.
+
+Pour chaque taille de corpus (corpus réel répliqué avec bruit) et chaque
+valeur de n_probe, mesure le recall@k de l'index IVF sur des chunks tirés
+au hasard utilisés comme requêtes, ainsi que la latence p50 d'une requête.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_ann_recall --sizes 10000 100000 --n-probe 4 8 16
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_search_latency import base_corpus, load_base_index, scale_index
+from config import MAX_CONTEXT_DOCS
+from vector_index import BruteForceIndex, IVFIndex, evaluate_recall
+
+
+def p50_latency_ms(index, queries: np.ndarray) -> float:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(latencies, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k de l'index IVF")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--n-lists", type=int, default=0,
+                        help="0 = automatique (≈ √N)")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=MAX_CONTEXT_DOCS * 2)
+    args = parser.parse_args()
+
+    rag = load_base_index()
+    base = base_corpus(rag)
+    rng = np.random.default_rng(7)
+
+    print(f"\n{'chunks':>8} | {'n_lists':>7} | {'n_probe':>7} | "
+          f"{'recall@' + str(args.k):>9} | {'p50 (ms)':>8} | {'exact p50':>9}")
+    print("-" * 64)
+    for n_chunks in args.sizes:
+        scale_index(rag, base, n_chunks)
+        vectors = rag.index.normalized_vectors
+        queries = vectors[rng.choice(n_chunks, args.queries, replace=False)]
+
+        exact = BruteForceIndex()
+        exact.build(vectors)
+        exact_p50 = p50_latency_ms(exact, queries)
+
+        index = IVFIndex(n_lists=args.n_lists)
+        index.build(vectors)
+        for n_probe in args.n_probe:
+            index.n_probe = n_probe
+            recall = evaluate_recall(index, vectors, queries, args.k)
+            print(f"{n_chunks:>8} | {len(index.centroids):>7} | {n_probe:>7} | "
+                  f"{recall:>9.3f} | {p50_latency_ms(index, queries):>8.2f} | "
+                  f"{exact_p50:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Recherche d'un lot de questions: boucle search_advanced vs search_advanced_batch.
+
+Le lot est vectorisé en un seul transform TF-IDF + SVD puis scoré par un
+produit matrice-matrice; la boucle refait une passe complète par question.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_batch_retrieval --questions 300 --sizes 515 10000 100000
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("CLAUDE_API_KEY", "bench-key")
+
+from benchmarks.bench_search_latency import (QUESTIONS, base_corpus,
+                                             load_base_index, scale_index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche par lot vs boucle")
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    rag = load_base_index()
+    base = base_corpus(rag)
+    questions = [f"{QUESTIONS[i % len(QUESTIONS)][0]} #{i}" for i in range(args.questions)]
+    preferences = [rag._type_preferences(rag._detect_query_type(q)) for q in questions]
+
+    print(f"\n{'chunks':>8} | {'boucle (ms)':>11} | {'lot (ms)':>9} | {'gain':>6}")
+    print("-" * 44)
+    for n_chunks in args.sizes:
+        scale_index(rag, base, n_chunks)
+
+        start = time.perf_counter()
+        for question, (types, categories) in zip(questions, preferences):
+            rag.search_advanced(question, types, categories)
+        loop_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        rag.search_advanced_batch(questions, preferences)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{n_chunks:>8} | {loop_ms:>11.1f} | {batch_ms:>9.1f} | "
+              f"{loop_ms / batch_ms:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Microbenchmark de _apply_search_boosts: boucle Python historique vs version vectorisée.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_boosts --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import timeit
+
+import numpy as np
+
+os.environ.setdefault("CLAUDE_API_KEY", "bench-key")
+
+from index_snapshot import KiwiIndexSnapshot
+from kiwi_rag_advanced import AdvancedKiwiRAG
+
+TYPES = ["faq", "legal_site", "junior_entreprises", "rse_formation"]
+CATEGORIES = ["contrats", "statuts", "comptabilite", "social", "general",
+              "environnement", "gouvernance"]
+
+
+def legacy_apply_search_boosts(documents, similarities, preferred_types=None,
+                               boost_categories=None):
+    """Implémentation d'origine (une itération Python par chunk)"""
+    boosted_similarities = similarities.copy()
+
+    for i, doc in enumerate(documents):
+        if preferred_types and doc.get('type') in preferred_types:
+            boosted_similarities[i] *= 1.3
+
+        doc_category = doc.get(
+            'category',
+            doc.get(
+                'legal_category',
+                doc.get('rse_category')))
+        if boost_categories and doc_category in boost_categories:
+            boosted_similarities[i] *= 1.2
+
+        if doc.get('priority', 0) > 1:
+            boosted_similarities[i] *= 1.1
+
+    return boosted_similarities
+
+
+def synthetic_documents(n_docs: int, seed: int = 42):
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(n_docs):
+        doc_type = rng.choice(TYPES)
+        doc = {"type": doc_type, "source": f"{doc_type}.json", "content": ""}
+        category_key = {"legal_site": "legal_category",
+                        "rse_formation": "rse_category"}.get(doc_type, "category")
+        doc[category_key] = rng.choice(CATEGORIES)
+        if doc_type == "faq":
+            doc["priority"] = rng.choice([1, 3])
+        documents.append(doc)
+    return documents
+
+
+def run(sizes, repeat: int):
+    rag = AdvancedKiwiRAG()
+    preferred_types, boost_categories = ["legal_site"], ["contrats", "statuts"]
+
+    print(f"{'chunks':>8} | {'boucle (ms)':>12} | {'vectorisé (ms)':>15} | {'gain':>6}")
+    print("-" * 52)
+    for n_docs in sizes:
+        snapshot = KiwiIndexSnapshot(synthetic_documents(n_docs))
+        snapshot.build_metadata_index()
+        rag.index = snapshot
+        similarities = np.random.default_rng(0).random(n_docs)
+
+        expected = legacy_apply_search_boosts(
+            snapshot.documents, similarities, preferred_types, boost_categories)
+        actual = rag._apply_search_boosts(
+            similarities, preferred_types, boost_categories)
+        assert np.allclose(expected, actual), "Résultats divergents"
+
+        legacy = min(timeit.repeat(
+            lambda: legacy_apply_search_boosts(
+                snapshot.documents, similarities, preferred_types, boost_categories),
+            number=1, repeat=repeat)) * 1000
+        vectorized = min(timeit.repeat(
+            lambda: rag._apply_search_boosts(
+                similarities, preferred_types, boost_categories),
+            number=1, repeat=repeat)) * 1000
+
+        print(f"{n_docs:>8} | {legacy:>12.3f} | {vectorized:>15.3f} | "
+              f"{legacy / vectorized:>5.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des boosts de recherche")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
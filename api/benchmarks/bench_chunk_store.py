@@ -0,0 +1,110 @@
+"""Mémoire et taille des chunks: ancienne liste de dicts vs ChunkStore en colonnes.
+
+Les chunks du corpus api/data (répliqué `--scale` fois) sont produits par
+l'ingestion actuelle; l'ancienne représentation est reconstituée avec les
+vues dict du store (mêmes clés, mêmes valeurs). Pour chacune on mesure:
+taille picklée (cache d'ingestion), mémoire allouée par chunk après
+dépickle (tracemalloc), durée du dépickle et taille sur disque dans
+l'index (chunks.jsonl avant, fichiers de ChunkStore.save après). Mesure
+aussi l'accès aléatoire à une vue depuis le store mappé de l'index.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_chunk_store --scale 1 10
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from benchmarks.bench_reindex_memory import build_scaled_data_dir
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def loaded_bytes(payload: bytes) -> int:
+    """Mémoire allouée par l'objet dépicklé (hors tampon pickle)"""
+    tracemalloc.start()
+    obj = pickle.loads(payload)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def measure(rag, data_dir: Path, repeat: int) -> dict:
+    from chunk_store import ChunkStore, MappedChunkStore
+
+    with redirect_stdout(open(os.devnull, 'w')):
+        store = ChunkStore.concat(
+            rag._ingest_kiwi_file(path)[0] for path in sorted(data_dir.glob("*.json")))
+    legacy = list(store)
+    n = len(store)
+
+    row = {"chunks": n, "parents": store.n_parents}
+    for name, obj in (("legacy", legacy), ("store", store)):
+        payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        row[f"{name}_pickle"] = len(payload)
+        row[f"{name}_bytes_per_chunk"] = loaded_bytes(payload) / n
+        row[f"{name}_unpickle_ms"] = best_time(lambda: pickle.loads(payload), repeat) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        row["legacy_disk"] = sum(
+            len(json.dumps(chunk, ensure_ascii=False).encode("utf-8")) + 1 for chunk in legacy)
+        row["store_disk"] = sum((Path(tmp) / filename).stat().st_size
+                                for filename in store.save(tmp))
+        mapped = MappedChunkStore(tmp)
+        assert list(mapped) == legacy, "Vues du store mappé différentes des chunks"
+        picks = [random.randrange(n) for _ in range(1000)]
+        row["view_us"] = best_time(lambda: [mapped[i] for i in picks], repeat) * 1e6 / len(picks)
+        del mapped
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunks: liste de dicts vs ChunkStore")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=str(API_DIR / "data"))
+    args = parser.parse_args()
+
+    os.environ.setdefault("CLAUDE_API_KEY", "bench-key")
+    from kiwi_rag_advanced import AdvancedKiwiRAG
+
+    # Traitement sans état: pas besoin des clients Claude ni de l'index
+    rag = AdvancedKiwiRAG.__new__(AdvancedKiwiRAG)
+    random.seed(0)
+
+    print(f"{'échelle':>7} | {'chunks':>7} | {'format':>8} | {'pickle (KB)':>11} | "
+          f"{'octets/chunk':>12} | {'dépickle (ms)':>13} | {'disque (KB)':>11} | {'vue (µs)':>8}")
+    print("-" * 97)
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "data"
+            build_scaled_data_dir(Path(args.data_dir).resolve(), data_dir, scale)
+            row = measure(rag, data_dir, args.repeat)
+        for name, label in (("legacy", "dicts"), ("store", "colonnes")):
+            view = f"{row['view_us']:>8.1f}" if name == "store" else f"{'-':>8}"
+            print(f"{scale:>7} | {row['chunks']:>7} | {label:>8} | "
+                  f"{row[name + '_pickle'] / 1024:>11.0f} | "
+                  f"{row[name + '_bytes_per_chunk']:>12.0f} | "
+                  f"{row[name + '_unpickle_ms']:>13.1f} | "
+                  f"{row[name + '_disk'] / 1024:>11.0f} | {view}")
+
+
+if __name__ == "__main__":
+    main()
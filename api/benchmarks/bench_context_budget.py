@@ -0,0 +1,86 @@
+"""Taille du contexte envoyé à Claude: ancienne concaténation vs budget de tokens.
+
+Pour chaque question étiquetée (retrieval_questions.json), les résultats du
+chemin de production sont mis en forme par l'ancienne concaténation des
+contenus complets, puis par build_context pour chaque `--budget`. On mesure
+les tokens estimés du contexte (moyenne, p95, max), le nombre de chunks
+gardés, et la couverture: part des questions dont un chunk pertinent
+retrouvé figure encore dans le contexte.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_context_budget --budget 500 1000 1500 3000
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+os.environ.setdefault("CLAUDE_API_KEY", "bench-key")
+
+from benchmarks.bench_search_latency import load_base_index
+from benchmarks.retrieval_eval import DEFAULT_QUESTIONS, is_relevant, relevance_labels
+from context_builder import build_context
+from faq_index import normalize_question
+from metrics import estimate_tokens
+
+
+def legacy_context(results: list) -> str:
+    """Mise en forme d'avant le budget: contenu complet de chaque chunk"""
+    context_parts = []
+    for doc, score in results:
+        kiwi_info = f"Source: {doc['source']} | Type: {doc.get('type', 'N/A')} | Score: {score:.3f}"
+        if doc.get('category'):
+            kiwi_info += f" | Catégorie: {doc['category']}"
+        if doc.get('legal_category'):
+            kiwi_info += f" | Domaine juridique: {doc['legal_category']}"
+        if doc.get('rse_category'):
+            kiwi_info += f" | Domaine RSE: {doc['rse_category']}"
+        context_parts.extend([kiwi_info, f"Contenu: {doc['content']}", "---"])
+    return "\n".join(context_parts)
+
+
+def covered(context: str, results: list, snippets: list) -> bool:
+    """Vrai si un extrait pertinent retrouvé par la recherche est dans le contexte"""
+    normalized = normalize_question(context)
+    return any(snippet in normalized for doc, _ in results if is_relevant(doc, snippets)
+               for snippet in snippets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contexte: concaténation complète vs budget")
+    parser.add_argument("--budget", type=int, nargs="+", default=[500, 1000, 1500, 3000])
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS))
+    args = parser.parse_args()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        labelled = json.load(f)
+    rag = load_base_index()
+
+    searches = []
+    for question, snippets, _ in relevance_labels(rag.index, labelled):
+        results = rag._search_smart_results(question, rag._detect_query_type(question))
+        searches.append((results, snippets))
+
+    rows = []
+    contexts = [legacy_context(results) for results, _ in searches]
+    rows.append(("complet", contexts, [len(results) for results, _ in searches]))
+    for budget in args.budget:
+        built = [build_context(results, budget) for results, _ in searches]
+        rows.append((str(budget), [context for context, _ in built],
+                     [report["documents"] for _, report in built]))
+
+    print(f"\n{'budget':>8} | {'tokens moy.':>11} | {'p95':>6} | {'max':>6} | "
+          f"{'chunks moy.':>11} | {'couverture':>10}")
+    print("-" * 68)
+    for label, contexts, documents in rows:
+        tokens = [estimate_tokens(context) for context in contexts]
+        coverage = np.mean([covered(context, results, snippets)
+                            for context, (results, snippets) in zip(contexts, searches)])
+        print(f"{label:>8} | {np.mean(tokens):>11.0f} | {np.percentile(tokens, 95):>6.0f} | "
+              f"{max(tokens):>6} | {np.mean(documents):>11.2f} | {coverage:>10.3f}")
+    print(f"\n{len(searches)} questions étiquetées")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Réponses FAQ sans appel à Claude: justesse des réponses servies, appels évités, latence p50.
+
+Jeu de questions:
+- reformulations, dont la bonne réponse est connue: les questions étiquetées
+  (retrieval_questions.json) dont un extrait pertinent est une FAQ, et
+  `--variants` questions de la FAQ amputées d'un mot;
+- négatives, qui ne doivent jamais recevoir une réponse FAQ: questions hors
+  FAQ (OFF_TOPIC) et quasi-homonymes tirés de la FAQ, à une négation près
+  ("doit" / "ne doit pas") ou avec un qualificatif ("intervenant mineur").
+
+Chaque question passe par ask_kiwi_advanced_async contre le stub local
+(`--delay` secondes par appel Claude, cache de réponses désactivé), avec puis
+sans la réponse depuis la recherche (faq_search). Une réponse FAQ est juste
+si le texte servi est la réponse d'une FAQ attendue.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_faq_fast_path --delay 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+# Pas d'import de retrieval_eval: il charge config avant que CLAUDE_BASE_URL pointe sur le stub
+DEFAULT_QUESTIONS = Path(__file__).with_name("retrieval_questions.json")
+
+OFF_TOPIC = [
+    "comment créer une JE",
+    "que faire si mon client ne paie pas ?",
+    "comment recruter un nouveau président",
+    "Comment on fait pour être payé en tant qu'intervenant ?",
+    "Quelles Junior-Entreprises sont à Lyon ?",
+    "Qu'est-ce que la RSE ?",
+    "Comment organiser l'audit de la CNJE ?",
+    "Quel est le rôle du trésorier ?",
+    "Comment rédiger une convention d'étude ?",
+    "Comment trouver des clients pour ma Junior ?",
+    "Combien coûte l'adhésion à la CNJE ?",
+    "Quelles sont les obligations RGPD d'une Junior ?",
+    "Comment réduire l'empreinte carbone de la Junior ?",
+]
+
+# Ajout d'une négation au premier verbe reconnu
+NEGATIONS = [(" peut ", " ne peut pas "), (" doit ", " ne doit pas "), ("Peut-on ", "Ne peut-on pas "),
+             ("Doit-on ", "Ne doit-on pas "), (" faut-il ", " ne faut-il pas ")]
+
+
+def near_misses(question: str) -> list:
+    """Variantes de sens différent: négation ajoutée ou retirée, qualificatif ajouté"""
+    variants = []
+    if re.search(r"\bne\b", question) and " pas " in question:
+        variants.append(re.sub(r"\bne\s+", "", question, count=1).replace(" pas ", " ", 1))
+    else:
+        for plain, negated in NEGATIONS:
+            if plain in question:
+                variants.append(question.replace(plain, negated, 1))
+                break
+    if " intervenant " in question:
+        variants.append(question.replace(" intervenant ", " intervenant mineur ", 1))
+    return variants
+
+
+def build_questions(rag, labelled: list, n_variants: int, seed: int = 0) -> tuple:
+    """([(reformulation, réponses attendues)], [question négative])"""
+    from benchmarks.retrieval_eval import is_relevant
+    from faq_index import normalize_question
+
+    faqs = [doc for doc in rag.index.documents if doc.get("type") == "faq" and doc.get("answer")]
+    paraphrases = []
+    for item in labelled:
+        snippets = [normalize_question(s) for s in item["relevant"]]
+        expected = {doc["answer"] for doc in faqs if is_relevant(doc, snippets)}
+        if expected:
+            paraphrases.append((item["question"], expected))
+
+    # Une même question peut figurer plusieurs fois dans la FAQ, avec des réponses rédigées autrement
+    answers = {}
+    for doc in faqs:
+        answers.setdefault(normalize_question(doc["question"]), set()).add(doc["answer"])
+    rng = random.Random(seed)
+    for doc in rng.sample(faqs, min(n_variants, len(faqs))):
+        words = doc["question"].split()
+        if len(words) > 4:
+            del words[rng.randrange(1, len(words))]
+            paraphrases.append((" ".join(words), answers[normalize_question(doc["question"])]))
+
+    negatives = list(OFF_TOPIC)
+    for question in sorted({doc["question"] for doc in faqs}):
+        negatives.extend(near_misses(question))
+    return paraphrases, negatives
+
+
+async def run(rag, questions: list) -> list:
+    """[(question, résultat, ms)]"""
+    results = []
+    for question in questions:
+        start = time.perf_counter()
+        result = await rag.ask_kiwi_advanced_async(question)
+        results.append((question, result, (time.perf_counter() - start) * 1000))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réponses FAQ sans appel à Claude")
+    parser.add_argument("--delay", type=float, default=1.0, help="Durée simulée d'un appel Claude (s)")
+    parser.add_argument("--variants", type=int, default=60)
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS))
+    args = parser.parse_args()
+
+    stub = StubLLMServer(delay=args.delay, token_interval=0.0).start()
+    os.environ["CLAUDE_BASE_URL"] = stub.url
+    os.environ.setdefault("CLAUDE_API_KEY", "stub-key")
+    os.environ["ANSWER_CACHE_BACKEND"] = "none"
+
+    # Import après configuration de l'environnement (config lu à l'import)
+    import kiwi_rag_advanced
+    from benchmarks.bench_search_latency import load_base_index
+
+    rag = load_base_index()
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        paraphrases, negatives = build_questions(rag, json.load(f), args.variants)
+    print(f"\n{len(paraphrases)} reformulations, {len(negatives)} questions négatives")
+
+    print(f"\n{'faq_search':>10} | {'Claude':>6} | {'reform. servies':>15} | {'justes':>6} | "
+          f"{'négatives servies':>17} | {'p50 (ms)':>8} | {'moy. (ms)':>9} | {'p50 FAQ (ms)':>12}")
+    print("-" * 105)
+    for enabled in (True, False):
+        # config est importé par `from config import *`: la valeur lue est celle du module
+        kiwi_rag_advanced.FAQ_SEARCH_ANSWER_ENABLED = enabled
+        stub.reset()
+        served = asyncio.run(run(rag, [question for question, _ in paraphrases]))
+        wrong = asyncio.run(run(rag, negatives))
+        latencies = [ms for _, _, ms in served + wrong]
+        faq_ms = [ms for _, result, ms in served + wrong if result["status"] == "faq_search"]
+
+        from_faq = [(result, expected) for (_, result, _), (_, expected)
+                    in zip(served, paraphrases) if result["status"].startswith("faq_")]
+        negative_hits = [(question, result) for question, result, _ in wrong
+                         if result["status"].startswith("faq_")]
+        print(f"{'activé' if enabled else 'désactivé':>10} | {len(stub.requests):>6} | "
+              f"{len(from_faq):>11}/{len(paraphrases):<3} | "
+              f"{sum(result['answer'] in expected for result, expected in from_faq):>6} | "
+              f"{len(negative_hits):>13}/{len(negatives):<3} | "
+              f"{np.percentile(latencies, 50):>8.1f} | {np.mean(latencies):>9.1f} | "
+              f"{np.percentile(faq_ms, 50) if faq_ms else 0.0:>12.2f}")
+        for question, result in negative_hits:
+            print(f"   ⚠️ {result['status']}: {question!r}")
+        statuses = Counter(result["status"] for _, result, _ in served + wrong)
+        print(f"   statuts: {dict(statuses)}")
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
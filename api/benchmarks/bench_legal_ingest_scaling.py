@@ -0,0 +1,70 @@
+"""Temps d'ingestion de kiwi-legal-all.json en fonction de la taille du fichier.
+
+Les pages du fichier sont répliquées `--scale` fois; pour chaque taille on
+mesure (meilleur de `--repeat`) la lecture + extraction + découpage, et la
+détection du type par contenu (nom de fichier ambigu), comparée à l'ancien
+str(data)[:1000] qui sérialisait tout le fichier. Un temps par Mo constant
+indique une ingestion linéaire.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_legal_ingest_scaling --scale 1 2 4 8 16
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_streaming_ingest import LEGAL_FILE, build_large_legal_file
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion de kiwi-legal-all.json selon sa taille")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", default=str(API_DIR / "data"))
+    args = parser.parse_args()
+
+    os.environ.setdefault("CLAUDE_API_KEY", "bench-key")
+    from kiwi_rag_advanced import AdvancedKiwiRAG
+
+    # Traitement sans état: pas besoin des clients Claude ni de l'index
+    rag = AdvancedKiwiRAG.__new__(AdvancedKiwiRAG)
+
+    rows = []
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"copie_{LEGAL_FILE}"
+            build_large_legal_file(Path(args.data_dir) / LEGAL_FILE, path, scale)
+            size_mb = path.stat().st_size / 1024 / 1024
+            n_chunks = len(rag.create_advanced_chunks(rag._process_kiwi_file(path)))
+            ingest = best_time(
+                lambda: rag.create_advanced_chunks(rag._process_kiwi_file(path)), args.repeat)
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        detect = best_time(lambda: rag._detect_kiwi_file_type("ambigu.json", data), args.repeat)
+        legacy_detect = best_time(lambda: str(data)[:1000], args.repeat)
+        rows.append((scale, size_mb, n_chunks, ingest, detect, legacy_detect))
+
+    print(f"\n{'échelle':>7} | {'fichier (MB)':>12} | {'chunks':>7} | {'ingestion (s)':>13} | "
+          f"{'s / MB':>7} | {'détection (ms)':>14} | {'str(data) (ms)':>14}")
+    print("-" * 92)
+    for scale, size_mb, n_chunks, ingest, detect, legacy_detect in rows:
+        print(f"{scale:>7} | {size_mb:>12.1f} | {n_chunks:>7} | {ingest:>13.3f} | "
+              f"{ingest / size_mb:>7.3f} | {detect * 1000:>14.3f} | {legacy_detect * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
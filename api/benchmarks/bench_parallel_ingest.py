@@ -0,0 +1,97 @@
+"""Ingestion à froid (lecture + découpage de tous les fichiers) selon le nombre de processus.
+
+Chaque mesure tourne dans un sous-processus dédié, sans cache d'ingestion,
+sur le corpus api/data répliqué `--scale` fois. Le seuil
+INGEST_PARALLEL_MIN_BYTES est désactivé pour mesurer le pool même sur un
+petit corpus. Vérifie aussi que les chunks produits sont identiques (même
+contenu, même ordre) quel que soit le nombre de processus.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_parallel_ingest --scale 5 20 --workers 1 2 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_reindex_memory import build_scaled_data_dir
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def run_child():
+    """Exécuté dans le sous-processus: ingestion complète, durées et empreinte des chunks"""
+    from kiwi_rag_advanced import AdvancedKiwiRAG
+
+    rag = AdvancedKiwiRAG()
+    start = time.perf_counter()
+    file_chunks, _, report = rag.load_kiwi_chunks_incremental()
+    seconds = time.perf_counter() - start
+
+    chunks = [chunk for parts in file_chunks.values() for chunk in parts]
+    digest = hashlib.sha256(
+        json.dumps(chunks, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    print(json.dumps({
+        "workers": report["workers"],
+        "files": len(file_chunks),
+        "chunks": len(chunks),
+        "seconds": round(seconds, 3),
+        "slowest_file_s": max(
+            (t["load_s"] + t["chunk_s"] for t in report["files"].values() if not t["cached"]),
+            default=0.0),
+        "digest": digest[:16]
+    }))
+
+
+def measure(workers: int, data_dir: Path) -> dict:
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = {**os.environ, "DATA_DIR": str(data_dir),
+               "CLAUDE_API_KEY": os.environ.get("CLAUDE_API_KEY", "bench-key"),
+               "INGEST_CACHE_PATH": str(Path(work_dir) / "ingest_cache.pkl"),
+               "INGEST_WORKERS": str(workers),
+               "INGEST_PARALLEL_MIN_BYTES": "1",
+               "PYTHONPATH": str(API_DIR)}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_parallel_ingest", "--child"],
+            cwd=work_dir, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion à froid selon le nombre de processus")
+    parser.add_argument("--scale", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--data-dir", default=str(API_DIR / "data"))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    print(f"🖥️ CPU disponibles: {os.cpu_count()}")
+    print(f"{'échelle':>7} | {'processus':>9} | {'fichiers':>8} | {'chunks':>7} | "
+          f"{'durée (s)':>9} | {'accélération':>12} | {'empreinte':>16}")
+    print("-" * 86)
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "data"
+            build_scaled_data_dir(Path(args.data_dir).resolve(), data_dir, scale)
+            runs = [measure(workers, data_dir) for workers in args.workers]
+        baseline = runs[0]["seconds"]
+        for run in runs:
+            print(f"{scale:>7} | {run['workers']:>9} | {run['files']:>8} | {run['chunks']:>7} | "
+                  f"{run['seconds']:>9.2f} | {baseline / run['seconds']:>11.2f}x | "
+                  f"{run['digest']:>16}")
+        if len({run["digest"] for run in runs}) > 1:
+            print("⚠️ Chunks différents selon le nombre de processus")
+
+
+if __name__ == "__main__":
+    main()
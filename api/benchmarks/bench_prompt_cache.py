@@ -0,0 +1,121 @@
+"""Prompt caching: forme des requêtes Claude et tokens lus/écrits en cache.
+
+Pose les questions étiquetées (retrieval_questions.json) via ask_kiwi_advanced
+contre le stub local (cache de réponses désactivé), en synchrone puis en
+streaming, et vérifie sur chaque requête reçue par le stub:
+- en-tête anthropic-beta de prompt caching;
+- `system` en blocs, le dernier marqué cache_control, identique pour un même
+  type de requête;
+- message utilisateur limité au contexte et à la question.
+
+Affiche ensuite les tokens d'entrée non cachés, écrits et lus en cache, tels
+que renvoyés dans `llm_usage` et comptés par kiwi_llm_tokens_total. Le stub
+met en cache tout préfixe marqué; l'API réelle ignore les préfixes sous son
+minimum (2048 tokens pour Claude 3 Haiku, 1024 pour Sonnet/Opus), d'où
+l'affichage de la taille des préfixes.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_prompt_cache
+"""
+import argparse
+import asyncio
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+# Pas d'import de retrieval_eval: il charge config avant que CLAUDE_BASE_URL pointe sur le stub
+DEFAULT_QUESTIONS = Path(__file__).with_name("retrieval_questions.json")
+
+
+def check_request(request: dict, question: str, prefixes: dict, query_type: str) -> list:
+    """Écarts de forme d'une requête reçue par le stub (liste vide si conforme)"""
+    from config import PROMPT_CACHE_BETA
+
+    errors = []
+    body = request["body"]
+    headers = {key.lower(): value for key, value in request["headers"].items()}
+    if PROMPT_CACHE_BETA not in headers.get("anthropic-beta", ""):
+        errors.append("en-tête anthropic-beta absent")
+    system = body.get("system")
+    if not isinstance(system, list) or not system[-1].get("cache_control"):
+        errors.append("system sans bloc cache_control")
+    elif prefixes.setdefault(query_type, system) != system:
+        errors.append(f"préfixe système variable pour le type {query_type}")
+    user = body["messages"][-1]["content"]
+    if question not in user or "INSTRUCTIONS EXPERTES" in user:
+        errors.append("message utilisateur hors contexte + question")
+    return errors
+
+
+async def ask_all(api, questions: list, stream: bool) -> list:
+    results = []
+    for question in questions:
+        if stream:
+            async for event in api.kiwi_ai.stream_kiwi_advanced(question):
+                if event["event"] == "done":
+                    results.append(event["data"])
+        else:
+            results.append(await api.kiwi_ai.ask_kiwi_advanced_async(question))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forme des requêtes et prompt caching")
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS))
+    args = parser.parse_args()
+
+    stub = StubLLMServer(delay=0.0, token_interval=0.0).start()
+    os.environ["CLAUDE_BASE_URL"] = stub.url
+    os.environ.setdefault("CLAUDE_API_KEY", "stub-key")
+    os.environ["ANSWER_CACHE_BACKEND"] = "none"
+    # Chaque question étiquetée doit produire une requête Claude
+    os.environ["FAQ_SEARCH_ANSWER_ENABLED"] = "false"
+
+    # Import après configuration de l'environnement (config lu à l'import)
+    import main_kiwi_advanced as api
+    from metrics import LLM_TOKENS
+
+    if not api.kiwi_ai._load_advanced_index():
+        api.kiwi_ai.index_documents_advanced()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    prefixes = {}
+    for stream in (False, True):
+        stub.reset()
+        results = asyncio.run(ask_all(api, questions, stream))
+        # Appels séquentiels: les requêtes du stub suivent l'ordre des questions
+        called = [(question, result) for question, result in zip(questions, results)
+                  if result.get("llm_usage")]
+        errors = Counter()
+        for request, (question, _) in zip(stub.requests, called):
+            errors.update(check_request(
+                request, question, prefixes, api.kiwi_ai._detect_query_type(question)))
+
+        totals = Counter()
+        for _, result in called:
+            totals.update(result["llm_usage"])
+        total_input = (totals["input_tokens"] + totals["cache_read_input_tokens"]
+                       + totals["cache_creation_input_tokens"])
+        statuses = Counter(result["status"] for result in results)
+        print(f"\n📨 {'Streaming' if stream else 'Synchrone'}: {len(stub.requests)} appels Claude, "
+              f"statuts {dict(statuses)}")
+        print(f"   - Forme des requêtes: {'conforme' if not errors else dict(errors)}")
+        print(f"   - Tokens d'entrée: {total_input} dont {totals['cache_read_input_tokens']} "
+              f"lus en cache, {totals['cache_creation_input_tokens']} écrits, "
+              f"{totals['input_tokens']} non cachés "
+              f"({totals['cache_read_input_tokens'] / max(total_input, 1):.0%} lus en cache)")
+
+    sizes = {query_type: len(json.dumps(system, sort_keys=True)) // 4
+             for query_type, system in prefixes.items()}
+    print(f"\n📏 Préfixe système par type (tokens estimés): {sizes}")
+    print("📈 " + "\n   ".join(LLM_TOKENS.samples()))
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Pic mémoire (RSS) d'une réindexation: pipeline creux float32 vs ancien pipeline dense.
+
+Chaque mesure tourne dans un sous-processus dédié (ru_maxrss est un pic par
+processus). Le corpus api/data peut être répliqué `--scale` fois dans un
+dossier temporaire pour simuler un DATA_DIR plus gros.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_reindex_memory --scale 1 5 10
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def build_scaled_data_dir(source_dir: Path, target_dir: Path, scale: int):
+    """Copie chaque fichier `scale` fois (préfixe copieN_ pour garder la détection de type)"""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for json_file in source_dir.glob("*.json"):
+        for n in range(scale):
+            shutil.copy(json_file, target_dir / f"copie{n}_{json_file.name}")
+
+
+def run_child(mode: str):
+    """Exécuté dans le sous-processus: réindexe puis affiche le pic RSS en JSON"""
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    from kiwi_rag_advanced import AdvancedKiwiRAG
+
+    rag = AdvancedKiwiRAG()
+    start = time.perf_counter()
+
+    if mode == "current":
+        rag.index_documents_advanced()
+        n_chunks = len(rag.index.documents)
+    else:
+        # Reproduction de l'ancien pipeline: float64 et densification avant SVD
+        chunks = rag.create_advanced_chunks(rag.load_and_process_all_kiwi_data())
+        vectorizer = TfidfVectorizer(
+            max_features=5000, ngram_range=(1, 3), min_df=2, max_df=0.8,
+            analyzer='word', lowercase=True)
+        doc_vectors = vectorizer.fit_transform(
+            [chunk.get("search_content", chunk["content"]) for chunk in chunks])
+        n_components = min(300, min(doc_vectors.shape) - 1)
+        TruncatedSVD(n_components=n_components, random_state=42).fit_transform(
+            doc_vectors.toarray())
+        n_chunks = len(chunks)
+
+    print(json.dumps({
+        "mode": mode,
+        "chunks": n_chunks,
+        "seconds": round(time.perf_counter() - start, 2),
+        "peak_rss_mb": round(AdvancedKiwiRAG._peak_rss_mb(), 1)
+    }))
+
+
+def measure(mode: str, data_dir: Path, work_dir: Path) -> dict:
+    env = {**os.environ, "DATA_DIR": str(data_dir),
+           "CLAUDE_API_KEY": os.environ.get("CLAUDE_API_KEY", "bench-key"),
+           "PYTHONPATH": str(API_DIR)}
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_reindex_memory", "--child", mode],
+        cwd=work_dir, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pic mémoire d'une réindexation")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--child", choices=["current", "legacy"],
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    print(f"{'échelle':>7} | {'chunks':>7} | {'ancien RSS':>10} | {'actuel RSS':>10} | "
+          f"{'ancien (s)':>10} | {'actuel (s)':>10}")
+    print("-" * 70)
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "data"
+            build_scaled_data_dir(API_DIR / "data", data_dir, scale)
+            legacy = measure("legacy", data_dir, Path(tmp))
+            current = measure("current", data_dir, Path(tmp))
+        print(f"{scale:>7} | {current['chunks']:>7} | "
+              f"{legacy['peak_rss_mb']:>8.0f}MB | {current['peak_rss_mb']:>8.0f}MB | "
+              f"{legacy['seconds']:>10.1f} | {current['seconds']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
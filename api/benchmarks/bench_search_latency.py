@@ -0,0 +1,113 @@
+"""Latence de search_advanced (p50/p99) en fonction de la taille du corpus.
+
+Le corpus réel (api/data) est indexé puis répliqué avec un léger bruit pour
+simuler des corpus plus grands. Compare la recherche actuelle (vecteurs
+prénormalisés float32 + argpartition) à l'ancienne (cosine_similarity +
+argsort complet).
+
+Usage (depuis api/):
+    python -m benchmarks.bench_search_latency --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("CLAUDE_API_KEY", "bench-key")
+
+from sklearn.metrics.pairwise import cosine_similarity
+
+from config import MAX_CONTEXT_DOCS
+from index_snapshot import KiwiIndexSnapshot
+from kiwi_rag_advanced import AdvancedKiwiRAG
+
+QUESTIONS = [
+    ("Comment créer une junior entreprise ?", ["faq"], ["general"]),
+    ("Quelles cotisations URSSAF pour une étude ?", ["legal_site"],
+     ["contrats", "statuts", "comptabilite"]),
+    ("Junior entreprise informatique à Lyon", ["junior_entreprises"], ["general"]),
+    ("Bilan carbone et démarche RSE", ["rse_formation"],
+     ["environnement", "social", "gouvernance"]),
+    ("Rédiger une convention d'étude", None, None),
+]
+
+
+def legacy_search(rag, query, preferred_types=None, boost_categories=None):
+    """Ancienne recherche: renormalisation complète + tri complet"""
+    index = rag.index
+    query_reduced = index.svd.transform(index.vectorizer.transform([query]))
+    similarities = cosine_similarity(query_reduced, index.reduced_vectors)[0]
+    if preferred_types or boost_categories:
+        similarities = rag._apply_search_boosts(
+            similarities, preferred_types, boost_categories)
+    top_indices = np.argsort(similarities)[::-1][:MAX_CONTEXT_DOCS * 2]
+    results = [(index.documents[i], similarities[i])
+               for i in top_indices if similarities[i] > 0.1]
+    return results[:MAX_CONTEXT_DOCS]
+
+
+def load_base_index() -> AdvancedKiwiRAG:
+    rag = AdvancedKiwiRAG()
+    if not rag._load_advanced_index():
+        rag.index_documents_advanced()
+    return rag
+
+
+def base_corpus(rag: AdvancedKiwiRAG) -> dict:
+    index = rag.index
+    return {"documents": list(index.documents),
+            "reduced_vectors": np.asarray(index.reduced_vectors),
+            "vectorizer": index.vectorizer, "svd": index.svd}
+
+
+def scale_index(rag: AdvancedKiwiRAG, base: dict, n_chunks: int, seed: int = 0):
+    """Réplique le corpus de base jusqu'à n_chunks avec un bruit gaussien"""
+    rng = np.random.default_rng(seed)
+    n_base = len(base["documents"])
+    indices = np.arange(n_chunks) % n_base
+    noise = rng.normal(0, base["reduced_vectors"].std() * 0.05,
+                       (n_chunks, base["reduced_vectors"].shape[1]))
+
+    rag.index = KiwiIndexSnapshot(
+        [base["documents"][i] for i in indices],
+        base["vectorizer"], base["svd"], None,
+        base["reduced_vectors"][indices] + noise).finalize()
+
+
+def measure(search, rag, iterations: int) -> np.ndarray:
+    latencies = []
+    for i in range(iterations):
+        query, types, categories = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        search(query, types, categories)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de recherche vs taille du corpus")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    rag = load_base_index()
+    base = base_corpus(rag)
+
+    print(f"\n{'chunks':>8} | {'actuel p50':>10} | {'actuel p99':>10} | "
+          f"{'ancien p50':>10} | {'ancien p99':>10}   (ms)")
+    print("-" * 64)
+    for n_chunks in args.sizes:
+        scale_index(rag, base, n_chunks)
+        current = measure(rag.search_advanced, rag, args.iterations)
+        legacy = measure(
+            lambda q, t, c: legacy_search(rag, q, t, c), rag, args.iterations)
+        print(f"{n_chunks:>8} | {np.percentile(current, 50):>10.2f} | "
+              f"{np.percentile(current, 99):>10.2f} | "
+              f"{np.percentile(legacy, 50):>10.2f} | "
+              f"{np.percentile(legacy, 99):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Cache sémantique: hits sur reformulations, faux hits, appels Claude évités.
+
+Charge de travail tirée de la FAQ (vérité terrain: la question d'origine):
+- `--popular` questions posées une première fois (réponse de Claude mise en cache);
+- deux reformulations de chacune (un mot retiré; minuscules sans ponctuation
+  avec formule de politesse), qui devraient être servies par le cache;
+- toutes les autres questions de la FAQ, distinctes, qui ne doivent jamais
+  l'être (dont les gabarits "Comment régulariser une erreur sur ...");
+- des quasi-homonymes des questions populaires, à une négation ou un
+  qualificatif près (NEAR_MISSES et near_misses()), qui ne doivent pas
+  l'être non plus.
+
+Les réponses directes FAQ (faq_direct, faq_search) sont désactivées pour que
+ces questions atteignent Claude (stub local, `--delay` secondes par appel).
+Passes: cache exact seul, cache sémantique, cache sémantique audité à 100 %.
+Un hit est faux si la question en cache a une autre origine.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_semantic_cache --delay 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.bench_faq_fast_path import near_misses
+from benchmarks.stub_llm_server import StubLLMServer
+
+# (question posée d'abord, question de sens différent posée ensuite)
+NEAR_MISSES = [
+    ("Une Junior en franchise de base doit facturer la TVA ?",
+     "Une Junior en franchise de base ne doit pas facturer la TVA ?"),
+    ("Quelles démarches pour un intervenant étranger ?",
+     "Quelles démarches pour un intervenant étranger sans titre de séjour ?"),
+    ("Peut-on rémunérer un intervenant ?", "Peut-on rémunérer un intervenant mineur ?"),
+]
+
+
+def build_workload(rag, n_popular: int, seed: int = 0) -> tuple:
+    """(questions populaires, reformulations, questions distinctes, origine de chaque question)
+
+    Les questions distinctes comprennent les quasi-homonymes des questions populaires.
+    """
+    from answer_cache import AnswerCache
+
+    rng = random.Random(seed)
+    by_key = {}
+    for doc in rag.index.documents:
+        if doc.get("type") == "faq" and doc.get("question"):
+            by_key.setdefault(AnswerCache.normalize_question(doc["question"]), doc["question"])
+    faqs = sorted(by_key.values())
+    popular = rng.sample(faqs, min(n_popular, len(faqs)))
+    distinct = [question for question in faqs if question not in popular]
+    distinct += [variant for question in popular for variant in near_misses(question)]
+    popular += [question for question, _ in NEAR_MISSES]
+    distinct += [variant for _, variant in NEAR_MISSES]
+
+    origin = {question: question for question in faqs + popular + distinct}
+    paraphrases = []
+    for question in popular:
+        words = question.rstrip(" ?").split()
+        variants = ["Bonjour, " + AnswerCache.normalize_question(question) + " svp"]
+        if len(words) > 3:
+            del words[rng.randrange(1, len(words))]
+            variants.append(" ".join(words) + " ?")
+        for variant in variants:
+            origin.setdefault(variant, question)
+            paraphrases.append(variant)
+    return popular, paraphrases, distinct, origin
+
+
+async def run(rag, questions: list) -> list:
+    results = []
+    for question in questions:
+        start = time.perf_counter()
+        result = await rag.ask_kiwi_advanced_async(question)
+        results.append((question, result, (time.perf_counter() - start) * 1000))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache sémantique des réponses")
+    parser.add_argument("--delay", type=float, default=0.2, help="Durée simulée d'un appel Claude (s)")
+    parser.add_argument("--popular", type=int, default=40)
+    args = parser.parse_args()
+
+    stub = StubLLMServer(delay=args.delay, token_interval=0.0).start()
+    os.environ["CLAUDE_BASE_URL"] = stub.url
+    os.environ.setdefault("CLAUDE_API_KEY", "stub-key")
+    os.environ["ANSWER_CACHE_BACKEND"] = "memory"
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "true"  # Désactivé par défaut
+
+    # Import après configuration de l'environnement (config lu à l'import)
+    import kiwi_rag_advanced
+    from answer_cache import create_answer_cache, create_semantic_cache
+    from benchmarks.bench_search_latency import load_base_index
+
+    # config est importé par `from config import *`: la valeur lue est celle du module
+    kiwi_rag_advanced.FAQ_SEARCH_ANSWER_ENABLED = False
+
+    rag = load_base_index()
+    rag._faq_direct_match = lambda question: None
+    popular, paraphrases, distinct, origin = build_workload(rag, args.popular)
+    print(f"\n{len(popular)} questions populaires, {len(paraphrases)} reformulations, "
+          f"{len(distinct)} questions distinctes")
+
+    print(f"\n{'cache':>17} | {'Claude':>6} | {'hits reform.':>12} | {'hits distinctes':>15} | "
+          f"{'faux hits':>9} | {'suspects':>8} | {'p50 hit (ms)':>12} | {'p50 Claude (ms)':>15}")
+    print("-" * 118)
+    for label, semantic, audit_rate in (("exact seul", False, 0.0),
+                                        ("sémantique", True, 0.0),
+                                        ("sémantique+audit", True, 1.0)):
+        rag.answer_cache = create_answer_cache()
+        rag.semantic_cache = create_semantic_cache()
+        if not semantic:
+            rag.semantic_cache.max_entries = 0
+        rag.semantic_cache.audit_rate = audit_rate
+        stub.reset()
+
+        asyncio.run(run(rag, popular))
+        replayed = asyncio.run(run(rag, paraphrases + distinct))
+        hits = {question: result for question, result, _ in replayed
+                if result["status"] == "semantic_cache"}
+        false_hits = [question for question, result in hits.items()
+                      if origin[result["cached_question"]] != origin[question]]
+        hit_ms = [ms for question, _, ms in replayed if question in hits]
+        llm_ms = [ms for _, result, ms in replayed if result.get("llm_usage")]
+        statuses = Counter(result["status"] for _, result, _ in replayed)
+        assert statuses["error"] == 0, statuses
+
+        print(f"{label:>17} | {len(stub.requests):>6} | "
+              f"{sum(q in hits for q in paraphrases):>8}/{len(paraphrases):<3} | "
+              f"{sum(q in hits for q in distinct):>11}/{len(distinct):<3} | "
+              f"{len(false_hits):>9} | {rag.semantic_cache.verdicts['suspect']:>8} | "
+              f"{np.percentile(hit_ms, 50) if hit_ms else 0.0:>12.2f} | "
+              f"{np.percentile(llm_ms, 50) if llm_ms else 0.0:>15.1f}")
+        for question in false_hits:
+            print(f"   ⚠️ faux hit: {question!r} <- {hits[question]['cached_question']!r}")
+        if semantic:
+            stats = rag.semantic_cache.stats()
+            print(f"   hit_rate={stats['hit_rate']} guarded={stats['guarded']} "
+                  f"audits={stats['audits']} false_hit_rate={stats['false_hit_rate']}")
+
+    # Invalidation: une nouvelle version de l'index vide le cache
+    size = rag.semantic_cache.stats()["size"]
+    rag.semantic_cache.get(rag.index.version + 1, rag._query_unit(rag.index, popular[0]),
+                           frozenset(), "general")
+    print(f"\n🔄 Nouvelle version de l'index: {size} -> {rag.semantic_cache.stats()['size']} entrées")
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
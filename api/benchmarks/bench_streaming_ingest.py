@@ -0,0 +1,105 @@
+"""Pic mémoire de l'ingestion d'un gros fichier: json.load complet vs lecture en flux.
+
+Construit un faux scrape Kiwi Legal en répliquant `--scale` fois les pages
+de api/data/kiwi-legal-all.json, puis lit et découpe ce seul fichier dans
+un sous-processus dédié par mode (ru_maxrss est un pic par processus).
+Les chunks produits doivent être identiques dans les deux modes.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_streaming_ingest --scale 50 200
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+LEGAL_FILE = "kiwi-legal-all.json"
+
+
+def build_large_legal_file(source: Path, target: Path, scale: int):
+    """Pages répliquées `scale` fois, écrites une à une (sans tout garder en mémoire)"""
+    with open(source, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    pages = data["kiwi_legal_pages"]
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write('{\n  "kiwi_legal_pages": [\n')
+        for n in range(scale):
+            for i, page in enumerate(pages):
+                separator = "" if n == 0 and i == 0 else ",\n"
+                f.write(separator + json.dumps(page, ensure_ascii=False, indent=2))
+        f.write('\n  ],\n  "metadata": ')
+        json.dump(data.get("metadata", {}), f, ensure_ascii=False)
+        f.write('\n}\n')
+
+
+def run_child(path: str):
+    """Exécuté dans le sous-processus: lecture + découpage du fichier, pic RSS"""
+    from kiwi_rag_advanced import AdvancedKiwiRAG
+
+    rag = AdvancedKiwiRAG.__new__(AdvancedKiwiRAG)
+    baseline = AdvancedKiwiRAG._peak_rss_mb()
+    start = time.perf_counter()
+    chunks, timings = rag._ingest_kiwi_file(Path(path))
+    seconds = time.perf_counter() - start
+    peak_rss = AdvancedKiwiRAG._peak_rss_mb()  # Avant l'empreinte, qui sérialise tous les chunks
+
+    digest = hashlib.sha256(
+        json.dumps(list(chunks), sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    print(json.dumps({
+        "chunks": len(chunks),
+        "seconds": round(seconds, 2),
+        **timings,
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak_rss, 1),
+        "digest": digest[:16]
+    }))
+
+
+def measure(mode: str, path: Path, work_dir: str) -> dict:
+    env = {**os.environ,
+           "CLAUDE_API_KEY": os.environ.get("CLAUDE_API_KEY", "bench-key"),
+           # 0: toujours en flux; au-delà de la taille du fichier: json.load
+           "INGEST_STREAM_MIN_BYTES": "0" if mode == "stream" else str(path.stat().st_size + 1),
+           "PYTHONPATH": str(API_DIR)}
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_streaming_ingest", "--child", str(path)],
+        cwd=work_dir, env=env, capture_output=True, text=True, check=True).stdout
+    return {"mode": mode, **json.loads(output.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pic mémoire: json.load vs lecture en flux")
+    parser.add_argument("--scale", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--data-dir", default=str(API_DIR / "data"))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    print(f"{'échelle':>7} | {'fichier (MB)':>12} | {'mode':>6} | {'chunks':>7} | "
+          f"{'durée (s)':>9} | {'RSS initial':>11} | {'pic RSS (MB)':>12}")
+    print("-" * 83)
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"copie_{LEGAL_FILE}"
+            build_large_legal_file(Path(args.data_dir) / LEGAL_FILE, path, scale)
+            size_mb = path.stat().st_size / 1024 / 1024
+            runs = [measure(mode, path, tmp) for mode in ("full", "stream")]
+        for run in runs:
+            print(f"{scale:>7} | {size_mb:>12.1f} | {run['mode']:>6} | {run['chunks']:>7} | "
+                  f"{run['seconds']:>9.2f} | {run['baseline_rss_mb']:>11.0f} | "
+                  f"{run['peak_rss_mb']:>12.0f}")
+        if runs[0]["digest"] != runs[1]["digest"]:
+            print("⚠️ Chunks différents entre les deux modes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Suite de mesure recherche + latence, résultats JSON comparables entre deux runs.
+
+Pour chaque échelle du corpus api/data (fichiers répliqués `--scale` fois),
+un sous-processus dédié:
+  1. construit l'index complet (temps de construction, taille sur disque)
+  2. rejoue le fichier de questions étiqueté via search_advanced et
+     get_smart_context: recall@k, MRR, latences p50/p95/p99
+  3. rejoue les mêmes questions via ask_kiwi_advanced_async contre le
+     serveur stub Anthropic local (aucun appel réseau réel, cache désactivé)
+  4. relève le pic mémoire RSS du processus
+
+Les réglages influant sur la recherche (CHUNK_SIZE, composantes SVD, mode
+de recherche...) sont enregistrés avec les mesures pour diff entre runs.
+
+Usage (depuis api/):
+    python -m benchmarks.bench_suite --scale 1 5 --output bench_results.json
+    python -m benchmarks.bench_suite --questions mon_jeu.json --k 10 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_reindex_memory import build_scaled_data_dir
+from benchmarks.stub_llm_server import StubLLMServer
+
+API_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_QUESTIONS = Path(__file__).with_name("retrieval_questions.json")
+
+
+def percentiles(latencies: list) -> dict:
+    return {f"p{p}_ms": round(float(np.percentile(latencies, p)), 3) for p in (50, 95, 99)}
+
+
+def directory_size_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1024 / 1024
+
+
+def run_child(config: dict):
+    """Exécuté dans le sous-processus: construction, rejeu des questions, mesures"""
+    from benchmarks.retrieval_eval import rank_metrics, relevance_labels
+    from config import CHUNK_OVERLAP, CHUNK_SIZE, MAX_CONTEXT_DOCS, VECTOR_DB_PATH
+    from index_store import read_current_version
+    from kiwi_rag_advanced import AdvancedKiwiRAG
+
+    rag = AdvancedKiwiRAG()
+    start = time.perf_counter()
+    rag.index_documents_advanced()
+    build_seconds = time.perf_counter() - start
+    index = rag.index
+
+    with open(config["questions"], 'r', encoding='utf-8') as f:
+        labels = relevance_labels(index, json.load(f))
+    k = config["k"]
+
+    report = {
+        "chunks": len(index.documents),
+        "build_s": round(build_seconds, 3),
+        "index_size_mb": round(directory_size_mb(
+            Path(VECTOR_DB_PATH) / read_current_version(VECTOR_DB_PATH)), 2),
+        "settings": {
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "svd_components": int(index.reduced_vectors.shape[1]),
+            "max_context_docs": MAX_CONTEXT_DOCS,
+            "retrieval_mode": rag.retrieval_mode,
+            "fusion_method": rag.fusion_method,
+            "vector_index": index.vector_index.name
+        }
+    }
+
+    # Recherche brute (sans préférences) et contexte intelligent (type détecté)
+    paths = {
+        "search_advanced": lambda q: rag.search_advanced(q),
+        "smart_context": lambda q: rag._search_smart_results(q, "auto")
+    }
+    for name, search in paths.items():
+        recalls, reciprocal_ranks, latencies = [], [], []
+        for question, snippets, n_relevant in labels:
+            recall, reciprocal_rank = rank_metrics(search(question), snippets, n_relevant, k)
+            recalls.append(recall)
+            reciprocal_ranks.append(reciprocal_rank)
+        for _ in range(config["repeat"]):
+            for question, _, _ in labels:
+                call_start = time.perf_counter()
+                if name == "smart_context":
+                    rag.get_smart_context(question)
+                else:
+                    search(question)
+                latencies.append((time.perf_counter() - call_start) * 1000)
+        report[name] = {
+            f"recall@{k}": round(float(np.mean(recalls)), 4),
+            "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+            **percentiles(latencies)
+        }
+
+    # Question-réponse de bout en bout contre le stub (latence hors LLM)
+    async def replay_ask():
+        latencies, statuses = [], {}
+        for question, _, _ in labels:
+            call_start = time.perf_counter()
+            result = await rag.ask_kiwi_advanced_async(question)
+            latencies.append((time.perf_counter() - call_start) * 1000)
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        return {**percentiles(latencies), "statuses": statuses}
+
+    report["ask"] = asyncio.run(replay_ask())
+    report["peak_rss_mb"] = round(AdvancedKiwiRAG._peak_rss_mb() or 0.0, 1)
+    print(json.dumps(report))
+
+
+def measure(scale: int, args, stub_url: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        build_scaled_data_dir(Path(args.data_dir).resolve(), data_dir, scale)
+        env = {**os.environ, "DATA_DIR": str(data_dir),
+               "CLAUDE_API_KEY": os.environ.get("CLAUDE_API_KEY", "bench-key"),
+               "CLAUDE_BASE_URL": stub_url,
+               "ANSWER_CACHE_BACKEND": "none",
+               "INCREMENTAL_EMBEDDING": "false",
+               "PYTHONPATH": str(API_DIR)}
+        config = {"questions": str(Path(args.questions).resolve()),
+                  "k": args.k, "repeat": args.repeat}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_suite", "--child", json.dumps(config)],
+            cwd=tmp, env=env, capture_output=True, text=True, check=True).stdout
+    return {"scale": scale, **json.loads(output.strip().splitlines()[-1])}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de mesure recherche + latence")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 5],
+                        help="Réplications du corpus api/data")
+    parser.add_argument("--data-dir", default=str(API_DIR / "data"))
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS),
+                        help="Fichier JSON [{question, relevant: [extraits]}]")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Passes de mesure de latence par question")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(json.loads(args.child))
+        return
+
+    stub = StubLLMServer(delay=0.0).start()
+    try:
+        runs = [measure(scale, args, stub.url) for scale in args.scale]
+    finally:
+        stub.stop()
+
+    k = args.k
+    print(f"\n{'échelle':>7} | {'chunks':>7} | {'build (s)':>9} | {'index (MB)':>10} | "
+          f"{'RSS (MB)':>8} | {'recall@' + str(k):>8} | {'MRR':>6} | "
+          f"{'p50 (ms)':>8} | {'p95 (ms)':>8} | {'p99 (ms)':>8}")
+    print("-" * 104)
+    for run in runs:
+        search = run["smart_context"]
+        print(f"{run['scale']:>7} | {run['chunks']:>7} | {run['build_s']:>9.2f} | "
+              f"{run['index_size_mb']:>10.1f} | {run['peak_rss_mb']:>8.0f} | "
+              f"{search[f'recall@{k}']:>8.3f} | {search['mrr']:>6.3f} | "
+              f"{search['p50_ms']:>8.2f} | {search['p95_ms']:>8.2f} | {search['p99_ms']:>8.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "git_commit": git_commit(),
+                       "questions": args.questions, "k": k, "runs": runs},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
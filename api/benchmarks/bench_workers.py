@@ -0,0 +1,144 @@
+"""Débit de l'API avec 1, 2, 4 et 8 workers uvicorn partageant l'index disque.
+
+Chaque configuration démarre `uvicorn main_kiwi_advanced:app --workers N`,
+attend que tous les workers aient chargé l'index publié, puis envoie des
+requêtes /search/advanced (TF-IDF + SVD + scoring NumPy, sans appel LLM)
+avec une concurrence fixe pendant une durée donnée. La mémoire est relevée
+dans /proc: RSS cumulé (pages partagées comptées N fois) et PSS cumulé
+(pages partagées réparties entre workers).
+
+Usage (depuis api/):
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.bench_search_latency import QUESTIONS
+
+
+def _children(pid: int) -> list:
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    if not path.exists():
+        return []
+    pids = [int(p) for p in path.read_text().split()]
+    return pids + [c for p in pids for c in _children(p)]
+
+
+def _memory_mb(pids: list) -> dict:
+    """RSS et PSS cumulés (Linux, smaps_rollup)"""
+    totals = {"rss": 0.0, "pss": 0.0}
+    for pid in pids:
+        rollup = Path(f"/proc/{pid}/smaps_rollup")
+        if not rollup.exists():
+            continue
+        for line in rollup.read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                totals[key.lower()] += int(value.split()[0]) / 1024
+    return totals
+
+
+async def _wait_for_workers(base_url: str, n_workers: int, timeout: float) -> set:
+    """Attend que chaque worker réponde (pid distinct dans /health/advanced)"""
+    seen = set()
+    deadline = time.perf_counter() + timeout
+    # Connexion fermée à chaque sonde: sinon le keep-alive reste sur un seul worker
+    async with httpx.AsyncClient(base_url=base_url, timeout=5,
+                                 headers={"Connection": "close"}) as client:
+        while len(seen) < n_workers and time.perf_counter() < deadline:
+            try:
+                response = await client.get("/health/advanced")
+                if response.status_code == 200:
+                    seen.add(response.json()["worker_pid"])
+                    continue
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    return seen
+
+
+async def _run_load(base_url: str, duration: float, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + duration
+
+    async def user(i: int):
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            n = i
+            while time.perf_counter() < stop_at:
+                query, types, categories = QUESTIONS[n % len(QUESTIONS)]
+                params = {"query": query}
+                if types:
+                    params["types"] = types
+                if categories:
+                    params["categories"] = categories
+                start = time.perf_counter()
+                response = await client.get("/search/advanced", params=params)
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code != 200
+                n += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[user(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95))
+    }
+
+
+def run_config(n_workers: int, port: int, args) -> dict:
+    env = dict(os.environ, CLAUDE_API_KEY=os.environ.get("CLAUDE_API_KEY", "bench-key"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main_kiwi_advanced:app",
+         "--port", str(port), "--workers", str(n_workers), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        ready = asyncio.run(_wait_for_workers(base_url, n_workers, args.startup_timeout))
+        if len(ready) < n_workers:
+            print(f"⚠️ {len(ready)}/{n_workers} workers prêts après {args.startup_timeout}s")
+        report = asyncio.run(_run_load(base_url, args.duration, args.concurrency))
+        report.update(_memory_mb([server.pid] + _children(server.pid)))
+        return report
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit multi-workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Clients simultanés")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"🖥️ CPU disponibles: {os.cpu_count()} - concurrence {args.concurrency} "
+          f"- {args.duration:.0f}s par configuration")
+    print(f"\n{'workers':>7} | {'req/s':>8} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | "
+          f"{'RSS (MB)':>8} | {'PSS (MB)':>8} | {'erreurs':>7}")
+    print("-" * 72)
+    for i, n_workers in enumerate(args.workers):
+        report = run_config(n_workers, args.port + i, args)
+        print(f"{n_workers:>7} | {report['throughput']:>8.1f} | {report['p50']:>8.1f} | "
+              f"{report['p95']:>8.1f} | {report['rss']:>8.0f} | {report['pss']:>8.0f} | "
+              f"{report['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
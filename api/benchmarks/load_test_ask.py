@@ -0,0 +1,124 @@
+"""Test de charge de /ask contre un stub LLM local.
+
+Lance N appels /ask simultanés (via le transport ASGI de httpx, donc dans la
+même boucle d'événements que l'API) pendant qu'une sonde interroge
+/health/advanced. Avec le chemin asynchrone les appels doivent se chevaucher:
+durée totale ≈ délai stub, et non N × délai.
+
+Usage (depuis api/):
+    python -m benchmarks.load_test_ask --requests 16 --delay 1.0 --compare-sync
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+
+async def _probe_health(client, stop: asyncio.Event, probes: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health/advanced")
+        probes.append((start, time.perf_counter()))
+        await asyncio.sleep(0.05)
+
+
+async def _run_load(client, path: str, n_requests: int) -> dict:
+    stop = asyncio.Event()
+    probes = []
+    probe = asyncio.create_task(_probe_health(client, stop, probes))
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post(path, json={"question": f"Comment créer une JE ? #{i}"})
+        for i in range(n_requests)
+    ])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+
+    return {
+        "elapsed": elapsed,
+        "ok": sum(1 for r in responses if r.status_code == 200
+                  and r.json().get("status") == "success"),
+        "health_probes": len(probes),
+        # Plus grand écart entre deux sondes: révèle une boucle bloquée
+        "health_max_gap": max(
+            (b[0] - a[1] for a, b in zip(probes, probes[1:])),
+            default=elapsed)
+    }
+
+
+def _print_report(label: str, report: dict, n_requests: int, delay: float,
+                  peak_in_flight: int):
+    serial = n_requests * delay
+    print(f"\n📊 {label}")
+    print(f"   - Réponses OK: {report['ok']}/{n_requests}")
+    print(f"   - Durée totale: {report['elapsed']:.2f}s "
+          f"(séquentiel théorique: {serial:.2f}s)")
+    print(f"   - Facteur de chevauchement: {serial / report['elapsed']:.1f}x")
+    print(f"   - Appels LLM simultanés max: {peak_in_flight}")
+    print(f"   - Sondes /health/advanced: {report['health_probes']} "
+          f"(écart max {report['health_max_gap'] * 1000:.0f} ms)")
+
+
+async def main_async(args):
+    stub = StubLLMServer(delay=args.delay).start()
+    os.environ["CLAUDE_BASE_URL"] = stub.url
+    os.environ.setdefault("CLAUDE_API_KEY", "stub-key")
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+    # La passe --compare-sync repose les mêmes questions: le cache de réponses y répondrait sans LLM
+    os.environ["ANSWER_CACHE_BACKEND"] = "none"
+    # Questions quasi identiques ("... #i"): le cache sémantique servirait la passe synchrone
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    # "Comment créer une JE ?" est proche de la FAQ: les appels doivent atteindre le LLM
+    os.environ["FAQ_SEARCH_ANSWER_ENABLED"] = "false"
+
+    # Import après configuration de l'environnement (config lu à l'import)
+    import httpx
+    import main_kiwi_advanced as api
+
+    if not api.kiwi_ai._load_advanced_index():
+        api.kiwi_ai.index_documents_advanced()
+
+    if args.compare_sync:
+        @api.app.post("/ask/sync-baseline")
+        async def ask_sync_baseline(question: api.AdvancedQuestion):
+            # Reproduit l'ancien handler: appel Claude synchrone dans la boucle
+            return api.kiwi_ai.ask_kiwi_advanced(question.question)
+
+    print(f"🧪 Stub LLM {stub.url} - délai {args.delay}s - "
+          f"{args.requests} requêtes - concurrence LLM {args.concurrency}")
+
+    async with httpx.AsyncClient(app=api.app, base_url="http://kiwi.test",
+                                 timeout=None) as client:
+        report = await _run_load(client, "/ask", args.requests)
+        _print_report("Chemin asynchrone POST /ask", report, args.requests,
+                      args.delay, stub.peak_in_flight)
+
+        if args.compare_sync:
+            stub.reset()
+            report = await _run_load(client, "/ask/sync-baseline",
+                                     args.requests)
+            _print_report("Référence synchrone (ancien handler)", report,
+                          args.requests, args.delay, stub.peak_in_flight)
+
+    stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge /ask")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=1.0,
+                        help="Latence simulée du LLM (secondes)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="LLM_MAX_CONCURRENCY pour le test")
+    parser.add_argument("--compare-sync", action="store_true",
+                        help="Mesure aussi l'ancien chemin synchrone")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
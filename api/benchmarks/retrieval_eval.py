@@ -0,0 +1,102 @@
+"""Évaluation hors ligne de la recherche: recall@5 et MRR par mode.
+
+Chaque question du fichier étiqueté liste des extraits de texte; un chunk est
+pertinent si son contenu (normalisé: casse, accents, apostrophes) contient
+l'un d'eux. Les questions passent par le chemin de production
+(détection du type puis préférences de type/catégorie).
+
+- recall@k: chunks pertinents retrouvés dans les k premiers / min(k, nombre
+  de chunks pertinents du corpus)
+- MRR: moyenne de 1 / rang du premier chunk pertinent (0 si absent)
+
+Usage (depuis api/):
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --questions mon_jeu.json --k 5
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault("CLAUDE_API_KEY", "bench-key")
+
+from benchmarks.bench_search_latency import load_base_index
+from faq_index import normalize_question
+
+MODES = [("dense", None), ("bm25", None), ("hybrid", "rrf"), ("hybrid", "weighted")]
+DEFAULT_QUESTIONS = Path(__file__).with_name("retrieval_questions.json")
+
+
+def is_relevant(doc: dict, snippets: list) -> bool:
+    content = normalize_question(doc.get("content", ""))
+    return any(snippet in content for snippet in snippets)
+
+
+def relevance_labels(index, labelled: list) -> list:
+    """[(question, extraits normalisés, nombre de chunks pertinents du corpus)]"""
+    labels = []
+    for item in labelled:
+        snippets = [normalize_question(s) for s in item["relevant"]]
+        n_relevant = sum(is_relevant(index.documents[i], snippets)
+                         for i in range(len(index.documents)))
+        if n_relevant == 0:
+            print(f"⚠️ Aucun chunk pertinent dans le corpus: {item['question']}")
+            continue
+        labels.append((item["question"], snippets, n_relevant))
+    return labels
+
+
+def rank_metrics(results: list, snippets: list, n_relevant: int, k: int) -> tuple:
+    """(recall@k, rang réciproque) d'une liste de résultats [(chunk, score)]"""
+    hits = [is_relevant(doc, snippets) for doc, _ in results[:k]]
+    recall = sum(hits) / min(k, n_relevant)
+    return recall, 1.0 / (hits.index(True) + 1) if True in hits else 0.0
+
+
+def evaluate(rag, labelled: list, k: int) -> dict:
+    recalls, reciprocal_ranks, latencies = [], [], []
+    for question, snippets, n_relevant in relevance_labels(rag.index, labelled):
+        start = time.perf_counter()
+        results = rag._search_smart_results(question, rag._detect_query_type(question))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        recall, reciprocal_rank = rank_metrics(results, snippets, n_relevant, k)
+        recalls.append(recall)
+        reciprocal_ranks.append(reciprocal_rank)
+
+    return {
+        "questions": len(recalls),
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "p50_ms": float(np.percentile(latencies, 50))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k et MRR par mode de recherche")
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS),
+                        help="Fichier JSON [{question, relevant: [extraits]}]")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        labelled = json.load(f)
+    rag = load_base_index()
+
+    print(f"\n{'mode':>16} | {'recall@' + str(args.k):>9} | {'MRR':>6} | {'p50 (ms)':>8}")
+    print("-" * 48)
+    for mode, fusion in MODES:
+        rag.retrieval_mode = mode
+        rag.fusion_method = fusion or rag.fusion_method
+        report = evaluate(rag, labelled, args.k)
+        label = f"{mode}-{fusion}" if fusion else mode
+        print(f"{label:>16} | {report['recall']:>9.3f} | {report['mrr']:>6.3f} | "
+              f"{report['p50_ms']:>8.2f}")
+    print(f"\n{report['questions']} questions étiquetées")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Serveur stub local imitant l'API Anthropic Messages (/v1/messages).
+
+Permet de tester l'API Kiwi sans clé Claude ni réseau: chaque appel attend
+`delay` secondes puis renvoie une réponse factice. Le serveur mémorise le
+nombre d'appels simultanés pour vérifier que les requêtes se chevauchent.
+Les requêtes `"stream": true` reçoivent des événements SSE, un mot toutes les
+`token_interval` secondes après le délai initial.
+
+Le cache de prompts est imité: avec l'en-tête anthropic-beta prompt-caching,
+les blocs `system` jusqu'au dernier marqué `cache_control` forment le préfixe;
+sa première occurrence est comptée en cache_creation_input_tokens, les
+suivantes en cache_read_input_tokens (si au moins `cache_min_tokens`).
+
+Usage autonome:
+    python -m benchmarks.stub_llm_server --port 8765 --delay 1.0
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 delay: float = 1.0, answer: str = "Réponse stub Kiwi.",
+                 token_interval: float = 0.02, cache_min_tokens: int = 0):
+        self.delay = delay
+        self.cache_min_tokens = cache_min_tokens
+        self._prompt_cache = set()
+        self.token_interval = token_interval
+        self.answer = answer
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.requests = []
+            self.peak_in_flight = 0
+            self._prompt_cache = set()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                with stub._lock:
+                    stub.requests.append({
+                        "path": self.path,
+                        "headers": dict(self.headers),
+                        "body": payload
+                    })
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(
+                        stub.peak_in_flight, stub.in_flight)
+
+                try:
+                    time.sleep(stub.delay)
+                    if payload.get("stream"):
+                        self._stream(payload)
+                        return
+                    body = json.dumps(stub._message(payload, self.headers)).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("content-type", "application/json")
+                    self.send_header("content-length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _stream(self, payload: dict):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("connection", "close")
+                self.end_headers()
+                for event in stub._stream_events(payload, self.headers):
+                    self.wfile.write(
+                        f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                        .encode("utf-8"))
+                    self.wfile.flush()
+                    if event["type"] == "content_block_delta":
+                        time.sleep(stub.token_interval)
+
+        return Handler
+
+    def _usage(self, payload: dict, headers) -> dict:
+        """Tokens d'entrée (≈ 4 caractères par token), préfixe caché mis à part"""
+        system = payload.get("system") or []
+        blocks = [{"type": "text", "text": system}] if isinstance(system, str) else list(system)
+        usage = {"input_tokens": len(json.dumps(blocks) + json.dumps(
+            payload.get("messages", []))) // 4}
+
+        marked = [i for i, block in enumerate(blocks) if block.get("cache_control")]
+        if marked and "prompt-caching" in (headers.get("anthropic-beta") or ""):
+            prefix = json.dumps(blocks[:marked[-1] + 1], sort_keys=True)
+            prefix_tokens = len(prefix) // 4
+            if prefix_tokens >= self.cache_min_tokens:
+                with self._lock:
+                    hit = prefix in self._prompt_cache
+                    self._prompt_cache.add(prefix)
+                usage["input_tokens"] -= prefix_tokens
+                usage["cache_read_input_tokens" if hit
+                      else "cache_creation_input_tokens"] = prefix_tokens
+        return usage
+
+    def _message(self, payload: dict, headers) -> dict:
+        return {
+            "id": f"msg_stub_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "stub"),
+            "content": [{"type": "text", "text": self.answer}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                **self._usage(payload, headers),
+                "output_tokens": len(self.answer) // 4
+            }
+        }
+
+
+    def _stream_events(self, payload: dict, headers):
+        message = self._message(payload, headers)
+        usage = message["usage"]
+        words = self.answer.split(" ")
+
+        yield {"type": "message_start", "message": {
+            **message, "content": [],
+            "usage": {**usage, "output_tokens": 0}}}
+        yield {"type": "content_block_start", "index": 0,
+               "content_block": {"type": "text", "text": ""}}
+        for i, word in enumerate(words):
+            text = word if i == 0 else f" {word}"
+            yield {"type": "content_block_delta", "index": 0,
+                   "delta": {"type": "text_delta", "text": text}}
+        yield {"type": "content_block_stop", "index": 0}
+        yield {"type": "message_delta",
+               "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+               "usage": {"output_tokens": usage["output_tokens"]}}
+        yield {"type": "message_stop"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de l'API Claude")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=1.0)
+    args = parser.parse_args()
+
+    stub = StubLLMServer(args.host, args.port, args.delay).start()
+    print(f"🧪 Stub LLM en écoute sur {stub.url} (délai {args.delay}s)")
+    print(f"   export CLAUDE_BASE_URL={stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+from faq_index import normalize_question
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots normalisés comme les questions FAQ (casse, accents, apostrophes repliés)
+
+    « convention d'étude », « convention d’étude » et « convention detude »
+    (apostrophe perdue dans les données) donnent les mêmes termes.
+    """
+    return normalize_question(text).split()
+
+
+class BM25Index:
+    """Index inversé BM25 sur le texte de recherche des chunks
+
+    Les poids BM25 (idf × saturation du tf normalisée par la longueur du
+    chunk) sont précalculés dans une matrice creuse CSC chunks × termes: la
+    colonne d'un terme est sa liste de postings. Le score d'une requête est
+    la somme des colonnes de ses termes, calculée d'un bloc avec bincount.
+    Contrairement au TF-IDF (5000 n-grammes, min_df=2), le vocabulaire est
+    complet: les termes rares (sigles, numéros d'article) restent cherchables.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], data: np.ndarray, indices: np.ndarray,
+                 indptr: np.ndarray, n_docs: int, k1: float, b: float):
+        self.vocabulary = vocabulary
+        self.data = data        # poids BM25 des postings, colonne par colonne
+        self.indices = indices  # chunk de chaque posting
+        self.indptr = indptr    # début de la colonne de chaque terme dans data/indices
+        self.n_docs = n_docs
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float, b: float) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        rows, cols = [], []
+        for doc_id, text in enumerate(texts):
+            for token in tokenize(text):
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+                rows.append(doc_id)
+
+        n_docs = len(texts)
+        # Doublons (chunk, terme) additionnés: fréquences brutes
+        tf = sp.csc_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_docs, len(vocabulary)))
+        tf.sum_duplicates()
+
+        doc_lengths = np.bincount(np.asarray(rows, dtype=np.int64), minlength=n_docs)
+        avg_length = doc_lengths.mean() if n_docs else 0.0
+        df = np.diff(tf.indptr)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        length_norm = k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))
+        term_ids = np.repeat(np.arange(len(vocabulary)), df)
+        weights = idf[term_ids] * tf.data * (k1 + 1) / (tf.data + length_norm[tf.indices])
+
+        return cls(vocabulary, weights.astype(np.float32), tf.indices.astype(np.int32),
+                   tf.indptr.astype(np.int64), n_docs, k1, b)
+
+    def term_ids(self, query: str) -> np.ndarray:
+        """Termes connus de la requête (chaque terme compté une fois)"""
+        return np.array(sorted({
+            self.vocabulary[token] for token in tokenize(query)
+            if token in self.vocabulary}), dtype=np.int64)
+
+    def score(self, query: str) -> np.ndarray:
+        """Score BM25 de chaque chunk (0 si aucun terme commun)"""
+        term_ids = self.term_ids(query)
+        if len(term_ids) == 0:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        starts, ends = self.indptr[term_ids], self.indptr[term_ids + 1]
+        postings = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        return np.bincount(self.indices[postings], weights=self.data[postings],
+                           minlength=self.n_docs).astype(np.float32)
+
+
+def max_normalize(scores: np.ndarray) -> np.ndarray:
+    """Ramène des scores positifs à [0, 1] (le meilleur vaut 1)"""
+    top = scores.max() if len(scores) else 0.0
+    return scores / top if top > 0 else scores
+
+
+def fuse_scores(dense: np.ndarray, lexical: np.ndarray, method: str,
+                dense_weight: float = 0.5, rrf_k: int = 60, depth: int = 50,
+                dense_threshold: float = 0.1) -> np.ndarray:
+    """Fusion des similarités denses (cosinus) et des scores BM25 d'un même corpus
+
+    - "weighted": somme pondérée du cosinus et du BM25 ramené à [0, 1]
+    - "rrf": reciprocal rank fusion sur les `depth` premiers de chaque liste
+      (chunks au-dessus de `dense_threshold` en dense, BM25 > 0 en lexical),
+      remise à l'échelle pour qu'un chunk premier des deux listes vaille 1.
+
+    Le résultat reste dans [0, 1]: le seuil de pertinence et les boosts
+    s'appliquent ensuite comme pour la recherche dense seule.
+    """
+    dense = np.maximum(dense, 0)
+    if method == "weighted":
+        return dense_weight * dense + (1 - dense_weight) * max_normalize(lexical)
+
+    fused = np.zeros(len(dense), dtype=np.float64)
+    for scores, threshold in ((dense, dense_threshold), (lexical, 0.0)):
+        eligible = np.flatnonzero(scores > threshold)
+        if len(eligible) > depth:
+            eligible = eligible[np.argpartition(-scores[eligible], depth - 1)[:depth]]
+        ranked = eligible[np.argsort(-scores[eligible], kind="stable")]
+        fused[ranked] += 1.0 / (rrf_k + np.arange(1, len(ranked) + 1))
+    return fused * (rrf_k + 1) / 2
@@ -0,0 +1,230 @@
+import json
+import mmap
+import sys
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Champs propres à chaque chunk (le texte "content" aussi); les autres viennent du parent
+CHUNK_FIELDS = ("chunk_id", "search_content")
+INTERN_MAX_LENGTH = 200  # Chaînes de métadonnées partagées (source, type, catégories, chemins)
+
+
+def search_optimized_content(doc: Dict) -> str:
+    """Crée un contenu optimisé pour la recherche vectorielle"""
+    content = doc.get("content", "")
+    doc_type = doc.get("type", "")
+
+    # Extraction d'éléments importants selon le type
+    if doc_type == "faq":
+        question = doc.get("question", "")
+        answer = doc.get("answer", "")
+        category = doc.get("category", "")
+        return f"{category} {question} {answer} FAQ junior entreprise"
+
+    elif doc_type == "junior_entreprises":
+        name = doc.get("name", "")
+        city = doc.get("city", "")
+        domain = doc.get("domain", "")
+        school = doc.get("school", "")
+        return f"{name} {city} {domain} {school} junior entreprise"
+
+    elif doc_type == "legal_site":
+        category = doc.get("legal_category", "")
+        return f"{content} {category} juridique legal"
+
+    elif doc_type == "rse_formation":
+        category = doc.get("rse_category", "")
+        return f"{content} {category} RSE formation durable"
+
+    return content
+
+
+def _parent_fields(doc: Dict) -> Dict:
+    """Champs du document sans ceux du chunk; "content" gardé à None pour l'ordre des clés"""
+    return {key: None if key == "content" else value
+            for key, value in doc.items() if key not in CHUNK_FIELDS}
+
+
+def parent_key(doc: Dict) -> str:
+    """Identifiant du document parent d'un chunk (vue dict): égal pour tous ses chunks"""
+    return json.dumps(_parent_fields(doc), sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _intern(value):
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern(item) for item in value]
+    return value
+
+
+class ChunkStore(Sequence):
+    """Chunks en colonnes: document parent stocké une fois, texte propre à chaque chunk
+
+    Un chunk n'est plus une copie complète de son document: il référence son
+    parent (métadonnées FAQ/JE/pages, enriched_content...) par indice et ne
+    porte que son texte et son chunk_id. Les chaînes courtes des parents
+    (source, type, catégories, chemins) sont internées. search_content est
+    recalculé à la lecture, jamais stocké.
+
+    store[i] renvoie une vue dict indépendante, identique à l'ancien chunk
+    (doc.copy() + content, chunk_id, search_content): les appelants qui
+    lisent doc.get(...) ou sérialisent un résultat n'ont rien à changer.
+    """
+
+    def __init__(self):
+        self.parents: List[Dict] = []       # Champs du document, "content" à None (ordre des clés conservé)
+        self.parent_ids = array('i')        # Parent de chaque chunk
+        self.contents: List[str] = []       # Texte de chaque chunk
+        self.chunk_ids: List[Optional[str]] = []  # None pour un document non découpé
+
+    def add_parent(self, doc: Dict) -> int:
+        self.parents.append({key: _intern(value) for key, value in _parent_fields(doc).items()})
+        return len(self.parents) - 1
+
+    def append(self, parent_id: int, content: str, chunk_id: str = None):
+        self.parent_ids.append(parent_id)
+        self.contents.append(content)
+        self.chunk_ids.append(None if chunk_id is None else sys.intern(chunk_id))
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict]) -> "ChunkStore":
+        """Compacte des chunks dict (vues d'un autre store, anciens chunks en cache...)
+
+        Les chunks consécutifs d'un même document partagent un parent.
+        """
+        store = cls()
+        previous = None
+        for chunk in chunks:
+            parent = _parent_fields(chunk)
+            if parent != previous:
+                store.add_parent(parent)
+                previous = parent
+            store.append(len(store.parents) - 1, chunk["content"], chunk.get("chunk_id"))
+        return store
+
+    @classmethod
+    def concat(cls, stores: Iterable["ChunkStore"]) -> "ChunkStore":
+        merged = cls()
+        for store in stores:
+            if not isinstance(store, ChunkStore):
+                store = cls.from_chunks(store)
+            offset = len(merged.parents)
+            merged.parents.extend(store.parent(p) for p in range(store.n_parents))
+            merged.parent_ids.extend(store.parent_id(i) + offset for i in range(len(store)))
+            merged.contents.extend(store.content(i) for i in range(len(store)))
+            merged.chunk_ids.extend(store.chunk_id(i) for i in range(len(store)))
+        return merged
+
+    # Accès par colonne (surchargés par MappedChunkStore)
+
+    @property
+    def n_parents(self) -> int:
+        return len(self.parents)
+
+    def parent(self, parent_id: int) -> Dict:
+        """Champs du document parent (partagés: ne pas modifier)"""
+        return self.parents[parent_id]
+
+    def parent_id(self, i: int) -> int:
+        return self.parent_ids[i]
+
+    def content(self, i: int) -> str:
+        return self.contents[i]
+
+    def chunk_id(self, i: int) -> Optional[str]:
+        return self.chunk_ids[i]
+
+    def __len__(self) -> int:
+        return len(self.parent_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        view = dict(self.parent(self.parent_id(i)))
+        view["content"] = self.content(i)
+        chunk_id = self.chunk_id(i)
+        if chunk_id is not None:
+            view["chunk_id"] = chunk_id
+        view["search_content"] = search_optimized_content(view)
+        return view
+
+    def save(self, directory: Path) -> List[str]:
+        """Écrit le store (format lu par MappedChunkStore); renvoie les fichiers créés"""
+        directory = Path(directory)
+        parent_offsets = [0]
+        with open(directory / "parents.jsonl", 'wb') as f:
+            for p in range(self.n_parents):
+                line = json.dumps(self.parent(p), ensure_ascii=False).encode("utf-8") + b"\n"
+                f.write(line)
+                parent_offsets.append(parent_offsets[-1] + len(line))
+
+        # Textes des chunks bout à bout en UTF-8: décodage direct, sans JSON
+        content_offsets = [0]
+        with open(directory / "chunk_contents.bin", 'wb') as f:
+            for i in range(len(self)):
+                data = self.content(i).encode("utf-8")
+                f.write(data)
+                content_offsets.append(content_offsets[-1] + len(data))
+
+        with open(directory / "chunk_ids.json", 'w', encoding='utf-8') as f:
+            json.dump([self.chunk_id(i) for i in range(len(self))], f, ensure_ascii=False)
+
+        np.save(directory / "parent_offsets.npy", np.array(parent_offsets, dtype=np.int64))
+        np.save(directory / "content_offsets.npy", np.array(content_offsets, dtype=np.int64))
+        np.save(directory / "chunk_parents.npy",
+                np.array([self.parent_id(i) for i in range(len(self))], dtype=np.int32))
+        return ["parents.jsonl", "chunk_contents.bin", "chunk_ids.json",
+                "parent_offsets.npy", "content_offsets.npy", "chunk_parents.npy"]
+
+
+class MappedChunkStore(ChunkStore):
+    """ChunkStore relu depuis le disque: parents et textes mappés en mémoire
+
+    Seul le chunk demandé est décodé (une ligne JSON de parent, une tranche
+    UTF-8 de texte): les workers partagent les pages du fichier.
+    """
+
+    def __init__(self, directory: Path):
+        super().__init__()
+        directory = Path(directory)
+        self.parent_offsets = np.load(directory / "parent_offsets.npy", mmap_mode='r')
+        self.content_offsets = np.load(directory / "content_offsets.npy", mmap_mode='r')
+        self.parent_ids = np.load(directory / "chunk_parents.npy", mmap_mode='r')
+        with open(directory / "chunk_ids.json", 'r', encoding='utf-8') as f:
+            self.chunk_ids = [None if chunk_id is None else sys.intern(chunk_id)
+                              for chunk_id in json.load(f)]
+        self._parents = self._map(directory / "parents.jsonl")
+        self._contents = self._map(directory / "chunk_contents.bin")
+        if not (len(self.content_offsets) == len(self.parent_ids) + 1 == len(self.chunk_ids) + 1):
+            raise ValueError("Index corrompu: colonnes de chunks de longueurs différentes")
+
+    @staticmethod
+    def _map(path: Path):
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                return b""  # mmap refuse les fichiers vides
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def n_parents(self) -> int:
+        return len(self.parent_offsets) - 1
+
+    def parent(self, parent_id: int) -> Dict:
+        start, end = self.parent_offsets[parent_id], self.parent_offsets[parent_id + 1]
+        return json.loads(self._parents[start:end])
+
+    def parent_id(self, i: int) -> int:
+        return int(self.parent_ids[i])
+
+    def content(self, i: int) -> str:
+        start, end = self.content_offsets[i], self.content_offsets[i + 1]
+        return self._contents[start:end].decode("utf-8")
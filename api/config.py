@@ -5,6 +5,7 @@ load_dotenv()
 
 # Configuration API
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
+CLAUDE_BASE_URL = os.getenv("CLAUDE_BASE_URL") or None  # Optionnel: serveur stub local pour les tests de charge
 DATA_DIR = os.getenv("DATA_DIR", "./data")
 
 # Configuration modèles - DERNIÈRE VERSION
@@ -12,10 +13,79 @@ CLAUDE_MODEL = "claude-3-haiku-20240307"
 MAX_TOKENS = 4000
 TEMPERATURE = 0.1
 
+# Prompt caching Anthropic: préfixe système stable (persona + instructions) marqué cache_control
+PROMPT_CACHE_ENABLED = (os.getenv("PROMPT_CACHE_ENABLED") or "true").lower() == "true"
+PROMPT_CACHE_BETA = "prompt-caching-2024-07-31"  # En-tête anthropic-beta requis par le SDK 0.25
+
+# Configuration génération asynchrone
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY") or 8)  # Appels Claude simultanés max
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS") or 120)
+ASK_BATCH_MAX_SIZE = int(os.getenv("ASK_BATCH_MAX_SIZE") or 500)  # Questions max par appel /ask/batch
+LATENCY_LOG_SIZE = 1000  # Nombre de requêtes conservées pour les percentiles de latence
+
+# Cache des réponses Claude
+ANSWER_CACHE_BACKEND = os.getenv("ANSWER_CACHE_BACKEND") or "memory"  # memory, disk ou none
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH") or "kiwi_answer_cache.sqlite3"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES") or 1000)
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS") or 24 * 3600)
+
+# Cache sémantique: questions proches (cosinus dans l'espace SVD de l'index) servies sans appel à Claude
+# Désactivé par défaut: le garde-fou sur les mots n'admet que les reformulations aux mêmes mots
+SEMANTIC_CACHE_ENABLED = (os.getenv("SEMANTIC_CACHE_ENABLED") or "false").lower() == "true"
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES") or 1000)
+SEMANTIC_CACHE_MIN_SIMILARITY = float(os.getenv("SEMANTIC_CACHE_MIN_SIMILARITY") or 0.9)  # Cosinus minimal avec la question en cache
+SEMANTIC_CACHE_AUDIT_RATE = float(os.getenv("SEMANTIC_CACHE_AUDIT_RATE") or 0.1)  # Part des hits recontrôlés par une recherche
+SEMANTIC_CACHE_AUDIT_MIN_OVERLAP = float(os.getenv("SEMANTIC_CACHE_AUDIT_MIN_OVERLAP") or 0.5)  # Part minimale des documents de tête présents dans l'entrée
+SEMANTIC_CACHE_AUDIT_TOP_K = 3  # Documents de tête de la nouvelle recherche comparés à l'entrée servie
+SEMANTIC_CACHE_AUDIT_LOG_SIZE = 200  # Audits conservés pour /cache/semantic/audit
+
 # Configuration RAG optimisée
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 100
 MAX_CONTEXT_DOCS = 5
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET") or 2000)  # Tokens (estimés) de contexte max dans le prompt
+CONTEXT_MIN_CHUNK_TOKENS = int(os.getenv("CONTEXT_MIN_CHUNK_TOKENS") or 100)  # En dessous, un chunk hors budget est écarté plutôt que tronqué
+CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY") or 0.8)  # Jaccard (trigrammes) au-delà duquel un chunk est un quasi-doublon
+
+# Index versionné sur disque (répertoire: manifest, .npy mappés en mémoire, chunks JSONL)
+VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH") or "kiwi_index"
+INDEX_KEEP_VERSIONS = 2  # Versions conservées sur disque (workers encore sur l'ancienne)
+INDEX_VERIFY_CHECKSUMS = (os.getenv("INDEX_VERIFY_CHECKSUMS") or "false").lower() == "true"  # sha256 complet au chargement
+
+# Déploiement multi-workers (index partagé sur disque, rechargement à chaud)
+API_WORKERS = int(os.getenv("API_WORKERS") or 1)
+INDEX_POLL_SECONDS = float(os.getenv("INDEX_POLL_SECONDS") or 2)  # Intervalle de détection d'une nouvelle version
+
+# Réindexation incrémentale
+INGEST_CACHE_PATH = os.getenv("INGEST_CACHE_PATH") or "kiwi_ingest_cache.pkl"  # Empreintes + chunks par fichier
+INCREMENTAL_EMBEDDING = (os.getenv("INCREMENTAL_EMBEDDING") or "true").lower() == "true"  # Réutilise TF-IDF/SVD déjà ajustés
+REINDEX_DRIFT_THRESHOLD = float(os.getenv("REINDEX_DRIFT_THRESHOLD") or 0.3)  # Hausse du taux hors vocabulaire déclenchant un réajustement complet
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS") or 0)  # Processus de lecture/découpage des fichiers (0 = nombre de CPU, 1 = séquentiel)
+INGEST_PARALLEL_MIN_BYTES = int(os.getenv("INGEST_PARALLEL_MIN_BYTES") or 4 * 1024 * 1024)  # Volume à retraiter en dessous duquel on reste séquentiel
+INGEST_STREAM_MIN_BYTES = int(os.getenv("INGEST_STREAM_MIN_BYTES") or 32 * 1024 * 1024)  # Fichiers lus en flux à partir de cette taille (0 = toujours)
+
+# Recherche: "dense" (TF-IDF + SVD), "bm25" (lexical) ou "hybrid" (fusion des deux)
+# Les seuils de score (pertinence 0.1 de _rank_results, réponses FAQ) sont réglés sur le cosinus dense
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE") or "dense"
+FUSION_METHOD = os.getenv("FUSION_METHOD") or "weighted"  # weighted (somme pondérée) ou rrf (reciprocal rank fusion)
+RRF_K = int(os.getenv("RRF_K") or 60)  # Constante de lissage des rangs RRF
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT") or 0.3)  # Poids du cosinus en fusion pondérée
+BM25_K1 = float(os.getenv("BM25_K1") or 1.5)  # Saturation de la fréquence des termes
+BM25_B = float(os.getenv("BM25_B") or 0.75)  # Normalisation par la longueur du chunk
+
+# Index direct de la FAQ (similarité de Jaccard sur trigrammes de caractères)
+FAQ_FUZZY_MIN_SIMILARITY = float(os.getenv("FAQ_FUZZY_MIN_SIMILARITY") or 0.5)  # Quasi-doublons remontés en tête de /search/faq
+
+# Réponse FAQ sans appel à Claude pour une reformulation sûre (cosinus entre questions dans l'espace SVD)
+FAQ_SEARCH_ANSWER_ENABLED = (os.getenv("FAQ_SEARCH_ANSWER_ENABLED") or "false").lower() == "true"
+FAQ_SEARCH_ANSWER_MIN_SIMILARITY = float(os.getenv("FAQ_SEARCH_ANSWER_MIN_SIMILARITY") or 0.85)  # Cosinus minimal avec la question FAQ la plus proche
+FAQ_SEARCH_ANSWER_MIN_MARGIN = float(os.getenv("FAQ_SEARCH_ANSWER_MIN_MARGIN") or 0.1)  # Écart minimal avec la deuxième question FAQ
+
+# Index vectoriel: "brute" (exact) ou "ivf" (approximatif, k-means)
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND") or "brute"
+IVF_N_LISTS = int(os.getenv("IVF_N_LISTS") or 0)  # 0 = automatique (≈ √nombre de chunks)
+IVF_N_PROBE = int(os.getenv("IVF_N_PROBE") or 8)  # Listes explorées par requête
+ANN_RECALL_SAMPLE = 200  # Requêtes utilisées pour mesurer le recall@k à l'indexation
 
 # Configuration spécifique Kiwi
 KIWI_FILE_TYPES = {
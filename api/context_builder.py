@@ -0,0 +1,121 @@
+import json
+import re
+from typing import Dict, List, Tuple
+
+from chunk_store import parent_key
+from config import CONTEXT_DEDUP_SIMILARITY, CONTEXT_MIN_CHUNK_TOKENS, CONTEXT_TOKEN_BUDGET
+from faq_index import char_ngrams
+from je_index import fold_text
+from metrics import CONTEXT_CHUNKS_DROPPED, estimate_tokens
+
+NO_CONTEXT = "Aucune information pertinente trouvée dans la base Kiwi."
+TRUNCATION_MARK = " […]"
+_INDENT = re.compile(r"\n\s+")  # Indentation JSON et lignes vides
+
+
+def compact_content(content: str) -> str:
+    """Contenu sans indentation: JSON réécrit sans espaces, sinon lignes désindentées
+
+    Les pages légales et modules RSE sont des json.dumps(indent=2) précédés
+    d'une ligne d'en-tête "=== ... ===".
+    """
+    header, _, body = content.partition("\n")
+    if body[:1] in ("{", "["):
+        try:
+            body = json.dumps(json.loads(body), ensure_ascii=False, separators=(",", ":"))
+            return f"{header}\n{body}"
+        except ValueError:
+            pass  # Chunk découpé au milieu d'un JSON: simple désindentation
+    return _INDENT.sub("\n", content)
+
+
+def _source_line(doc: Dict, score: float) -> str:
+    kiwi_info = f"Source: {doc['source']} | Type: {doc.get('type', 'N/A')} | Score: {score:.3f}"
+
+    # Ajout d'infos contextuelles
+    if doc.get('category'):
+        kiwi_info += f" | Catégorie: {doc['category']}"
+    if doc.get('legal_category'):
+        kiwi_info += f" | Domaine juridique: {doc['legal_category']}"
+    if doc.get('rse_category'):
+        kiwi_info += f" | Domaine RSE: {doc['rse_category']}"
+    return kiwi_info
+
+
+def _cost(entry: str) -> int:
+    """Tokens d'une entrée et de son saut de ligne, arrondis au-dessus: la somme borne le total"""
+    return -(-(len(entry) + 1) // 4)
+
+
+def _truncate(content: str, max_chars: int) -> str:
+    """Coupe au dernier espace avant max_chars"""
+    cut = content[:max_chars]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut + TRUNCATION_MARK
+
+
+def build_context(results: List[Tuple[Dict, float]],
+                  token_budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """Contexte envoyé à Claude, borné à token_budget tokens (estimés)
+
+    Les résultats sont parcourus par score décroissant:
+    - un seul chunk par document parent (le mieux classé);
+    - les quasi-doublons d'un chunk déjà retenu (Jaccard des trigrammes de
+      caractères >= CONTEXT_DEDUP_SIMILARITY) sont écartés;
+    - le contenu est compacté (JSON sans indentation);
+    - un chunk qui dépasse le budget restant est tronqué s'il reste au moins
+      CONTEXT_MIN_CHUNK_TOKENS, sinon écarté (un chunk plus court peut suivre).
+
+    Renvoie (contexte, rapport) avec le nombre de tokens et de chunks écartés
+    par motif.
+    """
+    report = {"candidates": len(results), "documents": 0, "tokens": 0, "truncated": 0,
+              "dropped": {"same_parent": 0, "duplicate": 0, "budget": 0}}
+    if not results:
+        return NO_CONTEXT, report
+
+    context_parts = []
+    seen_parents = set()
+    kept_ngrams = []
+    remaining = token_budget
+    for doc, score in sorted(results, key=lambda item: item[1], reverse=True):
+        key = parent_key(doc)
+        if key in seen_parents:
+            report["dropped"]["same_parent"] += 1
+            continue
+
+        content = compact_content(doc['content'])
+        ngrams = char_ngrams(fold_text(content))
+        if any(len(ngrams & kept) / len(ngrams | kept) >= CONTEXT_DEDUP_SIMILARITY
+               for kept in kept_ngrams):
+            report["dropped"]["duplicate"] += 1
+            continue
+
+        kiwi_info = _source_line(doc, score)
+        entry = f"{kiwi_info}\nContenu: {content}\n---"
+        tokens = _cost(entry)
+        if tokens > remaining:
+            overhead = _cost(f"{kiwi_info}\nContenu: {TRUNCATION_MARK}\n---")
+            if remaining - overhead < CONTEXT_MIN_CHUNK_TOKENS:
+                report["dropped"]["budget"] += 1
+                continue
+            content = _truncate(content, (remaining - overhead) * 4)
+            entry = f"{kiwi_info}\nContenu: {content}\n---"
+            tokens = _cost(entry)
+            report["truncated"] += 1
+
+        context_parts.append(entry)
+        seen_parents.add(key)
+        kept_ngrams.append(ngrams)
+        remaining -= tokens
+
+    for reason, count in report["dropped"].items():
+        if count:
+            CONTEXT_CHUNKS_DROPPED.inc(count, reason=reason)
+
+    context = "\n".join(context_parts)
+    report["documents"] = len(context_parts)
+    report["tokens"] = estimate_tokens(context)
+    return context, report
@@ -0,0 +1,170 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from je_index import fold_text
+
+# Mots qui inversent le sens d'une question ("n'est" perd son apostrophe: "nest")
+NEGATION_WORDS = frozenset({"ne", "n", "nest", "pas", "sans", "non", "jamais", "aucun", "aucune", "ni"})
+
+
+def normalize_question(text: str) -> str:
+    """Question normalisée: apostrophes supprimées, casse et accents repliés
+
+    Les apostrophes sont retirées (et non remplacées par un espace) car les
+    données FAQ les ont souvent perdues: « n'est » et « nest » se rejoignent.
+    """
+    return fold_text(str(text).replace("'", "").replace("’", ""))
+
+
+def question_words(text: str) -> set:
+    """Mots d'une question normalisée"""
+    return set(normalize_question(text).split())
+
+
+def char_ngrams(text: str, n: int = 3) -> set:
+    """Trigrammes de caractères d'une question normalisée (bornes comprises)"""
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class FAQIndex:
+    """Index direct des questions de la FAQ
+
+    - table de hachage question normalisée -> entrée (correspondance exacte)
+    - postings de trigrammes de caractères -> entrées (quasi-doublons,
+      similarité de Jaccard calculée par comptage vectorisé)
+    - postings par segment de `category_path`
+    - vecteurs réduits unitaires des questions (vectorizer + SVD de l'index)
+      et vocabulaire replié, pour la réponse FAQ depuis la recherche
+
+    Une question découpée en plusieurs chunks n'est indexée qu'une fois,
+    sur son premier chunk.
+    """
+
+    def __init__(self):
+        self.doc_ids = np.zeros(0, dtype=np.int64)  # entrée -> chunk
+        self.exact: Dict[str, int] = {}
+        self.ngram_postings: Dict[str, np.ndarray] = {}
+        self.ngram_counts = np.zeros(0, dtype=np.int32)
+        self.categories: Dict[str, np.ndarray] = {}
+        self.question_vectors: Optional[np.ndarray] = None  # (entrées, dimension SVD)
+        self.vocabulary: frozenset = frozenset()  # Mots du vectorizer, repliés
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, documents: Sequence[Dict], ids: Sequence[int],
+              vectorizer=None, svd=None) -> "FAQIndex":
+        """Indexe les chunks `ids` (type faq) de `documents`
+
+        Avec vectorizer et svd, projette aussi chaque question dans l'espace réduit.
+        """
+        index = cls()
+        questions = []
+        doc_ids, ngram_counts = [], []
+        ngram_postings: Dict[str, List[int]] = {}
+        categories: Dict[str, List[int]] = {}
+
+        for doc_id in ids:
+            doc = documents[doc_id]
+            question = normalize_question(doc.get('question', ''))
+            if not question or question in index.exact:
+                continue
+            entry = len(doc_ids)
+            index.exact[question] = entry
+            doc_ids.append(int(doc_id))
+            questions.append(doc['question'])
+
+            ngrams = char_ngrams(question)
+            ngram_counts.append(len(ngrams))
+            for ngram in ngrams:
+                ngram_postings.setdefault(ngram, []).append(entry)
+
+            for segment in (doc.get('category_path') or '').split('/'):
+                segment = fold_text(segment)
+                if segment:
+                    categories.setdefault(segment, []).append(entry)
+
+        index.doc_ids = np.array(doc_ids, dtype=np.int64)
+        index.ngram_counts = np.array(ngram_counts, dtype=np.int32)
+        index.ngram_postings = {
+            ngram: np.array(entries, dtype=np.int64) for ngram, entries in ngram_postings.items()}
+        index.categories = {
+            segment: np.array(entries, dtype=np.int64) for segment, entries in categories.items()}
+
+        if vectorizer is not None and svd is not None and questions:
+            reduced = svd.transform(vectorizer.transform(questions))
+            norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            index.question_vectors = np.ascontiguousarray(reduced / norms, dtype=np.float32)
+            index.vocabulary = frozenset(
+                fold_text(term) for term in vectorizer.vocabulary_ if " " not in term)
+        return index
+
+    def category_entries(self, category: str) -> Optional[np.ndarray]:
+        """Entrées dont un segment de `category_path` correspond (None si inconnu)"""
+        return self.categories.get(fold_text(category))
+
+    def similarities(self, query: str) -> np.ndarray:
+        """Similarité de Jaccard (trigrammes) entre la requête et chaque entrée"""
+        ngrams = char_ngrams(normalize_question(query))
+        shared = np.zeros(len(self), dtype=np.int32)
+        for ngram in ngrams:
+            entries = self.ngram_postings.get(ngram)
+            if entries is not None:
+                shared[entries] += 1
+        return shared / (len(ngrams) + self.ngram_counts - shared)
+
+    def match(self, query: str, min_similarity: float,
+              entries: np.ndarray = None) -> List[Tuple[int, float, str]]:
+        """[(chunk, similarité, "exact" | "fuzzy")] au-dessus du seuil, meilleurs d'abord
+
+        `entries` restreint la recherche (filtre de catégorie).
+        """
+        if len(self) == 0:
+            return []
+        exact_entry = self.exact.get(normalize_question(query))
+        if exact_entry is not None and (entries is None or exact_entry in entries):
+            return [(int(self.doc_ids[exact_entry]), 1.0, "exact")]
+
+        similarities = self.similarities(query)
+        if entries is not None:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[entries] = True
+            similarities = np.where(mask, similarities, 0.0)
+        hits = np.flatnonzero(similarities >= min_similarity)
+        hits = hits[np.argsort(-similarities[hits], kind="stable")]
+        return [(int(self.doc_ids[entry]), float(similarities[entry]), "fuzzy")
+                for entry in hits]
+
+    def vector_match(self, query_unit: np.ndarray) -> Optional[Tuple[int, float, float]]:
+        """(entrée, cosinus, écart avec la deuxième question) de la question FAQ la plus proche"""
+        if self.question_vectors is None or len(self) == 0:
+            return None
+        similarities = self.question_vectors @ query_unit
+        order = np.argsort(-similarities)[:2]
+        runner_up = float(similarities[order[1]]) if len(order) > 1 else 0.0
+        best = float(similarities[order[0]])
+        return int(order[0]), best, best - runner_up
+
+    def meaning_conflict(self, query: str, question: str) -> Optional[str]:
+        """Motif pour lequel la requête peut différer de la question FAQ malgré le cosinus
+
+        - "negation": négations différentes ("doit" / "ne doit pas");
+        - "unknown_word": mot de la requête hors vocabulaire (sans effet sur
+          le vecteur, ex. "mineur") et absent de la question FAQ.
+        """
+        query_words, faq_words = question_words(query), question_words(question)
+        if query_words & NEGATION_WORDS != faq_words & NEGATION_WORDS:
+            return "negation"
+        if any(len(word) > 2 and word not in self.vocabulary
+               for word in query_words - faq_words):
+            return "unknown_word"
+        return None
+
+    def exact_match(self, query: str) -> Optional[int]:
+        """Chunk de la question identique une fois normalisée, None sinon"""
+        entry = self.exact.get(normalize_question(query))
+        return None if entry is None else int(self.doc_ids[entry])
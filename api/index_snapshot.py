@@ -0,0 +1,183 @@
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from config import *
+from bm25 import BM25Index
+from faq_index import FAQIndex
+from ingest_cache import INGEST_VERSION
+from je_index import JEIndex
+from vector_index import create_vector_index, evaluate_recall
+
+
+class KiwiIndexSnapshot:
+    """Index Kiwi complet: chunks, modèles TF-IDF/SVD, vecteurs et métadonnées
+
+    Un snapshot est construit entièrement à part puis publié par une simple
+    affectation de référence (`AdvancedKiwiRAG.index = snapshot`). Il n'est
+    plus modifié ensuite: une requête qui a lu la référence voit toujours un
+    vectorizer, une SVD et des vecteurs cohérents entre eux.
+    """
+
+    def __init__(self, documents: List[Dict] = None, vectorizer=None, svd=None,
+                 doc_vectors=None, reduced_vectors=None,
+                 document_metadata: Dict = None, version: int = None,
+                 sources: Dict[str, str] = None, oov_rate: float = 0.0,
+                 ingest_version: int = INGEST_VERSION):
+        self.version = version or int(time.time() * 1000)
+        self.documents = documents if documents is not None else []
+        self.vectorizer = vectorizer
+        self.svd = svd
+        self.doc_vectors = doc_vectors
+        self.reduced_vectors = reduced_vectors
+        self.normalized_vectors = None  # reduced_vectors L2-normalisés (float32 contigu)
+
+        # Empreinte SHA-256 de chaque fichier de données indexé
+        self.sources = sources or {}
+        self.ingest_version = ingest_version  # Version d'extraction des chunks
+        # Taux de mots hors vocabulaire mesuré à l'ajustement du TF-IDF (référence de dérive)
+        self.oov_rate = oov_rate
+        self.build_info = {}
+
+        # Métadonnées pour améliorer la recherche
+        self.document_metadata = document_metadata or {}
+
+        # Codes par chunk (type, catégorie) et boost de priorité, pour des boosts vectorisés
+        self.type_vocabulary = {}
+        self.category_vocabulary = {}
+        self.type_codes = None
+        self.category_codes = None
+        self.priority_boosts = None
+
+        # Index lexical BM25 (recherche hybride)
+        self.bm25_index = None
+
+        # Index inversé des attributs JE (ville, école, domaine, région)
+        self.je_index = JEIndex()
+        # Index direct des questions FAQ (exact, trigrammes, catégories)
+        self.faq_index = FAQIndex()
+
+        # Index vectoriel (brute force exact par défaut, IVF approximatif en option)
+        self.vector_index = create_vector_index()
+
+    @property
+    def ready(self) -> bool:
+        return self.normalized_vectors is not None and len(self.documents) > 0
+
+    def finalize(self, vector_index_path: str = None):
+        """Calcule les structures dérivées manquantes; recharge l'index ANN si fourni et à jour"""
+        if not self.document_metadata:
+            self.build_metadata_index()
+        elif self.type_codes is None:
+            self.build_boost_arrays()
+        if self.normalized_vectors is None:
+            self.build_normalized_vectors()
+        if self.bm25_index is None:
+            self.build_bm25_index()
+        self.build_je_index()
+        self.build_faq_index()
+
+        if vector_index_path is None or not self.vector_index.load(
+                vector_index_path, self.normalized_vectors):
+            self.build_vector_index()
+        return self
+
+    def build_metadata_index(self):
+        """Construit un index de métadonnées pour recherche rapide"""
+        self.document_metadata = {
+            'by_type': {},
+            'by_category': {},
+            'by_source': {},
+            'keywords': {}
+        }
+
+        for i, doc in enumerate(self.documents):
+            doc_type = doc.get('type', 'unknown')
+            category = doc.get(
+                'category', doc.get(
+                    'legal_category', doc.get(
+                        'rse_category', 'unknown')))
+            source = doc.get('source', 'unknown')
+
+            # Index par type
+            if doc_type not in self.document_metadata['by_type']:
+                self.document_metadata['by_type'][doc_type] = []
+            self.document_metadata['by_type'][doc_type].append(i)
+
+            # Index par catégorie
+            if category not in self.document_metadata['by_category']:
+                self.document_metadata['by_category'][category] = []
+            self.document_metadata['by_category'][category].append(i)
+
+            # Index par source
+            if source not in self.document_metadata['by_source']:
+                self.document_metadata['by_source'][source] = []
+            self.document_metadata['by_source'][source].append(i)
+
+        self.build_boost_arrays()
+
+    def build_boost_arrays(self):
+        """Précalcule les codes type/catégorie et le boost de priorité de chaque chunk"""
+        n_docs = len(self.documents)
+
+        # Codes entiers dérivés des listes de postings by_type / by_category
+        self.type_vocabulary = {
+            doc_type: code for code, doc_type in enumerate(
+                self.document_metadata['by_type'])}
+        self.type_codes = np.full(n_docs, -1, dtype=np.int32)
+        for doc_type, indices in self.document_metadata['by_type'].items():
+            self.type_codes[indices] = self.type_vocabulary[doc_type]
+
+        self.category_vocabulary = {
+            category: code for code, category in enumerate(
+                self.document_metadata['by_category'])}
+        self.category_codes = np.full(n_docs, -1, dtype=np.int32)
+        for category, indices in self.document_metadata['by_category'].items():
+            self.category_codes[indices] = self.category_vocabulary[category]
+
+        # Boost par priorité (pour FAQ)
+        self.priority_boosts = np.array(
+            [1.1 if doc.get('priority', 0) > 1 else 1.0 for doc in self.documents],
+            dtype=np.float64)
+
+    def build_bm25_index(self):
+        """Index BM25 sur le même texte que le TF-IDF (search_content)"""
+        self.bm25_index = BM25Index.build(
+            [doc.get("search_content", doc.get("content", "")) for doc in self.documents],
+            BM25_K1, BM25_B)
+
+    def build_je_index(self):
+        """Index d'attributs des Junior Entreprises (seuls les chunks JE sont lus)"""
+        self.je_index = JEIndex.build(
+            self.documents, self.document_metadata['by_type'].get('junior_entreprises', []))
+
+    def build_faq_index(self):
+        """Index direct des questions FAQ (seuls les chunks FAQ sont lus)"""
+        self.faq_index = FAQIndex.build(
+            self.documents, self.document_metadata['by_type'].get('faq', []),
+            self.vectorizer, self.svd)
+
+    def build_normalized_vectors(self):
+        """Normalise une fois pour toutes les vecteurs réduits (cosinus = produit scalaire)"""
+        vectors = np.asarray(self.reduced_vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.normalized_vectors = np.ascontiguousarray(vectors / norms)
+
+    def build_vector_index(self):
+        """Construit l'index vectoriel et mesure son recall face à la recherche exacte"""
+        self.vector_index = create_vector_index()
+        self.vector_index.build(self.normalized_vectors)
+
+        if self.vector_index.name != "brute":
+            rng = np.random.default_rng(42)
+            sample = rng.choice(
+                len(self.normalized_vectors),
+                min(ANN_RECALL_SAMPLE, len(self.normalized_vectors)),
+                replace=False)
+            self.vector_index.recall = evaluate_recall(
+                self.vector_index, self.normalized_vectors,
+                self.normalized_vectors[sample], MAX_CONTEXT_DOCS * 2)
+            print(f"🧭 Index {self.vector_index.name}: recall@{MAX_CONTEXT_DOCS * 2} "
+                  f"= {self.vector_index.recall:.3f}")
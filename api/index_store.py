@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import scipy.sparse as sp
+try:
+    import fcntl  # Unix uniquement: verrou de construction partagé entre workers
+except ImportError:
+    fcntl = None
+
+from config import *
+from bm25 import BM25Index
+from chunk_store import ChunkStore, MappedChunkStore
+from index_snapshot import KiwiIndexSnapshot
+from ingest_cache import INGEST_VERSION, file_sha256
+
+INDEX_SCHEMA_VERSION = 2
+
+# Format d'un index versionné (répertoire VECTOR_DB_PATH):
+#   CURRENT                  nom de la version publiée (remplacé atomiquement)
+#   v<version>/manifest.json version de schéma, empreinte des données, fichiers (taille + sha256)
+#   v<version>/*.npy         vecteurs et codes par chunk, chargés avec mmap_mode
+#   v<version>/parents.jsonl documents parents (un JSON par ligne), accès direct via parent_offsets.npy
+#   v<version>/chunk_*       textes UTF-8 bout à bout (content_offsets.npy), parent et chunk_id de chaque chunk
+#   v<version>/models.pkl    vectorizer TF-IDF et SVD ajustés
+#   v<version>/bm25_*        postings BM25 (CSC éclaté en trois .npy) et vocabulaire JSON
+
+
+class IndexBuildLock:
+    """Verrou fichier (flock) garantissant qu'un seul worker construit l'index
+
+    Sans fcntl (Windows), le verrou est toujours accordé: un seul worker.
+    """
+
+    def __init__(self, root: str = VECTOR_DB_PATH):
+        self.path = Path(root) / ".build.lock"
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a')
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def data_fingerprint(sources: Dict[str, str], ingest_version: int = INGEST_VERSION) -> str:
+    """Empreinte globale des fichiers de données (nom + sha256) et de la version d'extraction"""
+    raw = "\n".join([f"ingest:{ingest_version}"] + [
+        f"{name}:{digest}" for name, digest in sorted(sources.items())])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def current_data_fingerprint() -> str:
+    return data_fingerprint({
+        json_file.name: file_sha256(json_file)
+        for json_file in Path(DATA_DIR).glob("*.json")})
+
+
+def read_current_version(root: str = VECTOR_DB_PATH) -> str:
+    """Nom de la version publiée, None si aucun index"""
+    pointer = Path(root) / "CURRENT"
+    if not pointer.exists():
+        return None
+    return pointer.read_text(encoding="utf-8").strip() or None
+
+
+def save_index_snapshot(snapshot: KiwiIndexSnapshot, root: str = VECTOR_DB_PATH) -> Path:
+    """Écrit le snapshot dans un nouveau répertoire versionné puis le publie"""
+    root = Path(root)
+    name = f"v{snapshot.version}"
+    tmp_dir = root / f"{name}.tmp"
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+    files: Dict[str, Dict[str, Any]] = {}
+
+    def write_array(filename: str, array: np.ndarray):
+        np.save(tmp_dir / filename, np.ascontiguousarray(array))
+        files[filename] = {}
+
+    # Chunks: parents une fois, textes et références en colonnes (voir ChunkStore)
+    store = snapshot.documents
+    if not isinstance(store, ChunkStore):
+        store = ChunkStore.from_chunks(store)
+    for filename in store.save(tmp_dir):
+        files[filename] = {}
+
+    # Vecteurs: réduits, normalisés et TF-IDF creux (CSR éclaté en trois tableaux)
+    write_array("reduced_vectors.npy", snapshot.reduced_vectors)
+    write_array("normalized_vectors.npy", snapshot.normalized_vectors)
+    doc_vectors = sp.csr_matrix(snapshot.doc_vectors)
+    write_array("tfidf_data.npy", doc_vectors.data)
+    write_array("tfidf_indices.npy", doc_vectors.indices)
+    write_array("tfidf_indptr.npy", doc_vectors.indptr)
+
+    # Codes par chunk (type, catégorie, source) et boosts de priorité
+    source_vocabulary = list(snapshot.document_metadata['by_source'])
+    source_codes = np.full(len(snapshot.documents), -1, dtype=np.int32)
+    for code, source in enumerate(source_vocabulary):
+        source_codes[snapshot.document_metadata['by_source'][source]] = code
+    write_array("type_codes.npy", snapshot.type_codes)
+    write_array("category_codes.npy", snapshot.category_codes)
+    write_array("source_codes.npy", source_codes)
+    write_array("priority_boosts.npy", snapshot.priority_boosts)
+
+    # BM25: colonnes de postings et vocabulaire complet
+    bm25 = snapshot.bm25_index
+    write_array("bm25_data.npy", bm25.data)
+    write_array("bm25_indices.npy", bm25.indices)
+    write_array("bm25_indptr.npy", bm25.indptr)
+    with open(tmp_dir / "bm25_vocabulary.json", 'w', encoding='utf-8') as f:
+        json.dump(bm25.vocabulary, f, ensure_ascii=False)
+    files["bm25_vocabulary.json"] = {}
+
+    with open(tmp_dir / "models.pkl", 'wb') as f:
+        pickle.dump({"vectorizer": snapshot.vectorizer, "svd": snapshot.svd}, f)
+    files["models.pkl"] = {}
+
+    snapshot.vector_index.save(str(tmp_dir / "vector_index.npz"))
+    if (tmp_dir / "vector_index.npz").exists():
+        files["vector_index.npz"] = {}
+
+    for filename, entry in files.items():
+        path = tmp_dir / filename
+        entry["size"] = path.stat().st_size
+        entry["sha256"] = file_sha256(path)
+
+    manifest = {
+        "schema_version": INDEX_SCHEMA_VERSION,
+        "version": snapshot.version,
+        "created_at": time.time(),
+        "data_hash": data_fingerprint(snapshot.sources, snapshot.ingest_version),
+        "sources": snapshot.sources,
+        "ingest_version": snapshot.ingest_version,
+        "oov_rate": snapshot.oov_rate,
+        "build_info": snapshot.build_info,
+        "n_chunks": len(snapshot.documents),
+        "tfidf_shape": list(doc_vectors.shape),
+        "type_vocabulary": list(snapshot.type_vocabulary),
+        "category_vocabulary": list(snapshot.category_vocabulary),
+        "source_vocabulary": source_vocabulary,
+        "vector_index": snapshot.vector_index.name,
+        "bm25": {"k1": bm25.k1, "b": bm25.b, "n_terms": len(bm25.vocabulary)},
+        "files": files
+    }
+    with open(tmp_dir / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Publication: renommage du répertoire puis remplacement atomique de CURRENT
+    version_dir = root / name
+    if version_dir.exists():
+        shutil.rmtree(version_dir)
+    os.replace(tmp_dir, version_dir)
+    pointer_tmp = root / "CURRENT.tmp"
+    pointer_tmp.write_text(name, encoding="utf-8")
+    os.replace(pointer_tmp, root / "CURRENT")
+
+    _prune_old_versions(root, keep=name)
+    return version_dir
+
+
+def _prune_old_versions(root: Path, keep: str):
+    """Garde les INDEX_KEEP_VERSIONS dernières versions (lecteurs encore en cours)"""
+    versions = sorted(
+        (p for p in root.glob("v*") if p.is_dir() and not p.name.endswith(".tmp")),
+        key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in versions[INDEX_KEEP_VERSIONS:]:
+        if old.name != keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def load_index_snapshot(root: str = VECTOR_DB_PATH,
+                        verify_checksums: bool = INDEX_VERIFY_CHECKSUMS) -> KiwiIndexSnapshot:
+    """Charge la version publiée; lève une erreur si l'index est absent ou corrompu"""
+    name = read_current_version(root)
+    if name is None:
+        raise FileNotFoundError(f"Aucun index publié dans {root}")
+    version_dir = Path(root) / name
+
+    with open(version_dir / "manifest.json", 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("schema_version") != INDEX_SCHEMA_VERSION:
+        raise ValueError(
+            f"Schéma d'index {manifest.get('schema_version')} incompatible "
+            f"(attendu: {INDEX_SCHEMA_VERSION})")
+
+    # Contrôle d'intégrité: tailles toujours, sha256 sur demande (lecture complète)
+    for filename, entry in manifest["files"].items():
+        path = version_dir / filename
+        if not path.exists() or path.stat().st_size != entry["size"]:
+            raise ValueError(f"Index corrompu: {filename} absent ou tronqué")
+        if verify_checksums and file_sha256(path) != entry["sha256"]:
+            raise ValueError(f"Index corrompu: somme de contrôle invalide pour {filename}")
+
+    def load_array(filename: str) -> np.ndarray:
+        return np.load(version_dir / filename, mmap_mode='r')
+
+    n_chunks = manifest["n_chunks"]
+    chunks = MappedChunkStore(version_dir)
+    normalized_vectors = load_array("normalized_vectors.npy")
+    if len(chunks) != n_chunks or len(normalized_vectors) != n_chunks:
+        raise ValueError("Index corrompu: nombre de chunks incohérent")
+
+    with open(version_dir / "models.pkl", 'rb') as f:
+        models = pickle.load(f)
+
+    doc_vectors = sp.csr_matrix(
+        (load_array("tfidf_data.npy"), load_array("tfidf_indices.npy"),
+         load_array("tfidf_indptr.npy")),
+        shape=tuple(manifest["tfidf_shape"]), copy=False)
+
+    snapshot = KiwiIndexSnapshot(
+        chunks,
+        models["vectorizer"], models["svd"], doc_vectors,
+        load_array("reduced_vectors.npy"),
+        version=manifest["version"], sources=manifest["sources"],
+        oov_rate=manifest["oov_rate"], ingest_version=manifest.get("ingest_version", 1))
+    snapshot.build_info = manifest.get("build_info", {})
+    snapshot.normalized_vectors = normalized_vectors
+    snapshot.type_codes = load_array("type_codes.npy")
+    snapshot.category_codes = load_array("category_codes.npy")
+    snapshot.priority_boosts = load_array("priority_boosts.npy")
+    snapshot.type_vocabulary = {
+        doc_type: code for code, doc_type in enumerate(manifest["type_vocabulary"])}
+    snapshot.category_vocabulary = {
+        category: code for code, category in enumerate(manifest["category_vocabulary"])}
+
+    # BM25 rechargé s'il a été écrit avec les paramètres actuels, sinon recalculé
+    bm25 = manifest.get("bm25")
+    if bm25 and (bm25["k1"], bm25["b"]) == (BM25_K1, BM25_B):
+        with open(version_dir / "bm25_vocabulary.json", 'r', encoding='utf-8') as f:
+            vocabulary = json.load(f)
+        snapshot.bm25_index = BM25Index(
+            vocabulary, load_array("bm25_data.npy"), load_array("bm25_indices.npy"),
+            load_array("bm25_indptr.npy"), n_chunks, bm25["k1"], bm25["b"])
+
+    # Postings by_type / by_category / by_source reconstruits depuis les codes
+    source_codes = load_array("source_codes.npy")
+    snapshot.document_metadata = {
+        'by_type': _postings(snapshot.type_vocabulary, snapshot.type_codes),
+        'by_category': _postings(snapshot.category_vocabulary, snapshot.category_codes),
+        'by_source': _postings(
+            {source: code for code, source in enumerate(manifest["source_vocabulary"])},
+            source_codes),
+        'keywords': {}
+    }
+
+    return snapshot.finalize(str(version_dir / "vector_index.npz"))
+
+
+def _postings(vocabulary: Dict[str, int], codes: np.ndarray) -> Dict[str, List[int]]:
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(vocabulary) + 1))
+    return {value: order[bounds[code]:bounds[code + 1]].tolist()
+            for value, code in vocabulary.items()}
+
+
+def is_stale(snapshot: KiwiIndexSnapshot) -> bool:
+    """Vrai si les fichiers de données ou l'extraction ont changé depuis la construction"""
+    return data_fingerprint(
+        snapshot.sources, snapshot.ingest_version) != current_data_fingerprint()
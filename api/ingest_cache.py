@@ -0,0 +1,77 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from config import *
+from chunk_store import ChunkStore
+
+# À incrémenter quand l'extraction ou le découpage change: invalide les chunks en cache
+INGEST_VERSION = 3
+
+
+def file_sha256(path: Path) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier de données"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestCache:
+    """Manifeste des fichiers de données: empreinte SHA-256 et chunks produits
+
+    Un fichier dont l'empreinte n'a pas changé n'est ni relu ni redécoupé:
+    ses chunks sont repris tels quels (un ChunkStore par fichier, picklé en
+    colonnes). Le cache entier est invalidé si les
+    paramètres de découpage changent.
+    """
+
+    def __init__(self, path: str = INGEST_CACHE_PATH):
+        self.path = path
+        self.settings = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+                         "ingest_version": INGEST_VERSION}
+        self.entries: Dict[str, Dict] = {}
+
+    @classmethod
+    def load(cls, path: str = INGEST_CACHE_PATH) -> "IngestCache":
+        cache = cls(path)
+        if not Path(path).exists():
+            return cache
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get("settings") == cache.settings:
+                cache.entries = data["entries"]
+            else:
+                print("♻️ Paramètres d'extraction modifiés: cache d'ingestion ignoré")
+        except Exception as e:
+            print(f"⚠️ Cache d'ingestion illisible, reconstruction: {e}")
+        return cache
+
+    def get(self, filename: str, sha256: str) -> Optional[ChunkStore]:
+        """Chunks en cache si le fichier n'a pas changé, sinon None"""
+        entry = self.entries.get(filename)
+        if entry is None or entry["sha256"] != sha256:
+            return None
+        return entry["chunks"]
+
+    def set(self, filename: str, sha256: str, chunks: ChunkStore):
+        self.entries[filename] = {"sha256": sha256, "chunks": chunks}
+
+    def prune(self, filenames: Iterable[str]):
+        """Oublie les fichiers supprimés du répertoire de données"""
+        keep = set(filenames)
+        for filename in list(self.entries):
+            if filename not in keep:
+                del self.entries[filename]
+
+    def save(self):
+        try:
+            with open(self.path + ".tmp", 'wb') as f:
+                pickle.dump({"settings": self.settings, "entries": self.entries}, f)
+            os.replace(self.path + ".tmp", self.path)
+        except Exception as e:
+            print(f"❌ Erreur sauvegarde cache d'ingestion: {e}")
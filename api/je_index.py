@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+def fold_text(text: str) -> str:
+    """Minuscules, sans accents, ponctuation remplacée par des espaces"""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+class JEIndex:
+    """Index inversé des Junior Entreprises par attribut
+
+    Pour chaque champ (ville, école, domaine, région), chaque mot normalisé
+    (accents et casse repliés) pointe vers l'ensemble des chunks JE qui le
+    contiennent. Un critère est satisfait si tous ses mots sont présents;
+    plusieurs critères se combinent par intersection d'ensembles.
+    """
+
+    FIELDS = ("city", "school", "domain", "region")
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self.FIELDS}
+        self.values: Dict[int, Dict[str, List[str]]] = {}  # valeurs normalisées par chunk
+        self.all_ids: Set[int] = set()
+
+    @classmethod
+    def build(cls, documents: Sequence[Dict], ids: Sequence[int]) -> "JEIndex":
+        """Indexe les chunks `ids` (type junior_entreprises) de `documents`"""
+        index = cls()
+        seen = set()
+        for doc_id in ids:
+            doc = documents[doc_id]
+            # Une JE découpée en plusieurs chunks n'est indexée qu'une fois
+            identity = (fold_text(doc.get('name', '')), fold_text(doc.get('city', '')))
+            if identity in seen:
+                continue
+            seen.add(identity)
+            index.add(int(doc_id), cls.field_values(doc))
+        return index
+
+    @staticmethod
+    def field_values(doc: Dict) -> Dict[str, List[str]]:
+        domains = doc.get('domains') or []
+        regions = [doc.get('region', '')] + (doc.get('region_context') or '').split('/')
+        return {
+            "city": [doc.get('city', '')],
+            "school": [doc.get('school', '')],
+            "domain": [doc.get('domain', '')] + list(domains),
+            "region": regions
+        }
+
+    def add(self, doc_id: int, values: Dict[str, List[str]]):
+        folded_values = {}
+        for field in self.FIELDS:
+            folded = [fold_text(value) for value in values.get(field, []) if value]
+            folded_values[field] = [value for value in folded if value]
+            for value in folded_values[field]:
+                for token in value.split():
+                    self.postings[field].setdefault(token, set()).add(doc_id)
+        self.values[doc_id] = folded_values
+        self.all_ids.add(doc_id)
+
+    def match(self, criteria: Dict[str, Optional[str]]) -> Set[int]:
+        """Chunks satisfaisant tous les critères renseignés"""
+        matched = None
+        for field, value in criteria.items():
+            if not value:
+                continue
+            for token in fold_text(value).split():
+                ids = self.postings[field].get(token, set())
+                matched = ids if matched is None else matched & ids
+                if not matched:
+                    return set()
+        return set(self.all_ids) if matched is None else set(matched)
+
+    def exact_matches(self, doc_id: int, criteria: Dict[str, Optional[str]]) -> int:
+        """Nombre de critères égaux à une valeur complète (et non à un seul mot)"""
+        return sum(
+            1 for field, value in criteria.items()
+            if value and fold_text(value) in self.values[doc_id][field])
+
+    def search(self, criteria: Dict[str, Optional[str]], offset: int = 0,
+               limit: Optional[int] = None,
+               tiebreak: Callable[[np.ndarray], np.ndarray] = None) -> Tuple[List[Tuple[int, float]], int]:
+        """Page de résultats [(id, score)] et nombre total de correspondances
+
+        Tri: critères exacts d'abord, puis similarité vectorielle (`tiebreak`)
+        à égalité, puis id pour un ordre stable entre les pages.
+        """
+        ids = np.array(sorted(self.match(criteria)), dtype=np.int64)
+        total = len(ids)
+        if total == 0:
+            return [], 0
+
+        exact = np.array([self.exact_matches(i, criteria) for i in ids])
+        scores = tiebreak(ids) if tiebreak is not None else np.zeros(total)
+        order = np.lexsort((ids, -scores, -exact))
+
+        end = total if limit is None else offset + limit
+        page = order[offset:end]
+        return [(int(ids[i]), float(scores[i])) for i in page], total
@@ -0,0 +1,146 @@
+import json
+from typing import Any, Iterator, TextIO, Tuple
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+READ_SIZE = 1 << 16  # Caractères lus par appel (doublé tant qu'un enregistrement est incomplet)
+
+
+class StreamedArray(list):
+    """Tableau JSON lu à la demande: chaque élément est décodé quand on l'itère
+
+    Sous-classe (vide) de list pour que les parcours existants
+    (isinstance(obj, list), enumerate) s'appliquent tels quels. Une seule
+    itération possible, dans l'ordre du fichier.
+    """
+
+    def __init__(self, elements: Iterator[Any]):
+        super().__init__()
+        self._elements = elements
+
+    def __iter__(self) -> Iterator[Any]:
+        return self._elements
+
+
+class StreamedObject(dict):
+    """Objet JSON racine lu à la demande: items() décode les clés une à une
+
+    Les valeurs tableaux sont des StreamedArray; les autres valeurs sont
+    décodées entièrement. Sous-classe (vide) de dict: `key in obj` est
+    toujours faux, la racine n'est donc jamais prise pour un enregistrement.
+    """
+
+    def __init__(self, entries: Iterator[Tuple[str, Any]]):
+        super().__init__()
+        self._entries = entries
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return self._entries
+
+
+class JSONStreamReader:
+    """Lecture incrémentale d'un fichier JSON, un enregistrement à la fois
+
+    Seuls la racine et les tableaux de premier niveau sont parcourus
+    caractère par caractère; chaque élément est décodé d'un bloc par le
+    décodeur C de la bibliothèque standard (raw_decode) sur un tampon
+    glissant. La mémoire suit le plus gros élément, pas la taille du fichier.
+    """
+
+    def __init__(self, f: TextIO, read_size: int = READ_SIZE):
+        self._f = f
+        self._read_size = read_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        data = self._f.read(size)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Prochain caractère significatif ("" en fin de fichier)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._read_size):
+                return ""
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"JSON invalide: '{char}' attendu, '{found}' trouvé")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Décode la valeur suivante en entier"""
+        self._peek()
+        size = self._read_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+                # Un nombre coupé par la fin du tampon ("0." de "0.1") se décode
+                # aussi: on ne conclut que sur un délimiteur ou en fin de fichier
+                if (end < len(self._buffer) and self._buffer[end] in _DELIMITERS) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+    def iter_array(self) -> Iterator[Any]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"JSON invalide: ',' ou ']' attendu, '{separator}' trouvé")
+
+    def iter_object(self) -> Iterator[Tuple[str, Any]]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            if self._peek() == "[":
+                elements = self.iter_array()
+                yield key, StreamedArray(elements)
+                for _ in elements:  # Éléments ignorés par le parcours: on avance quand même
+                    pass
+            else:
+                yield key, self.read_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"JSON invalide: ',' ou '}}' attendu, '{separator}' trouvé")
+
+
+def stream_json(f: TextIO) -> Any:
+    """Racine du fichier, lue à la demande si c'est un objet ou un tableau"""
+    reader = JSONStreamReader(f)
+    first = reader._peek()
+    if first == "{":
+        return StreamedObject(reader.iter_object())
+    if first == "[":
+        return StreamedArray(reader.iter_array())
+    return reader.read_value()
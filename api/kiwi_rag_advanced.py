@@ -1,44 +1,152 @@
+import asyncio
+import io
 import json
 import os
-import pickle
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Iterator
 import numpy as np
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
 import anthropic
 from tqdm import tqdm
 import re
+import sys
+import threading
+import uuid
+try:
+    import resource  # Unix uniquement: mesure du pic mémoire
+except ImportError:
+    resource = None
 from config import *
+from answer_cache import create_answer_cache, create_semantic_cache, question_terms
+from bm25 import fuse_scores, max_normalize
+from chunk_store import ChunkStore
+from context_builder import NO_CONTEXT, build_context
+from metrics import (ASK_TOTAL, FAQ_SEARCH_ANSWER, INDEX_STAGE_SECONDS, LLM_ERRORS, LLM_SECONDS,
+                     PROMPT_TOKENS, REQUEST_SECONDS, STAGE_SECONDS, estimate_tokens,
+                     record_llm_usage)
+from index_snapshot import KiwiIndexSnapshot
+from ingest_cache import INGEST_VERSION, IngestCache, file_sha256
+from json_stream import stream_json
+from index_store import (IndexBuildLock, is_stale, load_index_snapshot,
+                         read_current_version, save_index_snapshot)
+
+
+_INGEST_RAG = None
+
+
+def _str_prefix(value: Any, limit: int) -> str:
+    """Les `limit` premiers caractères de str(value), sans sérialiser tout l'arbre
+
+    Le parcours s'arrête dès que la limite est atteinte: coût borné par
+    `limit` (et par la plus grande feuille rencontrée), pas par la taille
+    du sous-arbre.
+    """
+    if isinstance(value, str):
+        return value[:limit]
+    parts, size = [], 0
+
+    def emit(piece: str) -> bool:
+        nonlocal size
+        parts.append(piece)
+        size += len(piece)
+        return size >= limit
+
+    def walk(obj) -> bool:
+        """Ajoute repr(obj) morceau par morceau; True quand la limite est atteinte"""
+        if isinstance(obj, dict):
+            if emit("{"):
+                return True
+            for i, (key, item) in enumerate(obj.items()):
+                if (i and emit(", ")) or walk(key) or emit(": ") or walk(item):
+                    return True
+            return emit("}")
+        if isinstance(obj, list):
+            if emit("["):
+                return True
+            for i, item in enumerate(obj):
+                if (i and emit(", ")) or walk(item):
+                    return True
+            return emit("]")
+        if isinstance(obj, str) and len(obj) > limit:
+            # repr choisit ses guillemets d'après la chaîne entière: le marqueur
+            # ajouté au préfixe force le même choix (il tombe après la limite)
+            marker = "'" if "'" in obj and '"' not in obj else '"'
+            return emit(repr(obj[:limit] + marker))
+        return emit(repr(obj))
+
+    walk(value)
+    return "".join(parts)[:limit]
+
+
+def _ingest_kiwi_file_worker(json_file: Path) -> Tuple[ChunkStore, Dict[str, float], str]:
+    """Point d'entrée d'un processus d'ingestion (fonction de module: picklable)
+
+    Le traitement des fichiers est sans état: une instance sans clients Claude
+    ni index suffit. Les messages sont capturés et réaffichés par le processus
+    parent dans l'ordre des fichiers.
+    """
+    global _INGEST_RAG
+    if _INGEST_RAG is None:
+        _INGEST_RAG = AdvancedKiwiRAG.__new__(AdvancedKiwiRAG)
+    log = io.StringIO()
+    with redirect_stdout(log):
+        chunks, timings = _INGEST_RAG._ingest_kiwi_file(json_file)
+    return chunks, timings, log.getvalue()
 
 
 class AdvancedKiwiRAG:
     def __init__(self):
-        self.claude_client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
-
-        # Système vectoriel avancé
-        self.vectorizer = TfidfVectorizer(
+        self.claude_client = anthropic.Anthropic(
+            api_key=CLAUDE_API_KEY,
+            base_url=CLAUDE_BASE_URL,
+            timeout=LLM_TIMEOUT_SECONDS)
+
+        # Client asynchrone pour ne pas bloquer la boucle d'événements FastAPI
+        self.async_claude_client = anthropic.AsyncAnthropic(
+            api_key=CLAUDE_API_KEY,
+            base_url=CLAUDE_BASE_URL,
+            timeout=LLM_TIMEOUT_SECONDS)
+        self.llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+        # Latences par requête (retrieval, premier token, total)
+        self.latency_log = deque(maxlen=LATENCY_LOG_SIZE)
+
+        # Cache des réponses (question normalisée + type + empreinte du contexte)
+        self.answer_cache = create_answer_cache()
+        # Cache sémantique (questions proches dans l'espace SVD, vidé à chaque réindexation)
+        self.semantic_cache = create_semantic_cache()
+
+        # Index publié (remplacé atomiquement à chaque réindexation)
+        self.index = KiwiIndexSnapshot()
+
+        # Mode de recherche (dense, bm25, hybrid) et méthode de fusion hybride
+        self.retrieval_mode = RETRIEVAL_MODE
+        self.fusion_method = FUSION_METHOD
+
+        # Réindexation en arrière-plan: une seule à la fois
+        self._reindex_lock = threading.Lock()
+        self.reindex_status = {"state": "idle"}
+
+    @staticmethod
+    def _create_vectorizer() -> TfidfVectorizer:
+        """Système vectoriel avancé"""
+        return TfidfVectorizer(
             max_features=5000,
             ngram_range=(1, 3),  # Uni, bi et trigrammes
             stop_words=None,
             min_df=2,
             max_df=0.8,
             analyzer='word',
-            lowercase=True
+            lowercase=True,
+            dtype=np.float32  # Matrice creuse en float32: moitié moins de mémoire
         )
 
-        # Réduction dimensionnelle pour de meilleures performances
-        self.svd = TruncatedSVD(n_components=300, random_state=42)
-
-        # Stockage
-        self.documents = []
-        self.doc_vectors = None
-        self.reduced_vectors = None
-
-        # Métadonnées pour améliorer la recherche
-        self.document_metadata = {}
-
     def load_and_process_all_kiwi_data(self) -> List[Dict]:
         """Charge et traite intelligemment tous les fichiers Kiwi"""
         all_documents = []
@@ -50,41 +158,189 @@ class AdvancedKiwiRAG:
         print(f"📁 Fichiers détectés: {[f.name for f in json_files]}")
 
         for json_file in json_files:
-            print(f"\n📄 Traitement avancé: {json_file.name}")
-
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                # Détection intelligente du type
-                file_type = self._detect_kiwi_file_type(json_file.name, data)
-                print(f"   🎯 Type détecté: {file_type}")
-
-                # Traitement spécialisé
-                documents = self._process_by_type(
-                    data, json_file.name, file_type)
-                all_documents.extend(documents)
-
-                print(
-                    f"   ✅ {len(documents)} sections extraites et optimisées")
-
+                all_documents.extend(self._process_kiwi_file(json_file))
             except Exception as e:
                 print(f"   ❌ Erreur: {e}")
 
         print(f"\n🎯 Total optimisé: {len(all_documents)} documents")
         return all_documents
 
-    def _detect_kiwi_file_type(self, filename: str, data: Any) -> str:
-        """Détection intelligente du type de fichier Kiwi"""
-        filename_lower = filename.lower()
+    def _process_kiwi_file(self, json_file: Path) -> List[Dict]:
+        """Lit, type et traite un fichier Kiwi"""
+        print(f"\n📄 Traitement avancé: {json_file.name}")
 
-        # Détection par nom de fichier
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # Détection intelligente du type
+        file_type = self._detect_kiwi_file_type(json_file.name, data)
+        print(f"   🎯 Type détecté: {file_type}")
+
+        # Traitement spécialisé
+        documents = self._process_by_type(
+            data, json_file.name, file_type)
+
+        print(
+            f"   ✅ {len(documents)} sections extraites et optimisées")
+        return documents
+
+    def load_kiwi_chunks_incremental(self) -> Tuple[Dict[str, ChunkStore], Dict[str, str], Dict]:
+        """Chunks par fichier: seuls les fichiers nouveaux ou modifiés sont retraités
+
+        Les fichiers à retraiter sont lus et découpés en parallèle (un processus
+        par fichier, voir _ingest_kiwi_files). Renvoie ({fichier: chunks},
+        {fichier: sha256}, rapport d'ingestion) dans l'ordre alphabétique des
+        fichiers, quel que soit l'ordre de fin des processus.
+        """
+        start = time.perf_counter()
+        data_path = Path(DATA_DIR)
+        cache = IngestCache.load()
+        file_chunks, file_hashes, timings = {}, {}, {}
+
+        print("🔍 Analyse intelligente des fichiers Kiwi...")
+
+        json_files = sorted(data_path.glob("*.json"))
+        print(f"📁 Fichiers détectés: {[f.name for f in json_files]}")
+
+        digests = {json_file.name: file_sha256(json_file) for json_file in json_files}
+        cached = {name: cache.get(name, digest) for name, digest in digests.items()}
+        processed, workers = self._ingest_kiwi_files(
+            [f for f in json_files if cached[f.name] is None])
+
+        for json_file in json_files:
+            name = json_file.name
+            if cached[name] is not None:
+                chunks = cached[name]
+                print(f"♻️ Inchangé: {name} ({len(chunks)} chunks en cache)")
+                timings[name] = {"cached": True, "chunks": len(chunks)}
+            elif name in processed:
+                chunks, file_timings = processed[name]
+                cache.set(name, digests[name], chunks)
+                timings[name] = {"cached": False, "chunks": len(chunks), **file_timings}
+            else:
+                continue
+
+            file_chunks[name] = chunks
+            file_hashes[name] = digests[name]
+
+        cache.prune(file_hashes)
+        cache.save()
+        report = {"workers": workers, "seconds": round(time.perf_counter() - start, 3),
+                  "files": timings}
+        print(f"📥 Ingestion: {len(processed)} fichier(s) traité(s) en {report['seconds']:.2f}s "
+              f"({workers} processus)")
+        return file_chunks, file_hashes, report
+
+    def _ingest_kiwi_files(self, json_files: List[Path]) -> Tuple[Dict[str, Tuple[ChunkStore, Dict]], int]:
+        """Lit et découpe des fichiers, en parallèle quand le volume le justifie
+
+        Chaque fichier est traité indépendamment dans un processus du pool (le
+        parsing JSON et le découpage sont du Python pur, limités par le GIL).
+        En dessous de INGEST_PARALLEL_MIN_BYTES, le démarrage des processus
+        coûte plus que le traitement: on reste dans le processus courant.
+        Renvoie ({fichier: (chunks, durées)}, nombre de processus); les
+        fichiers en erreur sont signalés et omis.
+        """
+        workers = min(INGEST_WORKERS or os.cpu_count() or 1, len(json_files))
+        total_bytes = sum(f.stat().st_size for f in json_files)
+        if workers <= 1 or total_bytes < INGEST_PARALLEL_MIN_BYTES:
+            workers = 1
+
+        results = {}
+        if workers == 1:
+            for json_file in json_files:
+                try:
+                    results[json_file.name] = self._ingest_kiwi_file(json_file)
+                except Exception as e:
+                    print(f"   ❌ Erreur: {e}")
+        else:
+            print(f"⚙️ Ingestion parallèle: {len(json_files)} fichiers, {workers} processus")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [(f, pool.submit(_ingest_kiwi_file_worker, f)) for f in json_files]
+                # Résultats relus dans l'ordre de soumission: journal et chunks déterministes
+                for json_file, future in futures:
+                    try:
+                        chunks, file_timings, log = future.result()
+                    except Exception as e:
+                        print(f"\n📄 {json_file.name}\n   ❌ Erreur: {e}")
+                        continue
+                    print(log, end="")
+                    results[json_file.name] = (chunks, file_timings)
+
+        for name, (chunks, file_timings) in results.items():
+            INDEX_STAGE_SECONDS.observe(file_timings["load_s"], stage="load")
+            INDEX_STAGE_SECONDS.observe(file_timings["chunk_s"], stage="chunk")
+            print(f"⏱️ {name}: lecture {file_timings['load_s']:.3f}s, "
+                  f"découpage {file_timings['chunk_s']:.3f}s ({len(chunks)} chunks)")
+        return results, workers
+
+    def _ingest_kiwi_file(self, json_file: Path) -> Tuple[ChunkStore, Dict[str, float]]:
+        """Lecture + découpage d'un fichier, avec la durée de chaque étape"""
+        # Gros fichier de type connu par son nom: lecture en flux (le générique
+        # re-sérialise tout le fichier et la détection par contenu lit l'arbre)
+        file_type = self._file_type_from_name(json_file.name)
+        if file_type is not None and json_file.stat().st_size >= INGEST_STREAM_MIN_BYTES:
+            return self._ingest_kiwi_file_streaming(json_file, file_type)
+
+        start = time.perf_counter()
+        documents = self._process_kiwi_file(json_file)
+        loaded = time.perf_counter()
+        chunks = self.create_advanced_chunks(documents)
+        return chunks, {"load_s": round(loaded - start, 4),
+                        "chunk_s": round(time.perf_counter() - loaded, 4)}
+
+    def _ingest_kiwi_file_streaming(self, json_file: Path,
+                                    file_type: str) -> Tuple[ChunkStore, Dict[str, float]]:
+        """Lecture en flux: les documents sont extraits et découpés un à un
+
+        Ni l'arbre JSON complet ni la liste des documents ne sont construits:
+        seul l'enregistrement en cours (une page, une Q&A, une JE) et sa
+        re-sérialisation sont en mémoire en plus des chunks déjà produits.
+        Les durées séparent le temps passé à lire/extraire et à découper.
+        """
+        print(f"\n📄 Traitement en flux: {json_file.name}")
+        print(f"   🎯 Type détecté: {file_type}")
+        start = time.perf_counter()
+        load_seconds, n_documents = 0.0, 0
+
+        def timed_documents(documents: Iterator[Dict]) -> Iterator[Dict]:
+            nonlocal load_seconds, n_documents
+            iterator = iter(documents)
+            while True:
+                started = time.perf_counter()
+                document = next(iterator, None)
+                load_seconds += time.perf_counter() - started
+                if document is None:
+                    return
+                n_documents += 1
+                yield document
+
+        with open(json_file, 'r', encoding='utf-8') as f:
+            documents = self._iter_documents_by_type(stream_json(f), json_file.name, file_type)
+            chunks = self.create_advanced_chunks(timed_documents(documents))
+
+        print(f"   ✅ {n_documents} sections extraites et optimisées")
+        return chunks, {"load_s": round(load_seconds, 4),
+                        "chunk_s": round(time.perf_counter() - start - load_seconds, 4)}
+
+    def _file_type_from_name(self, filename: str) -> Optional[str]:
+        """Type déduit du nom de fichier (KIWI_FILE_TYPES), None si ambigu"""
+        filename_lower = filename.lower()
         for pattern, file_type in KIWI_FILE_TYPES.items():
             if pattern in filename_lower:
                 return file_type
+        return None
+
+    def _detect_kiwi_file_type(self, filename: str, data: Any) -> str:
+        """Détection intelligente du type de fichier Kiwi"""
+        # Détection par nom de fichier
+        file_type = self._file_type_from_name(filename)
+        if file_type is not None:
+            return file_type
 
-        # Détection par contenu si nom ambigu
-        data_str = str(data)[:1000].lower()
+        # Détection par contenu si nom ambigu (début du fichier seulement)
+        data_str = _str_prefix(data, 1000).lower()
 
         if any(word in data_str for word in [
                'question', 'answer', 'faq', 'reponse']):
@@ -101,6 +357,11 @@ class AdvancedKiwiRAG:
     def _process_by_type(self, data: Any, filename: str,
                          file_type: str) -> List[Dict]:
         """Traitement spécialisé selon le type détecté"""
+        return list(self._iter_documents_by_type(data, filename, file_type))
+
+    def _iter_documents_by_type(self, data: Any, filename: str,
+                                file_type: str) -> Iterator[Dict]:
+        """Documents extraits au fil du parcours (data peut être lu en flux, voir json_stream)"""
         processors = {
             'faq': self._process_faq_advanced,
             'junior_entreprises': self._process_junior_entreprises_advanced,
@@ -112,9 +373,8 @@ class AdvancedKiwiRAG:
         return processor(data, filename, file_type)
 
     def _process_faq_advanced(
-            self, data: Any, filename: str, file_type: str) -> List[Dict]:
+            self, data: Any, filename: str, file_type: str) -> Iterator[Dict]:
         """Traitement avancé des FAQ Kiwi Legal"""
-        documents = []
 
         def extract_qa_recursive(obj, category_path="", depth=0):
             if depth > 5:  # Éviter récursion infinie
@@ -126,33 +386,32 @@ class AdvancedKiwiRAG:
                         qa_doc = self._extract_single_qa(
                             item, category_path, i)
                         if qa_doc:
-                            documents.append({
+                            yield {
                                 **qa_doc,
                                 "source": filename,
                                 "type": file_type,
                                 "category_path": category_path,
                                 "priority": self._calculate_faq_priority(qa_doc)
-                            })
+                            }
 
             elif isinstance(obj, dict):
                 # Vérifier si c'est une Q&A directe
                 if self._is_qa_object(obj):
                     qa_doc = self._extract_single_qa(obj, category_path, 0)
                     if qa_doc:
-                        documents.append({
+                        yield {
                             **qa_doc,
                             "source": filename,
                             "type": file_type,
                             "category_path": category_path
-                        })
+                        }
                 else:
                     # Explorer récursivement
                     for key, value in obj.items():
                         new_path = f"{category_path}/{key}" if category_path else key
-                        extract_qa_recursive(value, new_path, depth + 1)
+                        yield from extract_qa_recursive(value, new_path, depth + 1)
 
-        extract_qa_recursive(data)
-        return documents
+        yield from extract_qa_recursive(data)
 
     def _extract_single_qa(self, obj: dict, category: str, index: int) -> Dict:
         """Extrait une paire question-réponse avec enrichissement"""
@@ -220,9 +479,8 @@ class AdvancedKiwiRAG:
                 category)}
 
     def _process_junior_entreprises_advanced(
-            self, data: Any, filename: str, file_type: str) -> List[Dict]:
+            self, data: Any, filename: str, file_type: str) -> Iterator[Dict]:
         """Traitement avancé des Junior Entreprises"""
-        documents = []
 
         def extract_je_recursive(obj, region_context=""):
             if isinstance(obj, list):
@@ -231,32 +489,31 @@ class AdvancedKiwiRAG:
                         je_doc = self._extract_single_je(
                             item, region_context, i)
                         if je_doc:
-                            documents.append({
+                            yield {
                                 **je_doc,
                                 "source": filename,
                                 "type": file_type,
                                 "region_context": region_context
-                            })
+                            }
 
             elif isinstance(obj, dict):
                 # Vérifier si c'est une JE directe
                 if self._is_je_object(obj):
                     je_doc = self._extract_single_je(obj, region_context, 0)
                     if je_doc:
-                        documents.append({
+                        yield {
                             **je_doc,
                             "source": filename,
                             "type": file_type,
                             "region_context": region_context
-                        })
+                        }
                 else:
                     # Explorer par régions/catégories
                     for key, value in obj.items():
                         new_context = f"{region_context}/{key}" if region_context else key
-                        extract_je_recursive(value, new_context)
+                        yield from extract_je_recursive(value, new_context)
 
-        extract_je_recursive(data)
-        return documents
+        yield from extract_je_recursive(data)
 
     def _extract_single_je(self, obj: dict, region: str, index: int) -> Dict:
         """Extrait et enrichit les infos d'une Junior Entreprise"""
@@ -266,7 +523,9 @@ class AdvancedKiwiRAG:
         school = self._get_flexible_field(
             obj, ['ecole', 'school', 'etablissement', 'universite'])
         domain = self._get_flexible_field(
-            obj, ['domaine', 'domain', 'secteur', 'specialite'])
+            obj, ['domaine', 'domain', 'secteur', 'specialite', 'domaines'])
+        domains = obj.get('domaines') or obj.get('domains') or []
+        region_name = self._get_flexible_field(obj, ['region', 'région'])
         website = self._get_flexible_field(
             obj, ['site_web', 'website', 'url', 'site'])
         email = self._get_flexible_field(
@@ -309,15 +568,16 @@ class AdvancedKiwiRAG:
             "domain": domain,
             "website": website,
             "email": email,
+            "region": region_name,
+            "domains": [str(d) for d in domains] if isinstance(domains, list) else [str(domains)],
             "enriched_content": self._create_je_searchable_content(
                 name,
                 city,
                 school,
                 domain)}
 
-    def _process_legal_site_advanced(self, data: Any, filename: str, file_type: str) -> List[Dict]:
+    def _process_legal_site_advanced(self, data: Any, filename: str, file_type: str) -> Iterator[Dict]:
         """Traitement avancé du site Kiwi Legal scrapé"""
-        documents = []
 
         def extract_legal_content(obj, url_path="", section_type=""):
             if isinstance(obj, dict):
@@ -328,23 +588,23 @@ class AdvancedKiwiRAG:
                         legal_doc = self._extract_legal_page(
                             key, value, current_path, section_type)
                         if legal_doc:
-                            documents.append({
+                            yield {
                                 **legal_doc,
                                 "source": filename,
                                 "type": file_type,
                                 "url_path": current_path,
-                                "legal_category": self._categorize_legal_content(key, value)
-                            })
+                                "legal_category": self._categorize_legal_content(
+                                    legal_doc["content"])
+                            }
                     elif isinstance(value, dict):
-                        extract_legal_content(value, current_path, key)
+                        yield from extract_legal_content(value, current_path, key)
                     elif isinstance(value, list):
                         for i, item in enumerate(value):
                             if isinstance(item, dict):
-                                extract_legal_content(
+                                yield from extract_legal_content(
                                     item, f"{current_path}[{i}]", key)
 
-        extract_legal_content(data)
-        return documents
+        yield from extract_legal_content(data)
 
     def _extract_legal_page(self, key: str, value: Any, path: str, section_type: str) -> Dict:
         """Extrait une page légale"""
@@ -360,9 +620,8 @@ class AdvancedKiwiRAG:
         }
         
     def _process_rse_formation_advanced(
-            self, data: Any, filename: str, file_type: str) -> List[Dict]:
+            self, data: Any, filename: str, file_type: str) -> Iterator[Dict]:
         """Traitement avancé des formations RSE"""
-        documents = []
 
         def extract_rse_content(obj, module_path="", formation_type=""):
             if isinstance(obj, dict):
@@ -372,18 +631,18 @@ class AdvancedKiwiRAG:
                         rse_doc = self._extract_rse_module(
                             key, value, current_path, formation_type)
                         if rse_doc:
-                            documents.append({
+                            yield {
                                 **rse_doc,
                                 "source": filename,
                                 "type": file_type,
                                 "module_path": current_path,
-                                "rse_category": self._categorize_rse_content(key, value)
-                            })
+                                "rse_category": self._categorize_rse_content(
+                                    rse_doc["content"])
+                            }
                     elif isinstance(value, dict):
-                        extract_rse_content(value, current_path, key)
+                        yield from extract_rse_content(value, current_path, key)
 
-        extract_rse_content(data)
-        return documents
+        yield from extract_rse_content(data)
 
     def _extract_rse_module(self, key: str, value: Any, path: str, formation_type: str) -> Dict:
         """Extrait un module RSE"""
@@ -425,6 +684,8 @@ class AdvancedKiwiRAG:
         """Récupère une valeur avec clés flexibles"""
         for key in possible_keys:
             if key in obj and obj[key]:
+                if isinstance(obj[key], list):
+                    return ", ".join(map(str, obj[key])).strip()
                 return str(obj[key]).strip()
         return ""
 
@@ -457,7 +718,7 @@ class AdvancedKiwiRAG:
         return any(
             indicator in str(key).lower() for indicator in legal_indicators) and isinstance(
             value, (dict, str)) and len(
-            str(value)) > 100
+            _str_prefix(value, 101)) > 100
 
     def _is_rse_module(self, key: str, value: Any) -> bool:
         """Vérifie si c'est un module RSE"""
@@ -470,7 +731,7 @@ class AdvancedKiwiRAG:
         return any(
             indicator in str(key).lower() for indicator in rse_indicators) and isinstance(
             value, (dict, str)) and len(
-            str(value)) > 50
+            _str_prefix(value, 51)) > 50
 
     def _create_searchable_content(
             self, question: str, answer: str, category: str) -> str:
@@ -518,9 +779,9 @@ class AdvancedKiwiRAG:
 
         return priority
 
-    def _categorize_legal_content(self, key: str, value: Any) -> str:
-        """Catégorise le contenu légal"""
-        content_str = f"{key} {str(value)}".lower()
+    def _categorize_legal_content(self, content: str) -> str:
+        """Catégorise le contenu légal (texte déjà sérialisé de la page, titre inclus)"""
+        content_str = content.lower()
 
         categories = {
             'contrats': ['contrat', 'contract', 'accord', 'convention'],
@@ -537,9 +798,9 @@ class AdvancedKiwiRAG:
 
         return 'general'
 
-    def _categorize_rse_content(self, key: str, value: Any) -> str:
-        """Catégorise le contenu RSE"""
-        content_str = f"{key} {str(value)}".lower()
+    def _categorize_rse_content(self, content: str) -> str:
+        """Catégorise le contenu RSE (texte déjà sérialisé du module, titre inclus)"""
+        content_str = content.lower()
 
         categories = {
             'environnement': [
@@ -579,9 +840,13 @@ class AdvancedKiwiRAG:
 
     # =============== SYSTÈME VECTORIEL AVANCÉ ===============
 
-    def create_advanced_chunks(self, documents: List[Dict]) -> List[Dict]:
-        """Création de chunks avec préprocessing avancé"""
-        chunks = []
+    def create_advanced_chunks(self, documents: List[Dict]) -> ChunkStore:
+        """Création de chunks avec préprocessing avancé
+
+        Chaque document est stocké une fois comme parent; ses chunks n'en
+        portent que le texte (voir ChunkStore).
+        """
+        chunks = ChunkStore()
 
         print("✂️ Création de chunks intelligents...")
 
@@ -599,55 +864,20 @@ class AdvancedKiwiRAG:
             else:
                 target_size = CHUNK_SIZE
 
+            parent_id = chunks.add_parent(doc)
             if len(content) <= target_size:
-                # Enrichissement du contenu court
-                enriched_doc = doc.copy()
-                enriched_doc["search_content"] = self._create_search_optimized_content(
-                    doc)
-                chunks.append(enriched_doc)
+                # Contenu court: un seul chunk (search_content calculé à la lecture)
+                chunks.append(parent_id, content)
             else:
                 # Découpage intelligent préservant le contexte
                 chunk_parts = self._intelligent_split(
                     content, target_size, doc_type)
                 for i, part in enumerate(chunk_parts):
-                    chunk_doc = doc.copy()
-                    chunk_doc["content"] = part
-                    chunk_doc["chunk_id"] = f"{doc.get('source', 'doc')}_{doc_type}_{i}"
-                    chunk_doc["search_content"] = self._create_search_optimized_content(
-                        chunk_doc)
-                    chunks.append(chunk_doc)
+                    chunks.append(
+                        parent_id, part, f"{doc.get('source', 'doc')}_{doc_type}_{i}")
 
         return chunks
 
-    def _create_search_optimized_content(self, doc: Dict) -> str:
-        """Crée un contenu optimisé pour la recherche vectorielle"""
-        content = doc.get("content", "")
-        doc_type = doc.get("type", "")
-
-        # Extraction d'éléments importants selon le type
-        if doc_type == "faq":
-            question = doc.get("question", "")
-            answer = doc.get("answer", "")
-            category = doc.get("category", "")
-            return f"{category} {question} {answer} FAQ junior entreprise"
-
-        elif doc_type == "junior_entreprises":
-            name = doc.get("name", "")
-            city = doc.get("city", "")
-            domain = doc.get("domain", "")
-            school = doc.get("school", "")
-            return f"{name} {city} {domain} {school} junior entreprise"
-
-        elif doc_type == "legal_site":
-            category = doc.get("legal_category", "")
-            return f"{content} {category} juridique legal"
-
-        elif doc_type == "rse_formation":
-            category = doc.get("rse_category", "")
-            return f"{content} {category} RSE formation durable"
-
-        return content
-
     def _intelligent_split(self, content: str, max_size: int,
                            doc_type: str) -> List[str]:
         """Découpage intelligent préservant le contexte"""
@@ -674,20 +904,40 @@ class AdvancedKiwiRAG:
 
         return chunks
 
-    def index_documents_advanced(self):
-        """Indexation avancée avec système vectoriel optimisé"""
+    def build_index_snapshot(self, progress=None) -> KiwiIndexSnapshot:
+        """Construit un index complet sans toucher à l'index publié"""
+        report = progress or (lambda stage, fraction: None)
         print("🚀 Indexation avancée Kiwi...")
 
-        # 1. Chargement et traitement intelligent
-        documents = self.load_and_process_all_kiwi_data()
-        if not documents:
+        # 1. Chargement et découpage (fichiers inchangés repris du cache)
+        report("load", 0.0)
+        file_chunks, file_hashes, ingest = self.load_kiwi_chunks_incremental()
+        chunks = ChunkStore.concat(file_chunks.values())
+        if not chunks:
             print("❌ Aucun document trouvé")
-            return
-
-        # 2. Création de chunks optimisés
-        chunks = self.create_advanced_chunks(documents)
+            return None
 
+        # 2. Réutilisation des vecteurs existants si le vocabulaire n'a pas dérivé
+        snapshot = None
+        if INCREMENTAL_EMBEDDING:
+            report("embed", 0.4)
+            with INDEX_STAGE_SECONDS.time(stage="embed_incremental"):
+                snapshot = self._embed_incremental(self.index, file_chunks, file_hashes)
+            if snapshot is not None:
+                report("index", 0.85)
+                with INDEX_STAGE_SECONDS.time(stage="finalize"):
+                    snapshot = snapshot.finalize()
+
+        if snapshot is None:
+            snapshot = self._fit_index_snapshot(chunks, file_hashes, report)
+        snapshot.build_info["ingest"] = ingest
+        return snapshot
+
+    def _fit_index_snapshot(self, chunks: ChunkStore, file_hashes: Dict[str, str],
+                            report) -> KiwiIndexSnapshot:
+        """Réajustement complet du TF-IDF et de la SVD"""
         # 3. Préparation des textes pour vectorisation
+        report("vectorize", 0.4)
         print(f"🧠 Vectorisation avancée de {len(chunks)} chunks...")
 
         # Contenu principal pour recherche
@@ -697,111 +947,391 @@ class AdvancedKiwiRAG:
                 chunk["content"]) for chunk in chunks]
 
         # Création des vecteurs TF-IDF
-        self.doc_vectors = self.vectorizer.fit_transform(search_texts)
+        vectorizer = self._create_vectorizer()
+        with INDEX_STAGE_SECONDS.time(stage="fit"):
+            doc_vectors = vectorizer.fit_transform(search_texts)
 
         # Réduction dimensionnelle pour performances
+        report("svd", 0.6)
         print("📊 Optimisation dimensionnelle...")
 
        # Vérification des dimensions avant SVD
-        n_features = self.doc_vectors.shape[1]
-        n_samples = self.doc_vectors.shape[0]
+        n_features = doc_vectors.shape[1]
+        n_samples = doc_vectors.shape[0]
         max_components = min(n_features, n_samples) - 1
 
+        # Réduction dimensionnelle pour de meilleures performances
+        svd = TruncatedSVD(n_components=300, random_state=42)
+
         if max_components > 1:
             # Ajuster le nombre de composantes SVD
-            target_components = getattr(self.svd, 'n_components', 300)
+            target_components = svd.n_components
             actual_components = min(target_components, max_components)
 
             # Recréer SVD avec les bonnes dimensions si nécessaire
             if actual_components != target_components:
-                from sklearn.decomposition import TruncatedSVD
-                self.svd = TruncatedSVD(
+                svd = TruncatedSVD(
                     n_components=actual_components, random_state=42)
                 print(
                     f"🔧 SVD ajustée: {actual_components} composantes (max: {max_components})")
 
-            self.reduced_vectors = self.svd.fit_transform(
-                self.doc_vectors.toarray())
+            # TruncatedSVD accepte directement la matrice CSR: pas de densification
+            with INDEX_STAGE_SECONDS.time(stage="svd"):
+                reduced_vectors = svd.fit_transform(
+                    doc_vectors).astype(np.float32, copy=False)
         else:
             print(
                 f"⚠️ Pas assez de données pour SVD ({n_features} features, {n_samples} samples)")
-            self.reduced_vectors = self.doc_vectors.toarray()
+            reduced_vectors = doc_vectors.toarray()
+
+        # 4. Index vectoriel et métadonnées pour améliorer la recherche
+        report("index", 0.85)
+        snapshot = KiwiIndexSnapshot(
+            chunks, vectorizer, svd, doc_vectors, reduced_vectors,
+            sources=file_hashes,
+            oov_rate=self._oov_rate(vectorizer, search_texts))
+        snapshot.build_info = {"mode": "full", "embedded_chunks": len(chunks),
+                               "reused_chunks": 0}
+        with INDEX_STAGE_SECONDS.time(stage="finalize"):
+            return snapshot.finalize()
+
+    def _embed_incremental(self, previous: KiwiIndexSnapshot,
+                           file_chunks: Dict[str, ChunkStore],
+                           file_hashes: Dict[str, str]) -> KiwiIndexSnapshot:
+        """Projette les chunks des fichiers modifiés avec le TF-IDF/SVD déjà ajustés
+
+        Les lignes des fichiers inchangés sont reprises de l'index publié.
+        Renvoie None si un réajustement complet est nécessaire.
+        """
+        if not previous.ready or not hasattr(previous.svd, "components_"):
+            return None
+        if previous.ingest_version != INGEST_VERSION:
+            return None  # Chunks publiés extraits par une autre version: tout est à refaire
+
+        by_source = previous.document_metadata.get('by_source', {})
+        blocks = []  # (chunks, lignes réutilisées ou None si à projeter)
+        new_chunks = []
+        for filename, parts in file_chunks.items():
+            rows = by_source.get(filename, [])
+            if previous.sources.get(filename) == file_hashes[filename] and len(rows) == len(parts):
+                blocks.append((ChunkStore.from_chunks(previous.documents[i] for i in rows), rows))
+            else:
+                blocks.append((parts, None))
+                new_chunks.extend(parts)
+
+        reused = sum(len(parts) for parts, rows in blocks if rows is not None)
+        if reused == 0:
+            return None
 
-        # Stockage
-        self.documents = chunks
+        # Dérive du vocabulaire: hausse du taux hors vocabulaire par rapport à l'ajustement
+        new_texts = [chunk.get("search_content", chunk["content"]) for chunk in new_chunks]
+        drift = max(0.0, self._oov_rate(previous.vectorizer, new_texts) - previous.oov_rate)
+        if drift > REINDEX_DRIFT_THRESHOLD:
+            print(f"🔁 Dérive du vocabulaire {drift:.2f} > {REINDEX_DRIFT_THRESHOLD}: réajustement complet")
+            return None
 
-        # Création de métadonnées pour améliorer la recherche
-        self._build_metadata_index()
+        print(f"⚡ Réindexation incrémentale: {len(new_chunks)} chunks projetés, "
+              f"{reused} réutilisés (dérive {drift:.2f})")
+
+        if new_chunks:
+            new_vectors = previous.vectorizer.transform(new_texts)
+            new_reduced = previous.svd.transform(new_vectors).astype(np.float32, copy=False)
+
+        sparse_blocks, dense_blocks = [], []
+        offset = 0
+        for parts, rows in blocks:
+            if rows is not None:
+                sparse_blocks.append(previous.doc_vectors[rows])
+                dense_blocks.append(previous.reduced_vectors[rows])
+            else:
+                sparse_blocks.append(new_vectors[offset:offset + len(parts)])
+                dense_blocks.append(new_reduced[offset:offset + len(parts)])
+                offset += len(parts)
+
+        snapshot = KiwiIndexSnapshot(
+            ChunkStore.concat(parts for parts, _ in blocks), previous.vectorizer, previous.svd,
+            sp.vstack(sparse_blocks, format="csr"),
+            np.vstack(dense_blocks).astype(np.float32, copy=False),
+            sources=file_hashes, oov_rate=previous.oov_rate)
+        snapshot.build_info = {"mode": "incremental", "embedded_chunks": len(new_chunks),
+                               "reused_chunks": reused, "drift": round(drift, 4)}
+        return snapshot
+
+    @staticmethod
+    def _oov_rate(vectorizer: TfidfVectorizer, texts: List[str]) -> float:
+        """Part des mots absents du vocabulaire TF-IDF"""
+        tokenize = vectorizer.build_tokenizer()
+        preprocess = vectorizer.build_preprocessor()
+        vocabulary = vectorizer.vocabulary_
+        total = missing = 0
+        for text in texts:
+            for word in tokenize(preprocess(text)):
+                total += 1
+                missing += word not in vocabulary
+        return missing / total if total else 0.0
+
+    def index_documents_advanced(self, progress=None) -> bool:
+        """Indexation avancée avec système vectoriel optimisé"""
+        snapshot = self.build_index_snapshot(progress)
+        if snapshot is None:
+            return False
 
         # Sauvegarde
-        self._save_advanced_index()
+        if progress:
+            progress("save", 0.95)
+        if self._save_advanced_index(snapshot):
+            # Version relue depuis le disque: vecteurs mappés, pages partagées entre workers
+            try:
+                with INDEX_STAGE_SECONDS.time(stage="load_index"):
+                    snapshot = load_index_snapshot()
+            except Exception as e:
+                print(f"⚠️ Relecture de l'index impossible, version en mémoire conservée: {e}")
+
+        # Publication atomique: les requêtes en cours gardent l'ancien snapshot
+        self.index = snapshot
 
         print(
-            f"✅ Indexation avancée terminée: {len(chunks)} chunks optimisés!")
+            f"✅ Indexation avancée terminée: {len(snapshot.documents)} chunks optimisés!")
+        peak_rss = self._peak_rss_mb()
+        if peak_rss is not None:
+            print(f"🧮 Pic mémoire (RSS): {peak_rss:.0f} MB")
         self._print_advanced_stats()
+        return True
+
+    def start_background_reindex(self) -> Optional[Dict[str, Any]]:
+        """Lance une réindexation dans un thread dédié; None si une autre est en cours
 
-    def _build_metadata_index(self):
-        """Construit un index de métadonnées pour recherche rapide"""
-        self.document_metadata = {
-            'by_type': {},
-            'by_category': {},
-            'by_source': {},
-            'keywords': {}
+        Le verrou fichier étend l'exclusion aux autres workers: un seul
+        reconstruit, les autres rechargent la version publiée.
+        """
+        if not self._reindex_lock.acquire(blocking=False):
+            return None
+        self._build_lock = IndexBuildLock()
+        if not self._build_lock.acquire(blocking=False):
+            self._reindex_lock.release()
+            return None
+
+        self.reindex_status = {
+            "job_id": uuid.uuid4().hex[:12],
+            "state": "running",
+            "stage": "queued",
+            "progress": 0.0,
+            "started_at": time.time(),
+            "finished_at": None,
+            "duration_s": None,
+            "chunks": None,
+            "index_version": self.index.version,
+            "error": None
         }
+        threading.Thread(
+            target=self._run_reindex_job, name="kiwi-reindex", daemon=True).start()
+        return self.reindex_status
 
-        for i, doc in enumerate(self.documents):
-            doc_type = doc.get('type', 'unknown')
-            category = doc.get(
-                'category', doc.get(
-                    'legal_category', doc.get(
-                        'rse_category', 'unknown')))
-            source = doc.get('source', 'unknown')
+    def _run_reindex_job(self):
+        start = time.perf_counter()
+        state, error = "failed", None
+        try:
+            if self.index_documents_advanced(progress=self._update_reindex_progress):
+                state = "success"
+            else:
+                error = "Aucun document trouvé"
+        except Exception as e:
+            error = str(e)
+            print(f"❌ Erreur réindexation: {e}")
+        finally:
+            # Remplacement du dict complet: les lecteurs voient un état cohérent
+            self.reindex_status = {
+                **self.reindex_status,
+                "state": state,
+                "stage": "done" if state == "success" else self.reindex_status["stage"],
+                "progress": 1.0 if state == "success" else self.reindex_status["progress"],
+                "finished_at": time.time(),
+                "duration_s": round(time.perf_counter() - start, 2),
+                "chunks": len(self.index.documents),
+                "index_version": self.index.version,
+                "build": self.index.build_info,
+                "error": error
+            }
+            self._build_lock.release()
+            self._reindex_lock.release()
 
-            # Index par type
-            if doc_type not in self.document_metadata['by_type']:
-                self.document_metadata['by_type'][doc_type] = []
-            self.document_metadata['by_type'][doc_type].append(i)
+    def refresh_index_if_updated(self) -> bool:
+        """Recharge à chaud la version publiée par un autre worker"""
+        current = read_current_version()
+        if current is None or current == f"v{self.index.version}" or self._reindex_lock.locked():
+            return False
+        try:
+            with INDEX_STAGE_SECONDS.time(stage="load_index"):
+                self.index = load_index_snapshot()
+        except Exception as e:
+            print(f"❌ Rechargement de l'index {current} impossible: {e}")
+            return False
+        print(f"🔄 Index {current} rechargé à chaud")
+        return True
 
-            # Index par catégorie
-            if category not in self.document_metadata['by_category']:
-                self.document_metadata['by_category'][category] = []
-            self.document_metadata['by_category'][category].append(i)
+    def _update_reindex_progress(self, stage: str, fraction: float):
+        self.reindex_status = {
+            **self.reindex_status, "stage": stage, "progress": fraction}
 
-            # Index par source
-            if source not in self.document_metadata['by_source']:
-                self.document_metadata['by_source'][source] = []
-            self.document_metadata['by_source'][source].append(i)
+    @staticmethod
+    def _peak_rss_mb() -> float:
+        """Pic de mémoire résidente du processus (MB), None si indisponible"""
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
     def search_advanced(self,
                         query: str,
                         preferred_types: List[str] = None,
-                        boost_categories: List[str] = None) -> List[Tuple[Dict,
-                                                                          float]]:
-        """Recherche avancée avec boost et filtrage"""
-        if self.reduced_vectors is None:
-            if not self._load_advanced_index():
-                return []
-
-        # Vectorisation de la requête
-        query_vector = self.vectorizer.transform([query])
-        query_reduced = self.svd.transform(query_vector.toarray())
+                        boost_categories: List[str] = None,
+                        probe: Tuple = None) -> List[Tuple[Dict,
+                                                           float]]:
+        """Recherche avancée avec boost et filtrage
+
+        `probe` (sonde de _semantic_cache_lookup) évite de projeter la requête une seconde fois.
+        """
+        # Snapshot lu une seule fois: cohérent même si une réindexation le remplace
+        if not self.index.ready:
+            self._load_advanced_index()
+        index = self.index
+        if not index.ready:
+            return []
+
+        # Similarité cosinus: un seul produit matrice-vecteur sur vecteurs prénormalisés
+        query_unit = self._probe_unit(index, query, probe)
+        with STAGE_SECONDS.time(stage="similarity"):
+            dense = None if query_unit is None else index.vector_index.search(query_unit)
+        retrieved = self._retrieve(index, query, dense)
+        if retrieved is None:
+            return []
+
+        return self._rank_results(index, *retrieved, preferred_types, boost_categories)
+
+    def _retrieve(self, index: KiwiIndexSnapshot, query: str,
+                  dense: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """(candidate_ids, scores) selon le mode de recherche
+
+        `dense` est le résultat de l'index vectoriel, None si la requête est
+        hors vocabulaire TF-IDF (BM25 peut encore y trouver un sigle ou un
+        numéro d'article). Retourne None si aucun score n'est disponible.
+        """
+        if self.retrieval_mode == "dense" or index.bm25_index is None:
+            return dense
+
+        with STAGE_SECONDS.time(stage="bm25"):
+            lexical = index.bm25_index.score(query)
+            if self.retrieval_mode == "bm25":
+                return None, max_normalize(lexical)
+
+            dense_scores = np.zeros(len(lexical), dtype=np.float32)
+            if dense is not None:
+                candidate_ids, similarities = dense
+                if candidate_ids is None:
+                    dense_scores = similarities
+                else:
+                    dense_scores[candidate_ids] = similarities
+            return None, fuse_scores(
+                dense_scores, lexical, self.fusion_method, HYBRID_DENSE_WEIGHT, RRF_K,
+                depth=MAX_CONTEXT_DOCS * 10)
+
+    @staticmethod
+    def _query_unit(index: KiwiIndexSnapshot, query: str) -> np.ndarray:
+        """Vecteur réduit unitaire de la requête (None si hors vocabulaire)"""
+        with STAGE_SECONDS.time(stage="tfidf_transform"):
+            query_vector = index.vectorizer.transform([query])
+        with STAGE_SECONDS.time(stage="svd_projection"):
+            query_reduced = index.svd.transform(query_vector)
+        query_norm = np.linalg.norm(query_reduced)
+        if query_norm == 0:
+            return None
+        return (query_reduced[0] / query_norm).astype(np.float32)
 
-        # Calcul de similarité sur vecteurs réduits (plus rapide)
-        similarities = cosine_similarity(
-            query_reduced, self.reduced_vectors)[0]
+    @classmethod
+    def _probe_unit(cls, index: KiwiIndexSnapshot, query: str,
+                    probe: Optional[Tuple]) -> Optional[np.ndarray]:
+        """Vecteur réduit de la sonde s'il vient de cet index, sinon recalculé"""
+        if probe is not None and probe[0] == index.version:
+            return probe[1]
+        return cls._query_unit(index, query)
 
+    def search_advanced_batch(
+            self,
+            queries: List[str],
+            preferences: List[Tuple[List[str], List[str]]] = None,
+            probes: List[Tuple] = None) -> List[List[Tuple[Dict, float]]]:
+        """Recherche de plusieurs requêtes en une passe vectorisée
+
+        Un seul transform TF-IDF + SVD pour les requêtes sans sonde valide
+        (`probes`, de _semantic_cache_lookup_batch), puis un produit
+        matrice-matrice avec les vecteurs des chunks; boosts et top-k restent
+        propres à chaque requête (`preferences`: (types, catégories)).
+        """
+        if not self.index.ready:
+            self._load_advanced_index()
+        index = self.index
+        if not index.ready or not queries:
+            return [[] for _ in queries]
+        preferences = preferences or [(None, None)] * len(queries)
+        probes = probes or [None] * len(queries)
+
+        # Vecteur de la sonde (None: hors vocabulaire), False: requête à projeter
+        units = [probe[1] if probe is not None and probe[0] == index.version else False
+                 for probe in probes]
+        missing = [i for i, unit in enumerate(units) if unit is False]
+        if missing:
+            # Étapes observées une fois pour tout le lot
+            with STAGE_SECONDS.time(stage="tfidf_transform"):
+                query_vectors = index.vectorizer.transform([queries[i] for i in missing])
+            with STAGE_SECONDS.time(stage="svd_projection"):
+                query_reduced = index.svd.transform(query_vectors)
+            for i, reduced, norm in zip(missing, query_reduced, np.linalg.norm(query_reduced, axis=1)):
+                units[i] = None if norm == 0 else (reduced / norm).astype(np.float32)
+        empty = np.array([unit is None for unit in units])
+        query_units = np.zeros((len(queries), index.svd.n_components), dtype=np.float32)
+        for i, unit in enumerate(units):
+            if unit is not None:
+                query_units[i] = unit
+
+        with STAGE_SECONDS.time(stage="similarity"):
+            batch_dense = list(index.vector_index.search_batch(query_units))
+
+        batch_results = []
+        for i, dense in enumerate(batch_dense):
+            retrieved = self._retrieve(index, queries[i], None if empty[i] else dense)
+            if retrieved is None:
+                batch_results.append([])
+                continue
+            preferred_types, boost_categories = preferences[i]
+            batch_results.append(self._rank_results(
+                index, *retrieved, preferred_types, boost_categories))
+        return batch_results
+
+    def _rank_results(self, index: KiwiIndexSnapshot, candidate_ids: np.ndarray,
+                      similarities: np.ndarray, preferred_types: List[str] = None,
+                      boost_categories: List[str] = None) -> List[Tuple[Dict, float]]:
+        """Boosts puis sélection des meilleurs chunks au-dessus du seuil"""
         # Application des boosts
         if preferred_types or boost_categories:
-            similarities = self._apply_search_boosts(
-                similarities, preferred_types, boost_categories)
-
-        # Récupération des meilleurs résultats
-        top_indices = np.argsort(similarities)[::-1][:MAX_CONTEXT_DOCS * 2]
+            with STAGE_SECONDS.time(stage="boosting"):
+                similarities = self._apply_search_boosts(
+                    similarities, preferred_types, boost_categories, candidate_ids,
+                    index)
+
+        # Récupération des meilleurs résultats (sélection partielle puis tri du top-k)
+        top_k = min(MAX_CONTEXT_DOCS * 2, len(similarities))
+        if top_k == 0:
+            return []
+        with STAGE_SECONDS.time(stage="top_k"):
+            top_indices = np.argpartition(-similarities, top_k - 1)[:top_k]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
 
         results = []
         for idx in top_indices:
             if similarities[idx] > 0.1:  # Seuil de pertinence
-                results.append((self.documents[idx], similarities[idx]))
+                doc_idx = idx if candidate_ids is None else candidate_ids[idx]
+                results.append((index.documents[doc_idx], similarities[idx]))
 
         return results[:MAX_CONTEXT_DOCS]
 
@@ -809,36 +1339,66 @@ class AdvancedKiwiRAG:
             self,
             similarities: np.ndarray,
             preferred_types: List[str] = None,
-            boost_categories: List[str] = None) -> np.ndarray:
-        """Applique des boosts selon les préférences"""
-        boosted_similarities = similarities.copy()
-
-        for i, doc in enumerate(self.documents):
-            # Boost par type
-            if preferred_types and doc.get('type') in preferred_types:
-                boosted_similarities[i] *= 1.3
-
-            # Boost par catégorie
-            doc_category = doc.get(
-                'category',
-                doc.get(
-                    'legal_category',
-                    doc.get('rse_category')))
-            if boost_categories and doc_category in boost_categories:
-                boosted_similarities[i] *= 1.2
-
-            # Boost par priorité (pour FAQ)
-            if doc.get('priority', 0) > 1:
-                boosted_similarities[i] *= 1.1
+            boost_categories: List[str] = None,
+            candidate_ids: np.ndarray = None,
+            index: KiwiIndexSnapshot = None) -> np.ndarray:
+        """Applique des boosts selon les préférences (vectorisé)
+
+        `candidate_ids` restreint les boosts aux chunks candidats d'un index
+        approximatif; None signifie que `similarities` couvre tous les chunks.
+        """
+        index = index or self.index
+        if candidate_ids is None:
+            priority_boosts = index.priority_boosts
+            type_codes = index.type_codes
+            category_codes = index.category_codes
+        else:
+            priority_boosts = index.priority_boosts[candidate_ids]
+            type_codes = index.type_codes[candidate_ids]
+            category_codes = index.category_codes[candidate_ids]
+
+        # Boost par priorité (pour FAQ)
+        boosted_similarities = similarities * priority_boosts
+
+        # Boost par type: table de facteurs indexée par code de type
+        if preferred_types:
+            type_factors = np.ones(len(index.type_vocabulary))
+            for doc_type in preferred_types:
+                if doc_type in index.type_vocabulary:
+                    type_factors[index.type_vocabulary[doc_type]] = 1.3
+            boosted_similarities *= type_factors[type_codes]
+
+        # Boost par catégorie
+        if boost_categories:
+            category_factors = np.ones(len(index.category_vocabulary))
+            for category in boost_categories:
+                if category in index.category_vocabulary:
+                    category_factors[index.category_vocabulary[category]] = 1.2
+            boosted_similarities *= category_factors[category_codes]
 
         return boosted_similarities
 
     def get_smart_context(self, query: str, context_type: str = "auto") -> str:
         """Récupère un contexte intelligent selon le type de requête"""
+        results = self._search_smart_results(query, context_type)
+        return self._format_smart_context(results)
+
+    def _search_smart_results(self, query: str, context_type: str = "auto",
+                              probe: Tuple = None) -> List[Tuple[Dict, float]]:
+        """Recherche avec préférences de type/catégorie selon la requête"""
         # Détection automatique du type de requête
         if context_type == "auto":
             context_type = self._detect_query_type(query)
 
+        preferred_types, boost_categories = self._type_preferences(context_type)
+
+        # Recherche avec préférences
+        return self.search_advanced(
+            query, preferred_types, boost_categories, probe)
+
+    @staticmethod
+    def _type_preferences(context_type: str) -> Tuple[List[str], List[str]]:
+        """Types préférés et catégories boostées selon le type de requête"""
         # Définition des préférences selon le type
         type_preferences = {
             "legal": (
@@ -849,37 +1409,16 @@ class AdvancedKiwiRAG:
                         ["rse_formation"], [
                             "environnement", "social", "gouvernance"])}
 
-        preferred_types, boost_categories = type_preferences.get(
-            context_type, (None, None))
-
-        # Recherche avec préférences
-        results = self.search_advanced(
-            query, preferred_types, boost_categories)
-
-        if not results:
-            return "Aucune information pertinente trouvée dans la base Kiwi."
-
-        # Construction du contexte enrichi
-        context_parts = []
-        for doc, score in results:
-            kiwi_info = f"Source: {doc['source']} | Type: {doc.get('type', 'N/A')} | Score: {score:.3f}"
-
-            # Ajout d'infos contextuelles
-            if doc.get('category'):
-                kiwi_info += f" | Catégorie: {doc['category']}"
-            if doc.get('legal_category'):
-                kiwi_info += f" | Domaine juridique: {doc['legal_category']}"
-            if doc.get('rse_category'):
-                kiwi_info += f" | Domaine RSE: {doc['rse_category']}"
+        return type_preferences.get(context_type, (None, None))
 
-            context_parts.append(kiwi_info)
-            context_parts.append(f"Contenu: {doc['content']}")
-            context_parts.append("---")
-
-        return "\n".join(context_parts)
+    def _format_smart_context(self, results: List[Tuple[Dict, float]]) -> str:
+        """Construit le contexte textuel envoyé à Claude (budget CONTEXT_TOKEN_BUDGET)"""
+        context, _ = build_context(results)
+        return context
 
     def _detect_query_type(self, query: str) -> str:
         """Détecte intelligemment le type de requête"""
+        start = time.perf_counter()
         query_lower = query.lower()
 
         # Patterns pour chaque type
@@ -924,20 +1463,50 @@ class AdvancedKiwiRAG:
                 1 for keyword in keywords if keyword in query_lower)
 
         # Retourne le type avec le plus de matches
-        return max(scores, key=scores.get) if max(
+        query_type = max(scores, key=scores.get) if max(
             scores.values()) > 0 else "general"
-
-    def ask_kiwi_advanced(self, question: str,
-                          debug: bool = False) -> Dict[str, Any]:
-        """Système de question-réponse avancé pour Kiwi"""
-        # Détection du type et récupération du contexte
-        query_type = self._detect_query_type(question)
-        context = self.get_smart_context(question, query_type)
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="detect_type")
+        return query_type
+
+    def _prepare_ask(self, question: str, debug: bool = False, query_type: str = None,
+                     probe: Tuple = None) -> Tuple[str, List[Tuple[Dict, float]], str, Dict]:
+        """Détection du type, récupération du contexte et construction de la requête Claude"""
+        # Détection du type (sauf si déjà connu) et récupération du contexte
+        query_type = query_type or self._detect_query_type(question)
+        results = self._search_smart_results(question, query_type, probe)
+        with STAGE_SECONDS.time(stage="context_assembly"):
+            context, context_report = build_context(results)
+            request = self._build_ask_prompt(question, query_type, context)
 
         if debug:
             print(f"🎯 Type de requête détecté: {query_type}")
-            print(f"📊 Contexte trouvé: {len(context.split('---'))} documents")
-
+            print(f"📊 Contexte: {context_report['documents']}/{context_report['candidates']} "
+                  f"documents, {context_report['tokens']} tokens "
+                  f"(écartés: {context_report['dropped']}, tronqués: {context_report['truncated']})")
+
+        return query_type, results, context, request
+
+    def _prepare_ask_batch(self, questions: List[str], debug: bool = False,
+                           query_types: List[str] = None,
+                           probes: List[Tuple] = None) -> List[Tuple[str, List[Tuple[Dict, float]], str, Dict]]:
+        """_prepare_ask pour une liste de questions, avec une seule passe de recherche"""
+        query_types = query_types or [self._detect_query_type(question) for question in questions]
+        batch_results = self.search_advanced_batch(
+            questions, [self._type_preferences(query_type) for query_type in query_types], probes)
+
+        prepared = []
+        for question, query_type, results in zip(questions, query_types, batch_results):
+            with STAGE_SECONDS.time(stage="context_assembly"):
+                context = self._format_smart_context(results)
+                request = self._build_ask_prompt(question, query_type, context)
+            if debug:
+                print(f"🎯 [{query_type}] {question[:60]} - {len(results)} documents")
+            prepared.append((query_type, results, context, request))
+        return prepared
+
+    @staticmethod
+    def _ask_system_prompt(query_type: str) -> str:
+        """Persona et instructions selon le type de requête (identiques d'un appel à l'autre)"""
         # Sélection du prompt spécialisé
         specialized_prompts = {
             "legal": """Tu es un expert juridique spécialisé en droit des junior entreprises avec accès à la base complète Kiwi Legal.
@@ -953,13 +1522,9 @@ Tu maitrises le développement durable appliqué aux junior entreprises."""}
             query_type,
             "Tu es l'assistant IA officiel de l'écosystème Kiwi pour les junior entrepreneurs français.")
 
-        # Construction du prompt optimisé
-        prompt = f"""{context_prompt}
-
-CONTEXTE KIWI SPÉCIALISÉ:
-{context}
+        return f"""{context_prompt}
 
-QUESTION: {question}
+Le message de l'utilisateur contient le CONTEXTE KIWI SPÉCIALISÉ puis sa QUESTION.
 
 INSTRUCTIONS EXPERTES:
 - Base-toi PRIORITAIREMENT sur les données officielles Kiwi (Legal, RSE, FAQ, Base JE)
@@ -969,40 +1534,491 @@ INSTRUCTIONS EXPERTES:
 - Pour les questions RSE: utilise les modules de formation Kiwi RSE
 - Donne des conseils actionnables et spécifiques aux junior entrepreneurs
 - Indique clairement quand tu utilises les données Kiwi vs tes connaissances générales
-- Sois précis, expert et fiable dans tes réponses
+- Sois précis, expert et fiable dans tes réponses"""
+
+    def _build_ask_prompt(self, question: str, query_type: str, context: str) -> Dict[str, Any]:
+        """Paramètres messages.create/stream: préfixe système stable puis contexte et question
+
+        Le préfixe (persona + instructions du type de requête) est identique
+        d'une requête à l'autre: marqué cache_control, il est relu depuis le
+        cache de prompts Anthropic au lieu d'être retraité. Seuls le contexte
+        et la question, dans le message utilisateur, changent à chaque appel.
+        """
+        system_prompt = self._ask_system_prompt(query_type)
+        user_prompt = f"""CONTEXTE KIWI SPÉCIALISÉ:
+{context}
+
+QUESTION: {question}
 
 RÉPONSE EXPERTE:"""
 
+        request = {"messages": [{"role": "user", "content": user_prompt}]}
+        if PROMPT_CACHE_ENABLED:
+            request["system"] = [{"type": "text", "text": system_prompt,
+                                  "cache_control": {"type": "ephemeral"}}]
+            request["extra_headers"] = {"anthropic-beta": PROMPT_CACHE_BETA}
+        else:
+            request["system"] = system_prompt
+
+        PROMPT_TOKENS.observe(self._prompt_tokens(request))
+        return request
+
+    @staticmethod
+    def _prompt_tokens(request: Dict[str, Any]) -> int:
+        """Taille estimée (système + messages) d'une requête construite par _build_ask_prompt"""
+        system = request["system"]
+        if not isinstance(system, str):
+            system = "".join(block["text"] for block in system)
+        return estimate_tokens(system + "".join(
+            message["content"] for message in request["messages"]))
+
+    def _build_ask_result(self, question: str, query_type: str,
+                          context: str, answer: str,
+                          cached: bool = False, status: str = "success",
+                          request: Dict[str, Any] = None,
+                          usage: Dict[str, int] = None) -> Dict[str, Any]:
+        """Formate la réponse du système de question-réponse
+
+        request, usage: requête envoyée à Claude et tokens facturés (None si
+        la réponse vient d'un cache ou de la FAQ)
+        """
+        ASK_TOTAL.inc(status=status)
+        return {
+            "question": question,
+            "answer": answer,
+            "context_found": context != NO_CONTEXT,
+            "query_type": query_type,
+            "sources_count": len(
+                context.split('---')) if context else 0,
+            "kiwi_specialized": True,
+            "cached": cached,
+            "prompt_tokens": self._prompt_tokens(request) if request else 0,
+            "llm_usage": usage or {},
+            "status": status}
+
+    def _build_ask_error(self, question: str, error: Exception) -> Dict[str, Any]:
+        """Formate une erreur du système de question-réponse"""
+        ASK_TOTAL.inc(status="error")
+        LLM_ERRORS.inc(error_type=type(error).__name__)
+        return {
+            "question": question,
+            "answer": f"Erreur système Kiwi: {error}",
+            "context_found": False,
+            "status": "error"
+        }
+
+    def ask_kiwi_advanced(self, question: str,
+                          debug: bool = False) -> Dict[str, Any]:
+        """Système de question-réponse avancé pour Kiwi"""
+        faq_match = self._faq_direct_match(question)
+        if faq_match is not None:
+            return self._build_faq_direct_result(question, *faq_match)
+
+        query_type, probe, semantic_hit = self._semantic_cache_lookup(question)
+        if semantic_hit is not None:
+            return self._build_semantic_cache_result(question, query_type, semantic_hit)
+
+        faq_match = self._faq_search_match(question, probe)
+        if faq_match is not None:
+            return self._build_faq_direct_result(question, *faq_match, status="faq_search")
+
+        query_type, results, context, request = self._prepare_ask(question, debug, query_type, probe)
+
+        cached_answer = self.answer_cache.get(question, query_type, results)
+        if cached_answer is not None:
+            return self._build_ask_result(
+                question, query_type, context, cached_answer, cached=True)
+
         try:
             print(f"Model {CLAUDE_MODEL} - Max tokens: {MAX_TOKENS} - Temp: {TEMPERATURE}")
-            response = self.claude_client.messages.create(
-                model=CLAUDE_MODEL,
-                max_tokens=MAX_TOKENS,
-                temperature=TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            llm_start = time.perf_counter()
+            with LLM_SECONDS.time(mode="ask"):
+                response = self.claude_client.messages.create(
+                    model=CLAUDE_MODEL,
+                    max_tokens=MAX_TOKENS,
+                    temperature=TEMPERATURE,
+                    **request
+                )
+
+            answer = response.content[0].text
+            self.answer_cache.set(question, query_type, results, answer)
+            self._semantic_cache_set(probe, query_type, question, answer, results)
+            usage = record_llm_usage(response.usage, time.perf_counter() - llm_start)
+            return self._build_ask_result(
+                question, query_type, context, answer, request=request, usage=usage)
 
-            return {
+        except Exception as e:
+            return self._build_ask_error(question, e)
+
+    async def ask_kiwi_advanced_async(self, question: str,
+                                      debug: bool = False) -> Dict[str, Any]:
+        """Version asynchrone de ask_kiwi_advanced (non bloquante pour FastAPI)"""
+        start = time.perf_counter()
+
+        faq_match = self._faq_direct_match(question)
+        if faq_match is not None:
+            lookup_done = time.perf_counter()
+            self._record_latency("ask", "faq", start, lookup_done, None, lookup_done)
+            return self._build_faq_direct_result(question, *faq_match)
+
+        # Projection SVD et recherche vectorielle (CPU) partent dans un thread pour libérer la boucle
+        query_type, probe, semantic_hit = await asyncio.to_thread(
+            self._semantic_cache_lookup, question)
+        if semantic_hit is not None:
+            lookup_done = time.perf_counter()
+            self._record_latency("ask", query_type, start, lookup_done, None, lookup_done)
+            return self._build_semantic_cache_result(question, query_type, semantic_hit)
+
+        # Avant la recherche: la sonde porte déjà le vecteur réduit de la question
+        faq_match = self._faq_search_match(question, probe)
+        if faq_match is not None:
+            lookup_done = time.perf_counter()
+            self._record_latency("ask", "faq", start, lookup_done, None, lookup_done)
+            return self._build_faq_direct_result(question, *faq_match, status="faq_search")
+
+        query_type, results, context, request = await asyncio.to_thread(
+            self._prepare_ask, question, debug, query_type, probe)
+        retrieval_done = time.perf_counter()
+
+        try:
+            cached_answer = self.answer_cache.get(question, query_type, results)
+            if cached_answer is not None:
+                return self._build_ask_result(
+                    question, query_type, context, cached_answer, cached=True)
+
+            async with self.llm_semaphore:
+                llm_start = time.perf_counter()
+                with LLM_SECONDS.time(mode="ask"):
+                    response = await self.async_claude_client.messages.create(
+                        model=CLAUDE_MODEL,
+                        max_tokens=MAX_TOKENS,
+                        temperature=TEMPERATURE,
+                        **request
+                    )
+
+            answer = response.content[0].text
+            self.answer_cache.set(question, query_type, results, answer)
+            self._semantic_cache_set(probe, query_type, question, answer, results)
+            usage = record_llm_usage(response.usage, time.perf_counter() - llm_start)
+            return self._build_ask_result(
+                question, query_type, context, answer, request=request, usage=usage)
+
+        except Exception as e:
+            return self._build_ask_error(question, e)
+
+        finally:
+            self._record_latency(
+                "ask", query_type, start, retrieval_done, None,
+                time.perf_counter())
+
+    async def ask_kiwi_advanced_batch_async(
+            self, questions: List[str], debug: bool = False) -> Dict[str, Any]:
+        """Lot de questions: recherche vectorisée commune puis génération concurrente
+
+        La génération passe par le sémaphore LLM partagé (LLM_MAX_CONCURRENCY).
+        Les questions présentes dans la FAQ sont répondues directement, celles
+        proches d'une question déjà répondue depuis le cache sémantique.
+        """
+        start = time.perf_counter()
+        faq_matches = [self._faq_direct_match(question) for question in questions]
+        lookup_done = time.perf_counter()
+        unmatched = [question for question, match in zip(questions, faq_matches) if match is None]
+
+        lookups = await asyncio.to_thread(self._semantic_cache_lookup_batch, unmatched)
+        faq_searches = [None if hit is not None else self._faq_search_match(question, probe)
+                        for question, (_, probe, hit) in zip(unmatched, lookups)]
+        semantic_done = time.perf_counter()
+        pending = [(question, query_type, probe)
+                   for question, (query_type, probe, hit), faq_search
+                   in zip(unmatched, lookups, faq_searches) if hit is None and faq_search is None]
+
+        prepared = await asyncio.to_thread(
+            self._prepare_ask_batch, [question for question, _, _ in pending], debug,
+            [query_type for _, query_type, _ in pending], [probe for _, _, probe in pending])
+        retrieval_done = time.perf_counter()
+
+        generated = iter(await asyncio.gather(*[
+            self._generate_batch_item(question, *item, start, retrieval_done, probe)
+            for (question, _, probe), item in zip(pending, prepared)]))
+        lookups = iter(zip(lookups, faq_searches))
+        results = []
+        for question, match in zip(questions, faq_matches):
+            if match is not None:
+                results.append(self._build_faq_direct_batch_item(question, match, start, lookup_done))
+                continue
+            (query_type, _, hit), faq_search = next(lookups)
+            if hit is not None:
+                results.append(self._build_semantic_cache_batch_item(
+                    question, query_type, hit, start, semantic_done))
+            elif faq_search is not None:
+                results.append(self._build_faq_direct_batch_item(
+                    question, faq_search, start, semantic_done, status="faq_search"))
+            else:
+                results.append(next(generated))
+
+        return {
+            "results": results,
+            "count": len(results),
+            "retrieval_ms": round((retrieval_done - start) * 1000, 2),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    async def _generate_batch_item(self, question: str, query_type: str,
+                                   results: List[Tuple[Dict, float]], context: str,
+                                   request: Dict[str, Any], start: float,
+                                   retrieval_done: float, probe: Tuple = None) -> Dict[str, Any]:
+        """Réponse d'un élément du lot, avec ses latences propres"""
+        generation_start = None
+        try:
+            cached_answer = self.answer_cache.get(question, query_type, results)
+            if cached_answer is not None:
+                result = self._build_ask_result(
+                    question, query_type, context, cached_answer, cached=True)
+            else:
+                async with self.llm_semaphore:
+                    generation_start = time.perf_counter()
+                    with LLM_SECONDS.time(mode="batch"):
+                        response = await self.async_claude_client.messages.create(
+                            model=CLAUDE_MODEL,
+                            max_tokens=MAX_TOKENS,
+                            temperature=TEMPERATURE,
+                            **request
+                        )
+
+                answer = response.content[0].text
+                self.answer_cache.set(question, query_type, results, answer)
+                self._semantic_cache_set(probe, query_type, question, answer, results)
+                usage = record_llm_usage(response.usage, time.perf_counter() - generation_start)
+                result = self._build_ask_result(
+                    question, query_type, context, answer, request=request, usage=usage)
+
+        except Exception as e:
+            result = self._build_ask_error(question, e)
+            result["query_type"] = query_type
+
+        end = time.perf_counter()
+        result["timings"] = {
+            **self._record_latency(
+                "batch", query_type, start, retrieval_done, None, end),
+            # Attente du sémaphore et durée de l'appel Claude
+            "queue_ms": round(((generation_start or end) - retrieval_done) * 1000, 2),
+            "generation_ms": round(
+                (end - generation_start) * 1000, 2) if generation_start else 0.0
+        }
+        return result
+
+    def _build_faq_direct_batch_item(self, question: str, faq_match: Tuple[Dict, float],
+                                     start: float, lookup_done: float,
+                                     status: str = "faq_direct") -> Dict[str, Any]:
+        """Élément du lot répondu depuis la FAQ, sans attente du sémaphore LLM"""
+        result = self._build_faq_direct_result(question, *faq_match, status=status)
+        result["timings"] = {
+            **self._record_latency("batch", "faq", start, lookup_done, None, lookup_done),
+            "queue_ms": 0.0,
+            "generation_ms": 0.0
+        }
+        return result
+
+    def _build_semantic_cache_batch_item(self, question: str, query_type: str,
+                                         hit: Dict[str, Any], start: float,
+                                         lookup_done: float) -> Dict[str, Any]:
+        """Élément du lot servi par le cache sémantique, sans recherche ni appel à Claude"""
+        result = self._build_semantic_cache_result(question, query_type, hit)
+        result["timings"] = {
+            **self._record_latency("batch", query_type, start, lookup_done, None, lookup_done),
+            "queue_ms": 0.0,
+            "generation_ms": 0.0
+        }
+        return result
+
+    async def stream_kiwi_advanced(self, question: str,
+                                   debug: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Variante streaming: métadonnées de recherche puis tokens au fil de l'eau
+
+        Produit des événements {"event": ..., "data": ...}: `metadata` dès la
+        fin de la recherche, `token` pour chaque fragment de réponse, `error`
+        éventuellement, puis `done` avec les latences mesurées.
+        """
+        start = time.perf_counter()
+
+        faq_match = self._faq_direct_match(question)
+        if faq_match is not None:
+            async for event in self._stream_faq_direct(question, *faq_match, start):
+                yield event
+            return
+
+        query_type, probe, semantic_hit = await asyncio.to_thread(
+            self._semantic_cache_lookup, question)
+        if semantic_hit is not None:
+            async for event in self._stream_semantic_cache(question, query_type, semantic_hit, start):
+                yield event
+            return
+
+        faq_match = self._faq_search_match(question, probe)
+        if faq_match is not None:
+            async for event in self._stream_faq_direct(
+                    question, *faq_match, start, status="faq_search"):
+                yield event
+            return
+
+        query_type, results, context, request = await asyncio.to_thread(
+            self._prepare_ask, question, debug, query_type, probe)
+        retrieval_done = time.perf_counter()
+
+        cached_answer = self.answer_cache.get(question, query_type, results)
+
+        yield {
+            "event": "metadata",
+            "data": {
                 "question": question,
-                "answer": response.content[0].text,
-                "context_found": context != "Aucune information pertinente trouvée dans la base Kiwi.",
                 "query_type": query_type,
-                "sources_count": len(
-                    context.split('---')) if context else 0,
-                "kiwi_specialized": True,
-                "status": "success"}
+                "context_found": bool(results),
+                "sources_count": len(results),
+                "sources": [{
+                    "source": doc.get('source', ''),
+                    "type": doc.get('type', ''),
+                    "category": doc.get('category', doc.get(
+                        'legal_category', doc.get('rse_category', ''))),
+                    "score": float(score)
+                } for doc, score in results],
+                "retrieval_ms": round((retrieval_done - start) * 1000, 2),
+                "cached": cached_answer is not None
+            }
+        }
+
+        first_token = None
+        status = "success"
+        answer_parts = []
+        usage = {}
+        try:
+            if cached_answer is not None:
+                first_token = time.perf_counter()
+                yield {"event": "token", "data": {"text": cached_answer}}
+            else:
+                async with self.llm_semaphore:
+                    llm_start = time.perf_counter()
+                    async with self.async_claude_client.messages.stream(
+                        model=CLAUDE_MODEL,
+                        max_tokens=MAX_TOKENS,
+                        temperature=TEMPERATURE,
+                        **request
+                    ) as stream:
+                        async for text in stream.text_stream:
+                            if first_token is None:
+                                first_token = time.perf_counter()
+                            answer_parts.append(text)
+                            yield {"event": "token", "data": {"text": text}}
+                        usage = record_llm_usage(
+                            (await stream.get_final_message()).usage,
+                            time.perf_counter() - llm_start)
+                    LLM_SECONDS.observe(time.perf_counter() - llm_start, mode="stream")
+
+                self.answer_cache.set(
+                    question, query_type, results, "".join(answer_parts))
+                self._semantic_cache_set(
+                    probe, query_type, question, "".join(answer_parts), results)
 
         except Exception as e:
-            return {
+            status = "error"
+            LLM_ERRORS.inc(error_type=type(e).__name__)
+            yield {"event": "error", "data": {"message": f"Erreur système Kiwi: {e}"}}
+
+        ASK_TOTAL.inc(status=status)
+
+        timings = self._record_latency(
+            "stream", query_type, start, retrieval_done, first_token,
+            time.perf_counter())
+
+        yield {"event": "done", "data": {
+            "status": status, "timings": timings,
+            "prompt_tokens": self._prompt_tokens(request) if cached_answer is None else 0,
+            "llm_usage": usage}}
+
+    async def _stream_faq_direct(self, question: str, doc: Dict, similarity: float,
+                                 start: float,
+                                 status: str = "faq_direct") -> AsyncIterator[Dict[str, Any]]:
+        """Événements streaming d'une réponse FAQ directe (un seul fragment)"""
+        lookup_done = time.perf_counter()
+        yield {
+            "event": "metadata",
+            "data": {
+                "question": question,
+                "query_type": "faq",
+                "context_found": True,
+                "sources_count": 1,
+                "sources": [{
+                    "source": doc.get('source', ''),
+                    "type": doc.get('type', ''),
+                    "category": doc.get('category', ''),
+                    "score": similarity
+                }],
+                "retrieval_ms": round((lookup_done - start) * 1000, 2),
+                "cached": False
+            }
+        }
+        yield {"event": "token", "data": {"text": doc.get('answer', '')}}
+        end = time.perf_counter()
+        timings = self._record_latency("stream", "faq", start, lookup_done, end, end)
+        ASK_TOTAL.inc(status=status)
+        yield {"event": "done", "data": {
+            "status": status, "timings": timings, "prompt_tokens": 0, "llm_usage": {}}}
+
+    async def _stream_semantic_cache(self, question: str, query_type: str,
+                                     hit: Dict[str, Any],
+                                     start: float) -> AsyncIterator[Dict[str, Any]]:
+        """Événements streaming d'une réponse du cache sémantique (un seul fragment)"""
+        lookup_done = time.perf_counter()
+        yield {
+            "event": "metadata",
+            "data": {
                 "question": question,
-                "answer": f"Erreur système Kiwi: {e}",
-                "context_found": False,
-                "status": "error"
+                "query_type": query_type,
+                "context_found": bool(hit["parents"]),
+                "sources_count": len(hit["parents"]),
+                "sources": [],
+                "retrieval_ms": round((lookup_done - start) * 1000, 2),
+                "cached": True,
+                "cached_question": hit["question"]
             }
+        }
+        yield {"event": "token", "data": {"text": hit["answer"]}}
+        end = time.perf_counter()
+        timings = self._record_latency("stream", query_type, start, lookup_done, end, end)
+        ASK_TOTAL.inc(status="semantic_cache")
+        yield {"event": "done", "data": {
+            "status": "semantic_cache", "timings": timings, "prompt_tokens": 0, "llm_usage": {}}}
+
+    def _record_latency(self, mode: str, query_type: str, start: float,
+                        retrieval_done: float, first_token: float,
+                        end: float) -> Dict[str, Any]:
+        """Enregistre les latences d'une requête (en millisecondes)"""
+        timings = {
+            "mode": mode,
+            "query_type": query_type,
+            "retrieval_ms": round((retrieval_done - start) * 1000, 2),
+            "ttft_ms": round((first_token - start) * 1000, 2) if first_token else None,
+            "total_ms": round((end - start) * 1000, 2)
+        }
+        self.latency_log.append(timings)
+        REQUEST_SECONDS.observe(end - start, mode=mode, query_type=query_type)
+        return timings
+
+    def get_latency_summary(self) -> Dict[str, Any]:
+        """Percentiles p50/p95 des latences récentes"""
+        summary = {"requests": len(self.latency_log)}
+        for metric in ["retrieval_ms", "ttft_ms", "total_ms"]:
+            values = [t[metric] for t in self.latency_log if t[metric] is not None]
+            if values:
+                summary[metric] = {
+                    "p50": round(float(np.percentile(values, 50)), 2),
+                    "p95": round(float(np.percentile(values, 95)), 2)
+                }
+        return summary
 
     def _print_advanced_stats(self):
         """Affiche des statistiques détaillées du système"""
-        if not self.documents:
+        index = self.index
+        if not index.documents:
             return
 
         print("\n📊 STATISTIQUES SYSTÈME KIWI AVANCÉ:")
@@ -1012,7 +2028,7 @@ RÉPONSE EXPERTE:"""
         by_type = {}
         by_category = {}
 
-        for doc in self.documents:
+        for doc in index.documents:
             source = doc.get('source', 'unknown')
             doc_type = doc.get('type', 'unknown')
             category = doc.get(
@@ -1038,12 +2054,12 @@ RÉPONSE EXPERTE:"""
                 print(f"     - {category}: {count} chunks")
 
         # Stats techniques
-        if self.doc_vectors is not None:
+        if index.doc_vectors is not None:
             print(f"\n   🔬 Statistiques techniques:")
-            print(f"     - Dimensions TF-IDF: {self.doc_vectors.shape}")
-            print(f"     - Dimensions réduites: {self.reduced_vectors.shape}")
+            print(f"     - Dimensions TF-IDF: {index.doc_vectors.shape}")
+            print(f"     - Dimensions réduites: {index.reduced_vectors.shape}")
             print(
-                f"     - Vocabulaire: {len(self.vectorizer.vocabulary_)} termes")
+                f"     - Vocabulaire: {len(index.vectorizer.vocabulary_)} termes")
 
         # Résumé Kiwi
         faq_count = by_type.get('faq', 0)
@@ -1058,39 +2074,37 @@ RÉPONSE EXPERTE:"""
         print(f"     - 🌱 Modules RSE: {rse_count} formations")
         print(f"     - 📈 Performance système: OPTIMISÉE")
 
-    def _save_advanced_index(self):
-        """Sauvegarde avancée de l'index"""
+    def _save_advanced_index(self, snapshot: KiwiIndexSnapshot):
+        """Sauvegarde avancée de l'index (nouvelle version + bascule de CURRENT)"""
         try:
-            with open("kiwi_advanced_index.pkl", 'wb') as f:
-                pickle.dump({
-                    "documents": self.documents,
-                    "vectorizer": self.vectorizer,
-                    "svd": self.svd,
-                    "doc_vectors": self.doc_vectors,
-                    "reduced_vectors": self.reduced_vectors,
-                    "metadata": self.document_metadata
-                }, f)
-            print("💾 Index avancé Kiwi sauvegardé")
+            with INDEX_STAGE_SECONDS.time(stage="save"):
+                version_dir = save_index_snapshot(snapshot)
+            print(f"💾 Index avancé Kiwi sauvegardé: {version_dir}")
+            return True
         except Exception as e:
             print(f"❌ Erreur sauvegarde: {e}")
+            return False
 
     def _load_advanced_index(self):
-        """Chargement avancé de l'index"""
+        """Chargement avancé de l'index (vecteurs mappés en mémoire)"""
         try:
-            with open("kiwi_advanced_index.pkl", 'rb') as f:
-                data = pickle.load(f)
-                self.documents = data["documents"]
-                self.vectorizer = data["vectorizer"]
-                self.svd = data["svd"]
-                self.doc_vectors = data["doc_vectors"]
-                self.reduced_vectors = data["reduced_vectors"]
-                self.document_metadata = data["metadata"]
-            print("📂 Index avancé Kiwi chargé depuis le cache")
-            return True
+            with INDEX_STAGE_SECONDS.time(stage="load_index"):
+                snapshot = load_index_snapshot()
+        except FileNotFoundError as e:
+            print(f"📭 {e}")
+            return False
         except Exception as e:
             print(f"❌ Erreur chargement: {e}")
             return False
 
+        # Un index périmé reste servi, mais l'appelant doit le reconstruire
+        self.index = snapshot
+        if is_stale(snapshot):
+            print("📛 Index périmé: fichiers de données modifiés depuis sa construction")
+            return False
+        print("📂 Index avancé Kiwi chargé depuis le cache")
+        return True
+
     # =============== FONCTIONNALITÉS EXPERTES ===============
 
     def search_junior_entreprises(
@@ -1098,8 +2112,21 @@ RÉPONSE EXPERTE:"""
             city: str = None,
             domain: str = None,
             school: str = None,
-            region: str = None) -> List[Dict]:
-        """Recherche experte de Junior Entreprises"""
+            region: str = None,
+            offset: int = 0,
+            limit: int = None) -> Tuple[List[Dict], int]:
+        """Recherche experte de Junior Entreprises
+
+        Filtres exacts via l'index d'attributs JE (intersection des critères);
+        la similarité vectorielle ne sert qu'à départager les ex aequo.
+        Renvoie (page de résultats, nombre total de JE correspondantes).
+        """
+        if not self.index.ready:
+            self._load_advanced_index()
+        index = self.index
+        if not index.ready:
+            return [], 0
+
         query_parts = []
         if city:
             query_parts.append(f"ville {city}")
@@ -1112,55 +2139,208 @@ RÉPONSE EXPERTE:"""
 
         query = " ".join(query_parts) if query_parts else "junior entreprise"
 
-        results = self.search_advanced(query, ["junior_entreprises"])
+        def vector_tiebreak(ids: np.ndarray) -> np.ndarray:
+            query_unit = self._query_unit(index, query)
+            if query_unit is None:
+                return np.zeros(len(ids))
+            return index.normalized_vectors[ids] @ query_unit
+
+        matches, total = index.je_index.search(
+            {"city": city, "domain": domain, "school": school, "region": region},
+            offset, limit, vector_tiebreak)
 
         je_list = []
-        for doc, score in results:
-            if doc.get('type') == 'junior_entreprises':
-                je_info = {
-                    "name": doc.get('name', 'N/A'),
-                    "city": doc.get('city', 'N/A'),
-                    "school": doc.get('school', 'N/A'),
-                    "domain": doc.get('domain', 'N/A'),
-                    "email": doc.get('email', 'N/A'),
-                    "website": doc.get('website', 'N/A'),
-                    "score": score,
-                    "content": doc.get('content', '')
-                }
-                je_list.append(je_info)
+        for doc_id, score in matches:
+            doc = index.documents[doc_id]
+            je_info = {
+                "name": doc.get('name', 'N/A'),
+                "city": doc.get('city', 'N/A'),
+                "school": doc.get('school', 'N/A'),
+                "domain": doc.get('domain', 'N/A'),
+                "region": doc.get('region', 'N/A'),
+                "email": doc.get('email', 'N/A'),
+                "website": doc.get('website', 'N/A'),
+                "score": score,
+                "content": doc.get('content', '')
+            }
+            je_list.append(je_info)
 
-        return je_list
+        return je_list, total
 
     def search_faq_kiwi(self, query: str, category: str = None) -> List[Dict]:
-        """Recherche experte dans la FAQ Kiwi Legal"""
-        search_query = f"{query} {category}" if category else query
-        results = self.search_advanced(search_query, ["faq"])
+        """Recherche experte dans la FAQ Kiwi Legal
+
+        Questions identiques puis quasi identiques (trigrammes) en tête, puis
+        similarité vectorielle calculée sur les seules entrées FAQ, filtrées
+        par segment de `category_path` si la catégorie est connue.
+        """
+        if not self.index.ready:
+            self._load_advanced_index()
+        index = self.index
+        faq_index = index.faq_index
+        if not index.ready or len(faq_index) == 0:
+            return []
+
+        entries = faq_index.category_entries(category) if category else None
+        if category and entries is None:
+            # Catégorie absente des category_path: elle enrichit simplement la requête
+            query = f"{query} {category}"
+        if entries is None:
+            entries = np.arange(len(faq_index))
+
+        matches = faq_index.match(query, FAQ_FUZZY_MIN_SIMILARITY, entries)
+        matched_ids = {doc_id for doc_id, _, _ in matches}
+
+        query_unit = self._query_unit(index, query)
+        if query_unit is not None:
+            doc_ids = faq_index.doc_ids[entries]
+            similarities = (index.normalized_vectors[doc_ids] @ query_unit
+                            ) * index.priority_boosts[doc_ids]
+            for i in np.argsort(-similarities, kind="stable"):
+                if similarities[i] <= 0.1:  # Seuil de pertinence
+                    break
+                if doc_ids[i] not in matched_ids:
+                    matches.append((int(doc_ids[i]), float(similarities[i]), "vector"))
 
         faq_list = []
-        for doc, score in results:
-            if doc.get('type') == 'faq':
-                faq_info = {
-                    "question": doc.get('question', 'N/A'),
-                    "answer": doc.get('answer', 'N/A'),
-                    "category": doc.get('category', 'N/A'),
-                    "score": score,
-                    "priority": doc.get('priority', 1)
-                }
-                faq_list.append(faq_info)
+        for doc_id, score, match_type in matches:
+            doc = index.documents[doc_id]
+            faq_info = {
+                "question": doc.get('question', 'N/A'),
+                "answer": doc.get('answer', 'N/A'),
+                "category": doc.get('category', 'N/A'),
+                "score": score,
+                "match": match_type,
+                "priority": doc.get('priority', 1)
+            }
+            faq_list.append(faq_info)
 
         return faq_list
 
-    def get_legal_guidance(
-            self, topic: str, category: str = None) -> Dict[str, Any]:
-        """Guidance juridique experte via Kiwi Legal"""
+    def _faq_direct_match(self, question: str) -> Optional[Tuple[Dict, float]]:
+        """(chunk FAQ, 1.0) si la question normalisée est identique à une question de la FAQ
+
+        Seule l'égalité exacte court-circuite Claude: une variante à une
+        négation près ("disposant" / "ne disposant pas") a une similarité de
+        trigrammes supérieure à 0.9 et appelle la réponse inverse. Les
+        quasi-doublons restent remontés en tête de /search/faq.
+        """
+        index = self.index
+        if not index.ready:
+            return None
+        doc_id = index.faq_index.exact_match(question)
+        if doc_id is None:
+            return None
+        return index.documents[doc_id], 1.0
+
+    def _faq_search_match(self, question: str,
+                          probe: Optional[Tuple] = None) -> Optional[Tuple[Dict, float]]:
+        """(chunk FAQ, cosinus) si une question de la FAQ est une reformulation sûre
+
+        Complète _faq_direct_match pour les reformulations. Le score de la
+        recherche n'est pas utilisé (fusionné et boosté, ce n'est pas une
+        similarité): la question est comparée aux questions de la FAQ dans
+        l'espace réduit. La plus proche doit avoir un cosinus >=
+        FAQ_SEARCH_ANSWER_MIN_SIMILARITY, devancer la deuxième d'au moins
+        FAQ_SEARCH_ANSWER_MIN_MARGIN, avoir une réponse, et ne pas différer
+        par une négation ou un mot hors vocabulaire.
+
+        Appelé avant la recherche, avec la sonde de _semantic_cache_lookup:
+        une question servie ici ne paie ni recherche ni construction du prompt.
+        """
+        index = self.index
+        if not FAQ_SEARCH_ANSWER_ENABLED or not index.ready:
+            return None
+        faq_index = index.faq_index
+        query_unit = self._probe_unit(index, question, probe)
+        match = faq_index.vector_match(query_unit) if query_unit is not None else None
+        if match is None:
+            outcome = "out_of_vocabulary"
+        else:
+            entry, similarity, margin = match
+            doc = index.documents[int(faq_index.doc_ids[entry])]
+            if similarity < FAQ_SEARCH_ANSWER_MIN_SIMILARITY:
+                outcome = "below_similarity"
+            elif margin < FAQ_SEARCH_ANSWER_MIN_MARGIN:
+                outcome = "below_margin"
+            elif not doc.get('answer'):
+                outcome = "no_answer"
+            else:
+                outcome = faq_index.meaning_conflict(question, doc.get('question', '')) or "hit"
+        FAQ_SEARCH_ANSWER.inc(outcome=outcome)
+        return (doc, similarity) if outcome == "hit" else None
+
+    def _build_faq_direct_result(self, question: str, doc: Dict, similarity: float,
+                                 status: str = "faq_direct") -> Dict[str, Any]:
+        """Réponse validée de la FAQ servie telle quelle, sans appel à Claude"""
+        context = self._format_smart_context([(doc, similarity)])
+        return self._build_ask_result(
+            question, "faq", context, doc.get('answer', ''), status=status)
+
+    def _semantic_cache_lookup(self, question: str) -> Tuple[str, Optional[Tuple], Optional[Dict]]:
+        """(type de requête, sonde, hit) du cache sémantique pour la question"""
+        return self._semantic_cache_lookup_batch([question])[0]
+
+    def _semantic_cache_lookup_batch(
+            self, questions: List[str]) -> List[Tuple[str, Optional[Tuple], Optional[Dict]]]:
+        """_semantic_cache_lookup pour une liste de questions, projetées en une passe
+
+        La sonde (version de l'index, vecteur réduit unitaire ou None si hors
+        vocabulaire, mots) sert ensuite à _faq_search_match, à la recherche
+        (la question n'est projetée qu'une fois) et à mettre la réponse en
+        cache (None si l'index n'est pas chargé). Une part
+        SEMANTIC_CACHE_AUDIT_RATE des hits est auditée par une recherche: un
+        hit suspect est écarté et la question suit le chemin normal.
+        """
+        query_types = [self._detect_query_type(question) for question in questions]
+        index = self.index
+        if not index.ready or not questions:
+            return [(query_type, None, None) for query_type in query_types]
+
+        with STAGE_SECONDS.time(stage="tfidf_transform"):
+            query_vectors = index.vectorizer.transform(questions)
+        with STAGE_SECONDS.time(stage="svd_projection"):
+            query_reduced = index.svd.transform(query_vectors)
+        norms = np.linalg.norm(query_reduced, axis=1)
+
+        lookups = []
+        for question, query_type, reduced, norm in zip(questions, query_types, query_reduced, norms):
+            probe = (index.version, None if norm == 0 else (reduced / norm).astype(np.float32),
+                     question_terms(index.vectorizer, question) if self.semantic_cache.enabled
+                     else frozenset())
+            hit = None if probe[1] is None else self.semantic_cache.get(*probe, query_type)
+            if hit is not None and self.semantic_cache.should_audit():
+                results = self._search_smart_results(question, query_type, probe)
+                if not self.semantic_cache.audit(hit, question, query_type, results):
+                    hit = None
+            lookups.append((query_type, probe, hit))
+        return lookups
+
+    def _semantic_cache_set(self, probe: Optional[Tuple], query_type: str, question: str,
+                            answer: str, results: List[Tuple[Dict, float]]):
+        if probe is not None and probe[1] is not None:
+            self.semantic_cache.set(*probe, query_type, question, answer, results)
+
+    def _build_semantic_cache_result(self, question: str, query_type: str,
+                                     hit: Dict[str, Any]) -> Dict[str, Any]:
+        """Réponse d'une question proche servie depuis le cache sémantique"""
+        result = self._build_ask_result(
+            question, query_type, NO_CONTEXT, hit["answer"], cached=True, status="semantic_cache")
+        result.update({
+            "context_found": bool(hit["parents"]),
+            "sources_count": len(hit["parents"]),
+            "cached_question": hit["question"]})
+        return result
+
+    def _prepare_legal_guidance(
+            self, topic: str, category: str = None) -> Tuple[List[Dict], str]:
+        """Recherche Kiwi Legal et construction du prompt de guidance"""
         search_query = f"{topic} {category}" if category else topic
         results = self.search_advanced(search_query, ["legal_site"], [
                                        category] if category else None)
 
         if not results:
-            return {
-                "guidance": "Aucune guidance juridique trouvée",
-                "sources": []}
+            return [], ""
 
         # Compilation de la guidance
         legal_content = []
@@ -1184,13 +2364,60 @@ SOURCES KIWI LEGAL:
 
 Fournis une guidance structurée, précise et actionnable."""
 
+        return sources, prompt
+
+    def get_legal_guidance(
+            self, topic: str, category: str = None) -> Dict[str, Any]:
+        """Guidance juridique experte via Kiwi Legal"""
+        sources, prompt = self._prepare_legal_guidance(topic, category)
+
+        if not sources:
+            return {
+                "guidance": "Aucune guidance juridique trouvée",
+                "sources": []}
+
+        try:
+            with LLM_SECONDS.time(mode="guidance"):
+                response = self.claude_client.messages.create(
+                    model=CLAUDE_MODEL,
+                    max_tokens=MAX_TOKENS,
+                    temperature=0.1,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+            record_llm_usage(response.usage)
+
+            return {
+                "topic": topic,
+                "guidance": response.content[0].text,
+                "sources": sources,
+                "kiwi_legal_verified": True
+            }
+        except Exception as e:
+            LLM_ERRORS.inc(error_type=type(e).__name__)
+            return {"guidance": f"Erreur génération guidance: {e}",
+                    "sources": sources}
+
+    async def get_legal_guidance_async(
+            self, topic: str, category: str = None) -> Dict[str, Any]:
+        """Version asynchrone de get_legal_guidance"""
+        sources, prompt = await asyncio.to_thread(
+            self._prepare_legal_guidance, topic, category)
+
+        if not sources:
+            return {
+                "guidance": "Aucune guidance juridique trouvée",
+                "sources": []}
+
         try:
-            response = self.claude_client.messages.create(
-                model=CLAUDE_MODEL,
-                max_tokens=MAX_TOKENS,
-                temperature=0.1,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            async with self.llm_semaphore:
+                with LLM_SECONDS.time(mode="guidance"):
+                    response = await self.async_claude_client.messages.create(
+                        model=CLAUDE_MODEL,
+                        max_tokens=MAX_TOKENS,
+                        temperature=0.1,
+                        messages=[{"role": "user", "content": prompt}]
+                    )
+            record_llm_usage(response.usage)
 
             return {
                 "topic": topic,
@@ -1199,5 +2426,6 @@ Fournis une guidance structurée, précise et actionnable."""
                 "kiwi_legal_verified": True
             }
         except Exception as e:
+            LLM_ERRORS.inc(error_type=type(e).__name__)
             return {"guidance": f"Erreur génération guidance: {e}",
                     "sources": sources}
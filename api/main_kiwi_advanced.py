@@ -1,8 +1,15 @@
+import asyncio
+import json
+import os
 from fastapi import FastAPI, HTTPException, Query, Path
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from config import *
+from index_store import IndexBuildLock
+from metrics import INDEX_CHUNKS, INDEX_VERSION, REGISTRY
 from kiwi_rag_advanced import AdvancedKiwiRAG
 import uvicorn
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 app = FastAPI(
     title="🥝 Kiwi AI Advanced - Expert Junior Entrepreneurs",
@@ -27,7 +34,25 @@ class AdvancedAnswer(BaseModel):
     query_type: str = Field(..., description="Type de requête, obligatoire")
     sources_count: int = Field(0, description="Nombre de sources, par défaut 0")
     kiwi_specialized: bool = Field(False, description="Indique si Kiwi est spécialisé, par défaut False")
-    status: str
+    cached: bool = Field(False, description="Réponse servie depuis le cache")
+    prompt_tokens: int = Field(0, description="Tokens (estimés) du prompt envoyé à Claude, 0 sans appel")
+    llm_usage: Dict[str, int] = Field(default_factory=dict, description="Tokens facturés par Claude: input_tokens, cache_read_input_tokens, cache_creation_input_tokens, output_tokens")
+    cached_question: Optional[str] = Field(None, description="Question déjà répondue dont la réponse est servie (cache sémantique)")
+    status: str = Field(..., description="success, faq_direct (question de la FAQ, réponse servie sans appel à Claude), faq_search (premier résultat FAQ sûr, sans appel à Claude), semantic_cache (question proche déjà répondue, sans recherche ni appel à Claude) ou error")
+
+class BatchQuestion(BaseModel):
+    questions: List[AdvancedQuestion] = Field(..., min_length=1, max_length=ASK_BATCH_MAX_SIZE,
+                                              description="Questions traitées en un seul lot")
+    debug: bool = Field(False, description="Mode debug pour voir les détails")
+
+class BatchAnswerItem(AdvancedAnswer):
+    timings: Dict[str, Any] = Field(default_factory=dict, description="Latences propres à la question (ms)")
+
+class BatchAnswer(BaseModel):
+    results: List[BatchAnswerItem]
+    count: int
+    retrieval_ms: float = Field(..., description="Recherche vectorisée commune au lot")
+    total_ms: float
 
 class JESearchParams(BaseModel):
     city: Optional[str] = Field(None, description="Ville de la JE")
@@ -51,14 +76,26 @@ async def startup_advanced():
     print("   ⚡ Système de boost et filtrage intelligent")
     print("   🔍 Recherche spécialisée par domaine")
     
-    if not kiwi_ai._load_advanced_index():
-        print("\n🔧 Index avancé non trouvé, création complète...")
-        kiwi_ai.index_documents_advanced()
-    else:
-        print("\n📂 Index avancé chargé depuis le cache")
-        kiwi_ai._print_advanced_stats()
-    
-    print("✅ Kiwi AI Advanced prêt! Système expert opérationnel.")
+    # Un seul worker construit l'index; les autres attendent le verrou puis chargent la version publiée
+    with IndexBuildLock():
+        if not kiwi_ai._load_advanced_index():
+            print("\n🔧 Index avancé non trouvé, création complète...")
+            kiwi_ai.index_documents_advanced()
+        else:
+            print("\n📂 Index avancé chargé depuis le cache")
+            kiwi_ai._print_advanced_stats()
+
+    asyncio.create_task(watch_index_updates())
+    print(f"✅ Kiwi AI Advanced prêt! Système expert opérationnel (worker {os.getpid()}).")
+
+async def watch_index_updates():
+    """Recharge à chaud une version d'index publiée par un autre worker"""
+    while True:
+        await asyncio.sleep(INDEX_POLL_SECONDS)
+        try:
+            await asyncio.to_thread(kiwi_ai.refresh_index_if_updated)
+        except Exception as e:
+            print(f"❌ Surveillance de l'index: {e}")
 
 # =============== ENDPOINTS AVANCÉS ===============
 
@@ -68,7 +105,7 @@ async def startup_advanced():
 async def ask_advanced_question(question: AdvancedQuestion):
     """Endpoint principal pour questions avancées"""
     try:
-        result = kiwi_ai.ask_kiwi_advanced(question.question, question.debug)
+        result = await kiwi_ai.ask_kiwi_advanced_async(question.question, question.debug)
         # Ensure all required fields are present in the result
         result.setdefault("query_type", "unknown")
         result.setdefault("sources_count", 0)
@@ -77,6 +114,39 @@ async def ask_advanced_question(question: AdvancedQuestion):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur système avancé: {e}")
 
+@app.post("/ask/batch", response_model=BatchAnswer,
+          summary="Lot de questions au système Kiwi",
+          description="Recherche vectorisée en une passe pour toutes les questions, puis génération concurrente bornée")
+async def ask_advanced_batch(batch: BatchQuestion):
+    """Endpoint batch: résultats et latences par question"""
+    try:
+        result = await kiwi_ai.ask_kiwi_advanced_batch_async(
+            [item.question for item in batch.questions],
+            batch.debug or any(item.debug for item in batch.questions))
+        for item in result["results"]:
+            item.setdefault("query_type", "unknown")
+            item.setdefault("sources_count", 0)
+            item.setdefault("kiwi_specialized", False)
+        return BatchAnswer(**result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur système avancé: {e}")
+
+@app.post("/ask/stream",
+          summary="Question avancée en streaming (SSE)",
+          description="Envoie les métadonnées de recherche puis la réponse token par token (server-sent events)")
+async def ask_advanced_question_stream(question: AdvancedQuestion):
+    """Endpoint streaming: événements metadata, token, error et done"""
+    async def event_stream():
+        async for event in kiwi_ai.stream_kiwi_advanced(question.question, question.debug):
+            payload = json.dumps(event["data"], ensure_ascii=False)
+            yield f"event: {event['event']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/search/je", 
          summary="Recherche experte de Junior Entreprises",
          description="Recherche avancée dans la base des JE françaises avec critères multiples")
@@ -85,11 +155,13 @@ async def search_je_advanced(
     domain: Optional[str] = Query(None, description="Domaine d'activité"),
     school: Optional[str] = Query(None, description="École"),
     region: Optional[str] = Query(None, description="Région"),
-    limit: int = Query(10, ge=1, le=50, description="Nombre de résultats")
+    limit: int = Query(10, ge=1, le=50, description="Nombre de résultats"),
+    offset: int = Query(0, ge=0, description="Décalage pour la pagination")
 ):
     """Recherche experte de Junior Entreprises"""
     try:
-        results = kiwi_ai.search_junior_entreprises(city, domain, school, region)
+        results, total = kiwi_ai.search_junior_entreprises(
+            city, domain, school, region, offset, limit)
         return {
             "query": {
                 "city": city,
@@ -97,8 +169,11 @@ async def search_je_advanced(
                 "school": school,
                 "region": region
             },
-            "results": results[:limit],
-            "total_found": len(results),
+            "results": results,
+            "total_found": total,
+            "offset": offset,
+            "limit": limit,
+            "has_more": offset + len(results) < total,
             "search_type": "expert_je_search"
         }
     except Exception as e:
@@ -106,7 +181,7 @@ async def search_je_advanced(
 
 @app.get("/search/faq",
          summary="Recherche experte dans la FAQ Kiwi Legal",
-         description="Recherche optimisée dans la FAQ officielle avec scoring")
+         description="Index FAQ dédié: question exacte, quasi-doublons (trigrammes) puis similarité vectorielle sur la seule FAQ")
 async def search_faq_advanced(
     query: str = Query(..., description="Question à rechercher"),
     category: Optional[str] = Query(None, description="Catégorie FAQ"),
@@ -131,7 +206,7 @@ async def search_faq_advanced(
 async def get_legal_guidance(request: LegalGuidanceRequest):
     """Guidance juridique experte"""
     try:
-        guidance = kiwi_ai.get_legal_guidance(request.topic, request.category)
+        guidance = await kiwi_ai.get_legal_guidance_async(request.topic, request.category)
         return guidance
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -173,28 +248,50 @@ async def advanced_search(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/reindex",
+@app.post("/reindex", status_code=202,
           summary="Réindexation complète",
-          description="Lance une réindexation complète du système avancé")
+          description="Lance une réindexation complète en arrière-plan; l'index courant reste servi jusqu'au remplacement")
 async def reindex_advanced():
-    """Réindexation complète du système"""
-    try:
-        kiwi_ai.index_documents_advanced()
-        return {
-            "message": "✅ Réindexation avancée terminée",
-            "system": "Kiwi AI Advanced",
-            "features": ["TF-IDF", "SVD", "Boost", "Metadata"],
-            "status": "success"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Réindexation complète du système, sans interruption de service"""
+    job = kiwi_ai.start_background_reindex()
+    if job is None:
+        raise HTTPException(status_code=409, detail="Réindexation déjà en cours")
+    return {
+        "message": "🔄 Réindexation avancée lancée",
+        "system": "Kiwi AI Advanced",
+        "features": ["TF-IDF", "SVD", "Boost", "Metadata"],
+        "job": job,
+        "status": "accepted"
+    }
+
+@app.get("/reindex/status",
+         summary="État de la réindexation",
+         description="Étape, progression et durée de la dernière réindexation")
+async def reindex_status():
+    """Suivi de la réindexation en arrière-plan"""
+    return {
+        "job": kiwi_ai.reindex_status,
+        "index_version": kiwi_ai.index.version,
+        "documents_indexed": len(kiwi_ai.index.documents)
+    }
+
+@app.get("/cache/semantic/audit",
+         summary="Audits du cache sémantique",
+         description="Derniers hits audités (documents retrouvés comparés à ceux de la réponse en cache) et taux de faux hits")
+async def semantic_cache_audit(limit: int = Query(50, ge=1, le=SEMANTIC_CACHE_AUDIT_LOG_SIZE)):
+    """Revue des faux hits du cache sémantique (verdict suspect: entrée retirée)"""
+    return {
+        "stats": kiwi_ai.semantic_cache.stats(),
+        "audits": kiwi_ai.semantic_cache.recent_audits(limit)
+    }
 
 @app.get("/stats/advanced",
          summary="Statistiques système avancées",
          description="Statistiques détaillées du système vectoriel")
 async def get_advanced_stats():
     """Statistiques avancées du système"""
-    if not kiwi_ai.documents:
+    index = kiwi_ai.index
+    if not index.documents:
         return {"error": "Système non indexé"}
     
     # Calculs statistiques avancés
@@ -202,7 +299,7 @@ async def get_advanced_stats():
     by_type = {}
     by_category = {}
     
-    for doc in kiwi_ai.documents:
+    for doc in index.documents:
         source = doc.get('source', 'unknown')
         doc_type = doc.get('type', 'unknown')
         category = doc.get('category', doc.get('legal_category', doc.get('rse_category', 'unknown')))
@@ -218,16 +315,22 @@ async def get_advanced_stats():
             "features": ["TF-IDF Vectorization", "SVD Reduction", "Smart Boosting", "Metadata Indexing"]
         },
         "documents": {
-            "total_chunks": len(kiwi_ai.documents),
+            "total_chunks": len(index.documents),
             "by_source": by_source,
             "by_type": by_type,
             "by_category": {k: v for k, v in by_category.items() if k != 'unknown'}
         },
         "vectorial_system": {
-            "tfidf_dimensions": kiwi_ai.doc_vectors.shape if kiwi_ai.doc_vectors is not None else None,
-            "reduced_dimensions": kiwi_ai.reduced_vectors.shape if kiwi_ai.reduced_vectors is not None else None,
-            "vocabulary_size": len(kiwi_ai.vectorizer.vocabulary_) if hasattr(kiwi_ai.vectorizer, 'vocabulary_') else 0
+            "tfidf_dimensions": index.doc_vectors.shape if index.doc_vectors is not None else None,
+            "reduced_dimensions": index.reduced_vectors.shape if index.reduced_vectors is not None else None,
+            "vocabulary_size": len(index.vectorizer.vocabulary_) if hasattr(index.vectorizer, 'vocabulary_') else 0,
+            "vector_index": index.vector_index.name,
+            "vector_index_recall": index.vector_index.recall,
+            "index_version": index.version
         },
+        "latency": kiwi_ai.get_latency_summary(),
+        "answer_cache": kiwi_ai.answer_cache.stats(),
+        "semantic_cache": kiwi_ai.semantic_cache.stats(),
         "kiwi_ecosystem": {
             "faq_count": by_type.get('faq', 0),
             "junior_entreprises": by_type.get('junior_entreprises', 0),
@@ -241,16 +344,18 @@ async def get_advanced_stats():
          description="Vérification complète de l'état du système")
 async def advanced_health_check():
     """Vérification avancée de l'état du système"""
+    index = kiwi_ai.index
     system_status = {
         "status": "healthy",
         "system": "Kiwi AI Advanced v3.0.0",
+        "worker_pid": os.getpid(),
         "components": {
-            "vectorizer": kiwi_ai.vectorizer is not None,
-            "svd": kiwi_ai.svd is not None,
-            "documents": len(kiwi_ai.documents) > 0,
-            "vectors": kiwi_ai.doc_vectors is not None,
-            "reduced_vectors": kiwi_ai.reduced_vectors is not None,
-            "metadata": bool(kiwi_ai.document_metadata)
+            "vectorizer": index.vectorizer is not None,
+            "svd": index.svd is not None,
+            "documents": len(index.documents) > 0,
+            "vectors": index.doc_vectors is not None,
+            "reduced_vectors": index.reduced_vectors is not None,
+            "metadata": bool(index.document_metadata)
         },
         "capabilities": {
             "smart_search": True,
@@ -262,12 +367,14 @@ async def advanced_health_check():
             "legal_guidance": True
         },
         "performance": {
-            "documents_indexed": len(kiwi_ai.documents),
+            "documents_indexed": len(index.documents),
             "ready_for_queries": all([
-                kiwi_ai.vectorizer is not None,
-                kiwi_ai.reduced_vectors is not None,
-                len(kiwi_ai.documents) > 0
-            ])
+                index.vectorizer is not None,
+                index.reduced_vectors is not None,
+                len(index.documents) > 0
+            ]),
+            "reindex_state": kiwi_ai.reindex_status["state"],
+            "index_version": index.version
         }
     }
     
@@ -277,6 +384,16 @@ async def advanced_health_check():
     
     return system_status
 
+@app.get("/metrics", response_class=PlainTextResponse,
+         summary="Métriques Prometheus",
+         description="Histogrammes par étape (requête, LLM, indexation) et compteurs, format texte Prometheus")
+async def metrics():
+    """Métriques du worker ayant répondu"""
+    index = kiwi_ai.index
+    INDEX_CHUNKS.set(len(index.documents))
+    INDEX_VERSION.set(index.version)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/",
          summary="Page d'accueil système avancé",
          description="Informations complètes sur le système Kiwi AI Advanced")
@@ -301,17 +418,28 @@ async def advanced_root():
         },
         "api_endpoints": {
             "ask": "POST /ask - Question experte avec IA avancée",
+            "ask_batch": "POST /ask/batch - Lot de questions (recherche vectorisée commune)",
+            "ask_stream": "POST /ask/stream - Question experte en streaming (SSE)",
             "search_je": "GET /search/je - Recherche JE multi-critères",
             "search_faq": "GET /search/faq - Recherche FAQ optimisée",
             "legal_guidance": "POST /legal/guidance - Guidance juridique experte",
             "advanced_search": "GET /search/advanced - Recherche vectorielle",
+            "reindex": "POST /reindex - Réindexation en arrière-plan (202)",
+            "reindex_status": "GET /reindex/status - Progression de la réindexation",
             "stats": "GET /stats/advanced - Statistiques système",
-            "health": "GET /health/advanced - État système complet"
+            "semantic_cache_audit": "GET /cache/semantic/audit - Audits des faux hits du cache sémantique",
+            "health": "GET /health/advanced - État système complet",
+            "metrics": "GET /metrics - Métriques Prometheus par étape"
         }
 }
 if __name__ == "__main__":
     print("Démarrage du serveur...")
     try:
-        uvicorn.run(app, host="0.0.0.0", port=8000)
+        if API_WORKERS > 1:
+            # Plusieurs processus: uvicorn exige l'application sous forme "module:app"
+            uvicorn.run("main_kiwi_advanced:app", host="0.0.0.0", port=8000,
+                        workers=API_WORKERS)
+        else:
+            uvicorn.run(app, host="0.0.0.0", port=8000)
     except Exception as e:
         print(f"Erreur: {e}")
@@ -0,0 +1,220 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Bornes (secondes) adaptées aux étapes de recherche (~µs) comme aux appels LLM (~s)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INDEX_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone par combinaison de labels"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    """Valeur instantanée par combinaison de labels"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (format Prometheus: _bucket, _sum, _count)"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [comptes par borne, somme]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe la durée du bloc (en secondes), même s'il lève une exception"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = []
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Métriques du processus, exposées au format texte Prometheus (GET /metrics)
+
+    Chaque worker uvicorn a son propre registre: en déploiement multi-workers,
+    une collecte ne voit que le worker qui a répondu.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Étapes d'une requête: detect_type, tfidf_transform, svd_projection, similarity,
+# bm25, boosting, top_k, context_assembly
+STAGE_SECONDS = REGISTRY.histogram(
+    "kiwi_stage_seconds", "Durée de chaque étape du traitement d'une requête", ["stage"])
+PROMPT_TOKENS = REGISTRY.histogram(
+    "kiwi_prompt_tokens", "Taille estimée du prompt envoyé à Claude (tokens)",
+    buckets=TOKEN_BUCKETS)
+CONTEXT_CHUNKS_DROPPED = REGISTRY.counter(
+    "kiwi_context_chunks_dropped_total",
+    "Chunks retrouvés mais écartés du contexte (same_parent, duplicate, budget)", ["reason"])
+LLM_SECONDS = REGISTRY.histogram(
+    "kiwi_llm_seconds", "Durée des appels Claude (jusqu'à la fin de la réponse)", ["mode"])
+# Tokens facturés: input (hors cache), cache_read, cache_write, output
+LLM_TOKENS = REGISTRY.counter(
+    "kiwi_llm_tokens_total", "Tokens des appels Claude par nature", ["kind"])
+LLM_CACHE_SECONDS = REGISTRY.histogram(
+    "kiwi_llm_cache_seconds",
+    "Durée des appels Claude selon le cache de prompts (read, write, none)", ["cache"])
+LLM_ERRORS = REGISTRY.counter(
+    "kiwi_llm_errors_total", "Erreurs lors de la génération, par type d'exception",
+    ["error_type"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "kiwi_request_seconds", "Durée totale des requêtes question-réponse", ["mode", "query_type"])
+ASK_TOTAL = REGISTRY.counter(
+    "kiwi_ask_total", "Questions traitées par statut de réponse", ["status"])
+# hit, below_similarity, below_margin, no_answer, negation, unknown_word, out_of_vocabulary:
+# réglage des seuils FAQ_SEARCH_ANSWER_*
+FAQ_SEARCH_ANSWER = REGISTRY.counter(
+    "kiwi_faq_search_answer_total",
+    "Décision de réponse FAQ depuis la recherche (sans appel à Claude)", ["outcome"])
+# hit, miss, guarded (cosinus suffisant mais un terme de la question remplacé)
+SEMANTIC_CACHE_LOOKUPS = REGISTRY.counter(
+    "kiwi_semantic_cache_total", "Consultations du cache sémantique par issue", ["outcome"])
+# agree, suspect (documents retrouvés trop différents de ceux de la réponse en cache)
+SEMANTIC_CACHE_AUDITS = REGISTRY.counter(
+    "kiwi_semantic_cache_audit_total", "Audits des hits du cache sémantique par verdict",
+    ["verdict"])
+
+# Étapes d'indexation: load, chunk, fit, svd, embed_incremental, finalize, save, load_index
+INDEX_STAGE_SECONDS = REGISTRY.histogram(
+    "kiwi_index_stage_seconds", "Durée de chaque étape d'indexation", ["stage"],
+    buckets=INDEX_BUCKETS)
+INDEX_CHUNKS = REGISTRY.gauge("kiwi_index_chunks", "Chunks de l'index servi par ce worker")
+INDEX_VERSION = REGISTRY.gauge("kiwi_index_version", "Version de l'index servi par ce worker")
+
+
+def record_llm_usage(usage, seconds: float = None) -> Dict[str, int]:
+    """Compte les tokens d'une réponse Claude (champs de cache absents si non renvoyés)
+
+    seconds: durée de l'appel, classée selon que le préfixe a été lu depuis
+    le cache, écrit dans le cache ou ni l'un ni l'autre.
+    """
+    tokens = {field: int(getattr(usage, field, None) or 0) for field in (
+        "input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens",
+        "output_tokens")}
+    LLM_TOKENS.inc(tokens["input_tokens"], kind="input")
+    LLM_TOKENS.inc(tokens["cache_read_input_tokens"], kind="cache_read")
+    LLM_TOKENS.inc(tokens["cache_creation_input_tokens"], kind="cache_write")
+    LLM_TOKENS.inc(tokens["output_tokens"], kind="output")
+    if seconds is not None:
+        cache = ("read" if tokens["cache_read_input_tokens"]
+                 else "write" if tokens["cache_creation_input_tokens"] else "none")
+        LLM_CACHE_SECONDS.observe(seconds, cache=cache)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière (≈ 4 caractères par token), sans appel au tokenizer"""
+    return len(text) // 4
@@ -0,0 +1,172 @@
+import math
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import *
+
+
+class BruteForceIndex:
+    """Recherche exacte: produit scalaire avec tous les vecteurs normalisés"""
+
+    name = "brute"
+
+    def __init__(self):
+        self.vectors = None
+        self.recall = 1.0
+
+    def build(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def search(self, query_unit: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Renvoie (ids candidats, similarités); ids None = tous les chunks"""
+        return None, self.vectors @ query_unit
+
+    def search_batch(self, query_units: np.ndarray,
+                     block_size: int = 64) -> List[Tuple[Optional[np.ndarray], np.ndarray]]:
+        """Plusieurs requêtes: un produit matrice-matrice par bloc de requêtes"""
+        results = []
+        for start in range(0, len(query_units), block_size):
+            scores = query_units[start:start + block_size] @ self.vectors.T
+            results.extend((None, row) for row in scores)
+        return results
+
+    def save(self, path: str):
+        pass
+
+    def load(self, path: str, vectors: np.ndarray) -> bool:
+        self.vectors = vectors
+        return True
+
+
+class IVFIndex:
+    """Index IVF: quantification grossière par k-means sphérique
+
+    Les chunks sont répartis en `n_lists` listes autour de centroïdes; une
+    requête ne compare que les chunks des `n_probe` listes les plus proches.
+    """
+
+    name = "ivf"
+
+    def __init__(self, n_lists: int = 0, n_probe: int = 8,
+                 n_iter: int = 20, seed: int = 42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.recall = None  # recall@k mesuré à la construction
+        self.vectors = None
+        self.centroids = None
+        self.list_order = None    # ids des chunks triés par liste
+        self.list_offsets = None  # début de chaque liste dans list_order
+
+    def build(self, vectors: np.ndarray):
+        self.vectors = vectors
+        n_docs = len(vectors)
+        n_lists = self.n_lists or max(1, int(math.sqrt(n_docs)))
+        n_lists = min(n_lists, n_docs)
+
+        self.centroids = self._train_kmeans(vectors, n_lists)
+        assignments = self._assign(vectors, self.centroids)
+
+        self.list_order = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def _train_kmeans(self, vectors: np.ndarray, n_lists: int) -> np.ndarray:
+        """K-means sphérique (similarité cosinus) en NumPy pur"""
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignments = self._assign(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=n_lists)
+
+            # Listes vides: réinitialisation sur un chunk aléatoire
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        return np.ascontiguousarray(centroids)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray,
+                batch_size: int = 8192) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            batch = vectors[start:start + batch_size]
+            assignments[start:start + batch_size] = np.argmax(
+                batch @ centroids.T, axis=1)
+        return assignments
+
+    def search(self, query_unit: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        n_probe = min(self.n_probe, len(self.centroids))
+        centroid_scores = self.centroids @ query_unit
+        probed = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+
+        candidate_ids = np.concatenate([
+            self.list_order[self.list_offsets[l]:self.list_offsets[l + 1]]
+            for l in probed])
+        return candidate_ids, self.vectors[candidate_ids] @ query_unit
+
+    def search_batch(self, query_units: np.ndarray) -> List[Tuple[Optional[np.ndarray], np.ndarray]]:
+        # Listes sondées différentes pour chaque requête: pas de produit commun
+        return [self.search(query_unit) for query_unit in query_units]
+
+    def save(self, path: str):
+        np.savez(path, centroids=self.centroids, list_order=self.list_order,
+                 list_offsets=self.list_offsets,
+                 recall=np.nan if self.recall is None else self.recall)
+
+    def load(self, path: str, vectors: np.ndarray) -> bool:
+        if not Path(path).exists():
+            return False
+        data = np.load(path)
+        if int(data["list_offsets"][-1]) != len(vectors):
+            return False  # Index ANN périmé par rapport aux vecteurs
+        self.vectors = vectors
+        self.centroids = data["centroids"]
+        self.list_order = data["list_order"]
+        self.list_offsets = data["list_offsets"]
+        recall = float(data["recall"])
+        self.recall = None if np.isnan(recall) else recall
+        return True
+
+
+def top_k_ids(candidate_ids: Optional[np.ndarray], similarities: np.ndarray,
+              k: int) -> np.ndarray:
+    """Ids des k meilleurs candidats, triés par similarité décroissante"""
+    k = min(k, len(similarities))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-similarities, k - 1)[:k]
+    top = top[np.argsort(-similarities[top])]
+    return top if candidate_ids is None else candidate_ids[top]
+
+
+def evaluate_recall(index, vectors: np.ndarray, queries: np.ndarray,
+                    k: int) -> float:
+    """Recall@k moyen de l'index face à la recherche exacte"""
+    exact = BruteForceIndex()
+    exact.build(vectors)
+
+    recalls: List[float] = []
+    for query in queries:
+        expected = set(top_k_ids(*exact.search(query), k).tolist())
+        found = set(top_k_ids(*index.search(query), k).tolist())
+        recalls.append(len(expected & found) / len(expected) if expected else 1.0)
+    return round(float(np.mean(recalls)), 4) if recalls else 1.0
+
+
+def create_vector_index():
+    """Instancie l'index selon VECTOR_INDEX_BACKEND (brute ou ivf)"""
+    if VECTOR_INDEX_BACKEND == "ivf":
+        return IVFIndex(n_lists=IVF_N_LISTS, n_probe=IVF_N_PROBE)
+    return BruteForceIndex()
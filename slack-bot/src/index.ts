@@ -2,6 +2,7 @@ import pkg from '@slack/bolt';
 const { App } = pkg;
 import * as dotenv from 'dotenv';
 import axios from 'axios';
+import { Readable } from 'stream';
 
 dotenv.config();
 
@@ -12,22 +13,89 @@ const app = new App({
   appToken: process.env.SLACK_APP_TOKEN || '',
 });
 
+// Minimum delay between two Slack message updates while streaming
+const STREAM_UPDATE_INTERVAL_MS = 1000;
+
+// Final statuses carrying a usable answer (faq_direct, faq_search: validated FAQ answer, no LLM call;
+// semantic_cache: answer cached for a rephrasing of the same question)
+const ANSWERED_STATUSES = ['success', 'faq_direct', 'faq_search', 'semantic_cache'];
+
+type StreamEvent = { event: string; data: any };
+
+// Parse the server-sent events sent by POST /ask/stream
+async function readEventStream(stream: Readable, onEvent: (event: StreamEvent) => Promise<void>) {
+  stream.setEncoding('utf8');
+  let buffer = '';
+
+  for await (const chunk of stream) {
+    buffer += chunk;
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (data) await onEvent({ event, data: JSON.parse(data) });
+    }
+  }
+}
+
 // Listen for direct messages to the bot
-app.message(async ({ message, say }) => {
+app.message(async ({ message, say, client }) => {
   // @ts-ignore
   if (message.channel_type === 'im') {
-    await say("Je réfléchis à ta question...");
+    const thinking = await say("Je réfléchis à ta question...");
     // @ts-ignore
     const userMessage = message.text;
-    // @ts-ignore
-    const {data: {status, answer}} = await axios.post(`${process.env.API_URL}/ask`, { question: userMessage, debug: true, context_type: "auto" })
 
-    if (status !== 'success') {
-      await say("Désolé, je n'ai pas pu traiter ta question.");
+    const update = (text: string) => client.chat.update({
+      channel: thinking.channel as string,
+      ts: thinking.ts as string,
+      text,
+    });
+
+    let answer = '';
+    let status = 'success';
+    let lastUpdate = 0;
+
+    try {
+      const response = await axios.post(
+        `${process.env.API_URL}/ask/stream`,
+        { question: userMessage, debug: true, context_type: "auto" },
+        { responseType: 'stream' },
+      );
+
+      await readEventStream(response.data, async ({ event, data }) => {
+        if (event === 'metadata') {
+          await update(`Je réfléchis à ta question... (${data.sources_count} sources Kiwi trouvées)`);
+        } else if (event === 'token') {
+          answer += data.text;
+          if (Date.now() - lastUpdate >= STREAM_UPDATE_INTERVAL_MS) {
+            lastUpdate = Date.now();
+            await update(answer);
+          }
+        } else if (event === 'error') {
+          status = 'error';
+        } else if (event === 'done') {
+          status = data.status;
+        }
+      });
+    } catch (error) {
+      console.error('Streaming /ask failed:', error);
+      status = 'error';
+    }
+
+    if (!ANSWERED_STATUSES.includes(status) || !answer) {
+      await update("Désolé, je n'ai pas pu traiter ta question.");
       return;
     }
-   
-    await say(answer);
+
+    await update(answer);
   }
 });
 